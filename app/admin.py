@@ -0,0 +1,124 @@
+"""
+Admin API routes for Omnilingual-ASR server.
+
+Every route requires `Authorization: Bearer <ADMIN_API_KEY>` and the routes are
+disabled when no admin key is configured.
+"""
+
+import logging
+import secrets
+
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import FileResponse
+
+from app.config import ADMIN_API_KEY
+from app.exceptions import APIError
+from app.profiling import profiler
+from app.schemas import (
+    ModelStatusResponse,
+    ModelSwapRequest,
+    ProfileRequest,
+    ProfileStatusResponse,
+)
+from app.service import asr_service
+
+logger = logging.getLogger(__name__)
+
+
+async def require_admin(authorization: str | None = Header(default=None)) -> None:
+    """Reject requests without the admin API key."""
+    if not ADMIN_API_KEY:
+        raise APIError(
+            status_code=403,
+            message="Admin endpoints are disabled. Set ADMIN_API_KEY to enable them.",
+            error_type="permission_error",
+        )
+
+    api_key = (authorization or "").removeprefix("Bearer ").strip()
+    if not secrets.compare_digest(api_key, ADMIN_API_KEY):
+        raise APIError(
+            status_code=401,
+            message="Invalid admin API key",
+            error_type="authentication_error",
+            code="invalid_api_key",
+        )
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+def model_status() -> ModelStatusResponse:
+    return ModelStatusResponse(
+        model=asr_service.model_name,
+        loading=asr_service.loading_model_name,
+        error=asr_service.swap_error,
+    )
+
+
+@router.get("/model", response_model=ModelStatusResponse)
+async def get_model():
+    """Served model and hot swap state."""
+    return model_status()
+
+
+@router.post("/model", response_model=ModelStatusResponse, status_code=202)
+async def swap_model(request: ModelSwapRequest):
+    """
+    Hot swap the served model.
+
+    The new model is loaded and warmed up in the background while the current
+    one keeps serving. Poll `GET /admin/model` to follow the swap.
+    """
+    if asr_service.swap_in_progress:
+        raise APIError(
+            status_code=409,
+            message=f"Already loading {asr_service.loading_model_name}",
+            param="model",
+        )
+
+    logger.info(f"Hot swap requested: {asr_service.model_name} -> {request.model}")
+    asr_service.start_swap(request.model)
+    return model_status()
+
+
+@router.post("/profile", response_model=ProfileStatusResponse, status_code=202)
+async def start_profile(request: ProfileRequest):
+    """
+    Profile live traffic for the next `batches` inference batches or `seconds`
+    seconds, whichever ends first. Poll `GET /admin/profile` for the results.
+    """
+    if request.batches is None and request.seconds is None:
+        raise APIError(
+            status_code=400,
+            message="Set batches, seconds or both to bound the profiling session.",
+            param="batches",
+        )
+
+    if profiler.active:
+        raise APIError(
+            status_code=409,
+            message=f"Profiling session {profiler.session.id} is already running",
+        )
+
+    return profiler.start(batches=request.batches, seconds=request.seconds).status()
+
+
+@router.get("/profile", response_model=ProfileStatusResponse)
+async def get_profile():
+    """State of the latest profiling session and its top operators."""
+    if profiler.session is None:
+        raise APIError(status_code=404, message="No profiling session has run yet")
+    return profiler.session.status()
+
+
+@router.get("/profile/trace")
+async def get_profile_trace():
+    """Chrome trace of the latest finished profiling session."""
+    session = profiler.session
+    if session is None or session.trace_path is None or session.state != "done":
+        raise APIError(status_code=404, message="No profiling trace is available")
+    return FileResponse(
+        session.trace_path,
+        media_type="application/json",
+        filename=session.trace_path.name,
+    )
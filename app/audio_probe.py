@@ -0,0 +1,83 @@
+"""
+Cheap audio header probe.
+
+Reads only the container header of an uploaded file to learn its duration,
+sample rate and channel count before any samples are decoded. This lets the
+server reject over-length audio immediately and schedule and account for
+requests by audio duration.
+
+Front-end workers also decode audio here, with libsndfile like the model's
+own audio decoder, so that decoding never needs torch.
+"""
+
+import io
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AudioInfo:
+    """Audio properties read from a container header."""
+
+    duration: float
+    sample_rate: int
+    channels: int
+    format: str
+
+
+def probe_audio(audio: bytes | str) -> AudioInfo | None:
+    """
+    Read the duration, sample rate and channel count from the audio header.
+
+    Supports the containers libsndfile can open (WAV, FLAC, OGG, MP3, ...).
+
+    Args:
+        audio: Raw audio file bytes, or the path of an audio file, of which
+            only the header is read
+
+    Returns:
+        Audio properties, or None if the header cannot be read. The full
+        decode then decides whether the file is valid.
+    """
+
+    try:
+        info = sf.info(io.BytesIO(audio) if isinstance(audio, bytes) else audio)
+    except (sf.SoundFileError, RuntimeError) as e:
+        logger.debug(f"Audio header probe failed: {e}")
+        return None
+
+    if info.samplerate <= 0 or info.frames <= 0:
+        return None
+
+    return AudioInfo(
+        duration=info.frames / info.samplerate,
+        sample_rate=info.samplerate,
+        channels=info.channels,
+        format=info.format,
+    )
+
+
+def decode_audio(audio_bytes: bytes) -> tuple[np.ndarray, int] | None:
+    """
+    Decode audio to float32 samples of shape (frames, channels).
+
+    Returns:
+        Samples and sample rate, or None if libsndfile cannot decode the file
+    """
+
+    try:
+        samples, sample_rate = sf.read(
+            io.BytesIO(audio_bytes), dtype="float32", always_2d=True
+        )
+    except (sf.SoundFileError, RuntimeError) as e:
+        logger.debug(f"Audio decode failed: {e}")
+        return None
+
+    if samples.size == 0:
+        return None
+    return samples, sample_rate
@@ -0,0 +1,309 @@
+"""
+Per-host performance autotuning.
+
+Benchmarks the model on synthetic audio to pick the dtype, the intra-op and
+inter-op thread counts and the batch size for each audio duration bucket. The
+winning profile is saved to a JSON file keyed by model name and a fingerprint
+of the hardware, so later starts on the same kind of host load it instead of
+tuning again.
+
+PyTorch only accepts the inter-op thread count before any parallel work, so
+every (dtype, inter-op threads) combination is benchmarked in a fresh
+subprocess.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import platform
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from app.checkpoints import load_pipeline
+from app.config import AUTOTUNE_PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the duration buckets batch sizes are tuned for
+DURATION_BUCKETS = (5, 10, 20, 40)
+BATCH_SIZE_CANDIDATES = (1, 2, 4, 8, 16, 32)
+# A larger batch is only chosen if it improves throughput by at least this much
+MIN_BATCH_GAIN = 0.05
+# Duration of the synthetic clip used to compare dtypes and thread counts
+REFERENCE_SECONDS = 10
+SAMPLE_RATE = 16000
+
+
+@dataclass
+class TuningProfile:
+    """Performance settings chosen for a model on a host."""
+
+    model_name: str
+    fingerprint: str
+    device: str
+    dtype: str
+    intra_op_threads: int
+    inter_op_threads: int
+    batch_sizes: dict[int, int]
+    throughput: float
+
+    @property
+    def torch_dtype(self) -> torch.dtype:
+        return getattr(torch, self.dtype)
+
+    def batch_size_for(self, duration: float) -> int:
+        """Batch size for audio of `duration` seconds."""
+
+        for bucket in sorted(self.batch_sizes):
+            if duration <= bucket:
+                return self.batch_sizes[bucket]
+        return self.batch_sizes[max(self.batch_sizes)]
+
+    def apply_threads(self) -> None:
+        """Set the thread counts of this process. Call before any torch work."""
+
+        torch.set_num_threads(self.intra_op_threads)
+        try:
+            torch.set_num_interop_threads(self.inter_op_threads)
+        except RuntimeError:
+            logger.warning(
+                "Inter-op threads already in use, keeping "
+                f"{torch.get_num_interop_threads()} instead of {self.inter_op_threads}"
+            )
+
+
+def select_device() -> str:
+    """Best available device."""
+
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def default_dtype(device: str) -> torch.dtype:
+    """Serving dtype when no tuning profile is used."""
+
+    # Use float16 for compute capability < 8.0 (e.g. T4)
+    if device == "cuda" and torch.cuda.get_device_capability() < (8, 0):
+        return torch.float16
+    return torch.bfloat16
+
+
+def hardware_fingerprint(device: str) -> str:
+    """Short hash identifying the host's hardware and torch build."""
+
+    parts = [
+        platform.machine(),
+        platform.processor(),
+        str(os.cpu_count()),
+        torch.__version__,
+        device,
+    ]
+    if device == "cuda":
+        parts += [torch.cuda.get_device_name(), str(torch.cuda.device_count())]
+
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+
+def profile_path(model_name: str, fingerprint: str) -> Path:
+    """Location of the tuning profile for a model and hardware fingerprint."""
+
+    return Path(AUTOTUNE_PROFILE_DIR) / f"{model_name}.{fingerprint}.autotune.json"
+
+
+def load_profile(model_name: str, device: str) -> TuningProfile | None:
+    """Saved tuning profile for `model_name` on this host, if there is one."""
+
+    path = profile_path(model_name, hardware_fingerprint(device))
+    if not path.exists():
+        return None
+
+    data = json.loads(path.read_text())
+    data["batch_sizes"] = {int(k): v for k, v in data["batch_sizes"].items()}
+    return TuningProfile(**data)
+
+
+def save_profile(profile: TuningProfile) -> Path:
+    """Write the profile next to the other cached model files."""
+
+    path = profile_path(profile.model_name, profile.fingerprint)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(asdict(profile), indent=2))
+    return path
+
+
+def dtype_candidates(device: str) -> list[torch.dtype]:
+    if device == "cuda":
+        if torch.cuda.get_device_capability() < (8, 0):
+            return [torch.float16]
+        return [torch.bfloat16, torch.float16]
+    if device == "mps":
+        return [torch.bfloat16, torch.float16]
+    return [torch.bfloat16, torch.float32]
+
+
+def thread_candidates(device: str) -> tuple[list[int], list[int]]:
+    """Intra-op and inter-op thread counts to try."""
+
+    if device != "cpu":
+        # The accelerator does the work, keep the defaults
+        return [torch.get_num_threads()], [torch.get_num_interop_threads()]
+
+    cores = os.cpu_count() or 1
+    intra_op = sorted({cores, max(1, cores // 2), max(1, cores // 4)})
+    inter_op = sorted({1, max(1, cores // 2)})
+    return intra_op, inter_op
+
+
+def synthetic_audio(seconds: float, seed: int = 0) -> dict:
+    """Speech-like synthetic clip: modulated harmonics plus noise."""
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    waveform = sum(np.sin(k * phase) / k for k in range(1, 6))
+    waveform *= 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2
+    waveform += 0.05 * rng.standard_normal(len(t))
+    return {"waveform": waveform.astype(np.float32), "sample_rate": SAMPLE_RATE}
+
+
+def measure_throughput(pipeline, seconds: float, batch_size: int) -> float:
+    """Audio-seconds transcribed per second for a full batch of `seconds` clips."""
+
+    batch = [synthetic_audio(seconds, seed=i) for i in range(batch_size)]
+    pipeline.transcribe(batch, batch_size=batch_size)  # warmup
+
+    start = time.perf_counter()
+    pipeline.transcribe(batch, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    return seconds * batch_size / elapsed
+
+
+def tune_batch_size(measure: Callable[[int], float]) -> tuple[int, float]:
+    """
+    Grow the batch size while it keeps improving throughput.
+
+    Args:
+        measure: Throughput for a batch size. Raises `torch.OutOfMemoryError`
+            when the batch does not fit.
+
+    Returns:
+        Best batch size and its throughput
+    """
+
+    best_size, best_throughput = 0, 0.0
+    for batch_size in BATCH_SIZE_CANDIDATES:
+        try:
+            throughput = measure(batch_size)
+        except torch.OutOfMemoryError:
+            break
+        finally:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+        if throughput < best_throughput * (1 + MIN_BATCH_GAIN):
+            break
+        best_size, best_throughput = batch_size, throughput
+
+    return max(best_size, 1), best_throughput
+
+
+def _run_trial(
+    model_name: str,
+    device: str,
+    dtype_name: str,
+    inter_op_threads: int,
+    intra_op_candidates: list[int],
+) -> dict:
+    """Benchmark one dtype and inter-op thread count in a fresh process."""
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Before any parallel work in this process
+    torch.set_num_interop_threads(inter_op_threads)
+    pipeline = load_pipeline(model_name, device, getattr(torch, dtype_name))
+
+    best_intra_op, best_throughput = 0, 0.0
+    for intra_op_threads in intra_op_candidates:
+        torch.set_num_threads(intra_op_threads)
+        throughput = measure_throughput(pipeline, REFERENCE_SECONDS, 1)
+        logger.info(
+            f"Autotune {dtype_name}, threads {intra_op_threads}/{inter_op_threads}: "
+            f"{throughput:.1f} audio-s/s"
+        )
+        if throughput > best_throughput:
+            best_intra_op, best_throughput = intra_op_threads, throughput
+
+    torch.set_num_threads(best_intra_op)
+    batch_sizes, throughputs = {}, []
+    for bucket in DURATION_BUCKETS:
+        batch_size, throughput = tune_batch_size(
+            lambda n, bucket=bucket: measure_throughput(pipeline, bucket, n)
+        )
+        batch_sizes[bucket] = batch_size
+        throughputs.append(throughput)
+        logger.info(
+            f"Autotune {dtype_name}, {bucket}s bucket: batch size {batch_size}, "
+            f"{throughput:.1f} audio-s/s"
+        )
+
+    return {
+        "dtype": dtype_name,
+        "intra_op_threads": best_intra_op,
+        "inter_op_threads": inter_op_threads,
+        "batch_sizes": batch_sizes,
+        # Geometric mean over buckets, so no single bucket dominates
+        "throughput": math.exp(np.mean(np.log(np.maximum(throughputs, 1e-9)))),
+    }
+
+
+def autotune(model_name: str, device: str) -> TuningProfile:
+    """Benchmark candidate settings for `model_name` on `device` and return the best."""
+
+    intra_op_candidates, inter_op_candidates = thread_candidates(device)
+    trials = []
+    for dtype in dtype_candidates(device):
+        dtype_name = str(dtype).removeprefix("torch.")
+        for inter_op_threads in inter_op_candidates:
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+                trial = executor.submit(
+                    _run_trial,
+                    model_name,
+                    device,
+                    dtype_name,
+                    inter_op_threads,
+                    intra_op_candidates,
+                )
+                try:
+                    trials.append(trial.result())
+                except Exception:
+                    # A trial that fails, e.g. a dtype the device cannot run,
+                    # only removes its candidates
+                    logger.exception(
+                        f"Autotune trial {dtype_name} with {inter_op_threads} "
+                        f"inter-op threads failed"
+                    )
+
+    if not trials:
+        raise RuntimeError(f"All autotune trials failed for {model_name}")
+
+    best = max(trials, key=lambda trial: trial["throughput"])
+    return TuningProfile(
+        model_name=model_name,
+        fingerprint=hardware_fingerprint(device),
+        device=device,
+        **best,
+    )
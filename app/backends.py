@@ -0,0 +1,296 @@
+"""
+Inference backends for CTC models.
+
+A backend turns audio into transcripts in four steps, which the pipelined
+stages run on separate threads:
+
+    prepare -> collate -> encode -> decode_batch
+
+`prepare` decodes, resamples and normalizes one clip, `collate` pads clips
+into a batch, `encode` runs the model and reduces the logits to the most
+likely token per frame, and `decode_batch` turns those tokens into text. Only
+`encode` differs between backends: the others reuse the preprocessing and
+tokenizer of the fairseq2 pipeline.
+
+- `Fairseq2Backend` runs the fairseq2 model eagerly, on any device.
+- `ExportedCTCBackend` runs the model as graphs exported ahead of time with
+  `torch.export`, one per fixed (batch size, duration) bucket, on the CPU.
+  Eager execution dispatches every operator of every layer through Python;
+  an exported graph is a flat list of ATen calls without module hooks,
+  layouts or shape checks.
+
+fairseq2's `BatchLayout` keeps sequence lengths as Python ints, which an
+export bakes into the graph. The exported graphs therefore take the length of
+each clip in frames as a tensor instead, and mask the padding themselves: the
+positional convolution sees zeros past each clip and attention ignores the
+padded frames, so every row is encoded as the eager model encodes it. This
+only holds for feature extractors that normalize each frame on its own, as the
+omniASR CTC cards do; with group norm over time the padding changes the
+features, and `create_backend` uses the `fairseq2` backend instead.
+"""
+
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+import torch
+from fairseq2.models.transformer.attention_bias import AttentionBiasCache
+from fairseq2.nn import BatchLayout
+from omnilingual_asr.models.inference.pipeline import ASRInferencePipeline
+from torch import Tensor, nn
+
+from app.cascade import collapse_repeats, frame_confidence
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+@dataclass
+class CTCBatch:
+    """Padded audio of a batch and the length of each clip in samples."""
+
+    seqs: Tensor
+    seq_lens: list[int]
+
+
+@dataclass
+class CTCFrames:
+    """Most likely token and its probability per frame, on the CPU."""
+
+    pred_ids: Tensor
+    probs: Tensor
+    seq_lens: list[int]
+
+    def row(self, i: int) -> "CTCFrames":
+        """Frames of the `i`-th clip alone, not sharing memory with the batch."""
+
+        seq_len = self.seq_lens[i]
+        return CTCFrames(
+            self.pred_ids[i : i + 1, :seq_len].clone(),
+            self.probs[i : i + 1, :seq_len].clone(),
+            [seq_len],
+        )
+
+
+class CTCBackend(ABC):
+    """Runs a CTC model for the pipelined stages."""
+
+    name: str
+
+    # Largest batch the backend accepts, None for any size
+    max_batch_size: int | None = None
+
+    def __init__(self, pipeline: ASRInferencePipeline):
+        self.pipeline = pipeline
+
+    def prepare(self, audio: bytes | dict) -> Tensor:
+        """Decode, resample and normalize one clip."""
+
+        builder = self.pipeline._build_audio_wavform_pipeline([audio])
+        return next(iter(builder.and_return()))
+
+    def collate(self, waveforms: list[Tensor]) -> CTCBatch:
+        """Pad prepared clips into a batch on the model's device."""
+
+        batch = self.pipeline._create_batch_simple(
+            [(waveform, None) for waveform in waveforms]
+        )
+        return CTCBatch(batch.source_seqs, list(batch.source_seq_lens))
+
+    @abstractmethod
+    def encode(self, batch: CTCBatch) -> CTCFrames:
+        """Run the model on a collated batch."""
+
+    def decode_batch(self, frames: CTCFrames) -> list[tuple[str, float]]:
+        """Transcript and confidence of every clip in the batch."""
+
+        results = []
+        for i, seq_len in enumerate(frames.seq_lens):
+            pred_ids = frames.pred_ids[i, :seq_len]
+            probs = frames.probs[i, :seq_len]
+            text = self.pipeline.token_decoder(collapse_repeats(pred_ids))
+            results.append((text, frame_confidence(probs, pred_ids)))
+        return results
+
+
+def _most_likely(logits: Tensor) -> tuple[Tensor, Tensor]:
+    """Probability and id of the most likely token per frame."""
+
+    return torch.softmax(logits.float(), dim=-1).max(dim=-1)
+
+
+class Fairseq2Backend(CTCBackend):
+    """Runs the fairseq2 model eagerly."""
+
+    name = "fairseq2"
+
+    def encode(self, batch: CTCBatch) -> CTCFrames:
+        batch_layout = BatchLayout(
+            batch.seqs.shape, seq_lens=batch.seq_lens, device=batch.seqs.device
+        )
+        logits, logits_layout = self.pipeline.model(batch.seqs, batch_layout)
+        probs, pred_ids = _most_likely(logits)
+        return CTCFrames(pred_ids.cpu(), probs.cpu(), list(logits_layout.seq_lens))
+
+
+class _MaskedCTC(nn.Module):
+    """CTC model over rows padded to a fixed shape, reduced to the most likely tokens.
+
+    Mirrors `Wav2Vec2AsrModel.forward` in eval mode, with the padding mask built
+    from `frame_lens` inside the graph rather than from Python ints.
+    """
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, seqs: Tensor, frame_lens: Tensor) -> tuple[Tensor, Tensor]:
+        model = self.model
+        frontend = model.encoder_frontend
+
+        features, _, _ = frontend.extract_features(
+            seqs, BatchLayout(seqs.shape, seq_lens=None)
+        )
+
+        # Padded frames get position -1, which the positional encoder zeroes
+        batch_size, frames = features.shape[:2]
+        positions = torch.arange(frames, device=seqs.device).expand(batch_size, -1)
+        valid = positions < frame_lens[:, None]
+        layout = BatchLayout((batch_size, frames), seq_lens=None)
+        layout._position_indices = torch.where(valid, positions, -1)
+        layout._padded = True
+
+        x, _ = frontend.process_features(features, layout, None)
+
+        # Frames attend to the clip's frames, padding attends to padding so no
+        # row is fully masked
+        same = valid[:, :, None] == valid[:, None, :]
+        mask = torch.zeros(batch_size, 1, frames, frames, dtype=x.dtype)
+        mask = mask.masked_fill(~same[:, None], float("-inf"))
+        bias_cache = AttentionBiasCache()
+        for layer in model.encoder.layers:
+            bias_cache.set(layer.self_attn.sdpa.bias, "tensor", mask)
+
+        for layer in model.encoder.layers:
+            x = layer(x, layout, bias_cache)
+        if model.encoder.layer_norm is not None:
+            x = model.encoder.layer_norm(x)
+
+        return _most_likely(model.final_proj(x))
+
+
+def _normalizes_over_time(model: nn.Module) -> bool:
+    """Whether the feature extractor uses group norm, which sees the padding."""
+
+    layers = model.encoder_frontend.feature_extractor.layers
+    return any(getattr(layer, "group_norm", None) is not None for layer in layers)
+
+
+class ExportedCTCBackend(CTCBackend):
+    """Runs the model as graphs exported for fixed-shape buckets."""
+
+    name = "exported"
+
+    def __init__(
+        self,
+        pipeline: ASRInferencePipeline,
+        batch_sizes: tuple[int, ...],
+        bucket_seconds: tuple[float, ...],
+    ):
+        super().__init__(pipeline)
+        self.batch_sizes = sorted(batch_sizes)
+        self.bucket_samples = sorted(
+            int(seconds * SAMPLE_RATE) for seconds in bucket_seconds
+        )
+        self.max_batch_size = self.batch_sizes[-1]
+
+        model = pipeline.model
+        self._contract_seq_lens = (
+            model.encoder_frontend.feature_extractor._contract_seq_lens
+        )
+        self._dtype = next(model.parameters()).dtype
+        self.graphs = {}
+
+        start = time.perf_counter()
+        with torch.inference_mode(False), torch.no_grad():
+            wrapper = _MaskedCTC(model)
+            for batch_size in self.batch_sizes:
+                for samples in self.bucket_samples:
+                    example = (
+                        torch.zeros(batch_size, samples, dtype=self._dtype),
+                        torch.tensor(self._contract_seq_lens([samples] * batch_size)),
+                    )
+                    exported = torch.export.export(wrapper, example)
+                    self.graphs[batch_size, samples] = exported.module()
+        logger.info(
+            f"Exported {len(self.graphs)} CTC graphs in "
+            f"{time.perf_counter() - start:.1f}s"
+        )
+
+    def bucket_for(self, batch_size: int, samples: int) -> tuple[int, int]:
+        """Smallest exported (batch size, samples) shape that fits a batch."""
+
+        try:
+            return (
+                next(size for size in self.batch_sizes if size >= batch_size),
+                next(width for width in self.bucket_samples if width >= samples),
+            )
+        except StopIteration:
+            raise ValueError(
+                f"No exported CTC graph for {batch_size} clips of "
+                f"{samples / SAMPLE_RATE:.1f}s, largest is "
+                f"{self.batch_sizes[-1]} clips of "
+                f"{self.bucket_samples[-1] / SAMPLE_RATE:.1f}s"
+            ) from None
+
+    def collate(self, waveforms: list[Tensor]) -> CTCBatch:
+        seq_lens = [waveform.size(0) for waveform in waveforms]
+        batch_size, samples = self.bucket_for(len(waveforms), max(seq_lens))
+
+        seqs = torch.zeros(batch_size, samples, dtype=self._dtype)
+        for i, waveform in enumerate(waveforms):
+            seqs[i, : seq_lens[i]] = waveform
+        return CTCBatch(seqs, seq_lens)
+
+    def encode(self, batch: CTCBatch) -> CTCFrames:
+        batch_size, samples = batch.seqs.shape
+        rows = len(batch.seq_lens)
+
+        # Rows filling out the batch are treated as full length
+        seq_lens = batch.seq_lens + [samples] * (batch_size - rows)
+        frame_lens = self._contract_seq_lens(seq_lens)
+
+        graph = self.graphs[batch_size, samples]
+        probs, pred_ids = graph(batch.seqs, torch.tensor(frame_lens))
+
+        return CTCFrames(pred_ids[:rows], probs[:rows], frame_lens[:rows])
+
+
+def create_backend(
+    name: str,
+    pipeline: ASRInferencePipeline,
+    device: str,
+    batch_sizes: tuple[int, ...],
+    bucket_seconds: tuple[float, ...],
+) -> CTCBackend:
+    """Backend `name` for `pipeline`, falling back to fairseq2 where unsupported."""
+
+    if name == ExportedCTCBackend.name:
+        if device != "cpu":
+            logger.warning(
+                f"The exported CTC backend only runs on the CPU, using "
+                f"{Fairseq2Backend.name} on {device}"
+            )
+        elif _normalizes_over_time(pipeline.model):
+            logger.warning(
+                f"The model's feature extractor normalizes over time, which "
+                f"padding to a bucket changes, using {Fairseq2Backend.name}"
+            )
+        else:
+            return ExportedCTCBackend(pipeline, batch_sizes, bucket_seconds)
+    elif name != Fairseq2Backend.name:
+        raise ValueError(f"Unknown CTC backend: {name}")
+
+    return Fairseq2Backend(pipeline)
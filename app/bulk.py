@@ -0,0 +1,317 @@
+"""
+Offline bulk transcription.
+
+Transcribes a directory or manifest of audio files without the HTTP server.
+Files are probed and decoded in worker processes, sorted by duration and
+transcribed in large batches, so the model sees little padding and is never
+idle waiting for decoding. Results are appended to a JSONL file.
+
+Nothing here imports torch, so decoding worker processes stay lightweight.
+The model is loaded by the `transcribe.py` entry point.
+
+Progress is recorded in a checkpoint file next to the output, one line per
+finished batch with the paths it covered and the output size after it. An
+interrupted run truncates the output to the last checkpointed size and skips
+the files already done, so every file is written exactly once.
+"""
+
+import itertools
+import json
+import logging
+import os
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+
+from app.audio_probe import decode_audio, probe_audio
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {".wav", ".flac", ".mp3", ".ogg", ".opus", ".m4a", ".aiff"}
+# Batches decoded ahead of the one being transcribed
+PREFETCH_BATCHES = 2
+
+
+@dataclass
+class BulkItem:
+    """An audio file to transcribe."""
+
+    path: str
+    language: str | None = None
+    duration: float | None = None
+    error: str | None = None
+
+
+def collect_inputs(source: Path, language: str | None = None) -> list[BulkItem]:
+    """
+    Audio files to transcribe from a directory or manifest.
+
+    A directory is searched recursively for audio files. A `.jsonl` manifest
+    has one `{"path": ..., "language": ...}` object per line, any other
+    manifest one path per line. Relative manifest paths are relative to the
+    manifest.
+
+    Args:
+        source: Directory or manifest file
+        language: Language for files without one in the manifest
+    """
+
+    if source.is_dir():
+        return [
+            BulkItem(str(path), language)
+            for path in sorted(source.rglob("*"))
+            if path.suffix.lower() in AUDIO_EXTENSIONS and path.is_file()
+        ]
+
+    items = []
+    for line in source.read_text().splitlines():
+        if not line.strip():
+            continue
+        if source.suffix == ".jsonl":
+            entry = json.loads(line)
+            path, item_language = entry["path"], entry.get("language", language)
+        else:
+            path, item_language = line.strip(), language
+        items.append(BulkItem(str(source.parent / path), item_language))
+    return items
+
+
+def probe_file(path: str) -> float | None:
+    """Duration of an audio file from its header, or None if unreadable."""
+
+    info = probe_audio(path)
+    return info.duration if info else None
+
+
+def decode_file(path: str) -> dict | None:
+    """Decoded audio in the pipeline's pre-decoded input format."""
+
+    decoded = decode_audio(Path(path).read_bytes())
+    if decoded is None:
+        return None
+    samples, sample_rate = decoded
+
+    # Downmix here rather than in the pipeline, halving what is sent back
+    # from the worker process for stereo audio
+    if samples.shape[1] > 1:
+        samples = samples.mean(axis=1, keepdims=True, dtype=np.float32)
+    return {"waveform": samples, "sample_rate": sample_rate}
+
+
+def plan_batches(
+    items: list[BulkItem], batch_size_for: Callable[[float], int]
+) -> list[list[BulkItem]]:
+    """
+    Group audio of similar duration into batches.
+
+    Longest audio goes first, so running out of memory shows up immediately
+    rather than hours into a run. Each batch is sized for its longest audio.
+    Items with a language are never batched with items without one, as LLM
+    models take a language for every item in a batch or for none.
+    """
+
+    batches = []
+    for has_language in (True, False):
+        group = [item for item in items if (item.language is not None) == has_language]
+        group.sort(key=lambda item: item.duration, reverse=True)
+        while group:
+            size = max(1, batch_size_for(group[0].duration))
+            batches.append(group[:size])
+            group = group[size:]
+
+    batches.sort(key=lambda batch: batch[0].duration, reverse=True)
+    return batches
+
+
+class Checkpoint:
+    """Progress of a bulk run, for resuming it."""
+
+    def __init__(self, path: Path, output_path: Path):
+        self.path = path
+        self.output_path = output_path
+
+    def resume(self) -> set[str]:
+        """
+        Paths already transcribed. Output written after the last checkpoint,
+        by a batch that did not finish, is removed.
+        """
+
+        done = set()
+        if not self.path.exists():
+            return done
+
+        output_bytes = 0
+        for line in self.path.read_text().splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Interrupted while writing the last line
+                break
+            done.update(entry["paths"])
+            output_bytes = entry["output_bytes"]
+
+        if self.output_path.exists():
+            with open(self.output_path, "r+b") as f:
+                f.truncate(output_bytes)
+        return done
+
+    def record(self, paths: list[str], output_bytes: int) -> None:
+        """Mark `paths` as done once the output holds `output_bytes` bytes."""
+
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"paths": paths, "output_bytes": output_bytes}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class ResultWriter:
+    """Context manager appending results to the JSONL output and checkpointing them."""
+
+    def __init__(self, output_path: Path, checkpoint: Checkpoint):
+        self.output_path = output_path
+        self.checkpoint = checkpoint
+
+    def __enter__(self) -> Self:
+        self.file = open(self.output_path, "ab")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.file.close()
+
+    def write(self, records: list[dict]) -> None:
+        for record in records:
+            self.file.write((json.dumps(record, ensure_ascii=False) + "\n").encode())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.checkpoint.record([record["path"] for record in records], self.file.tell())
+
+
+def probe_items(items: list[BulkItem], pool: Executor) -> None:
+    """Read the durations of `items` in parallel."""
+
+    durations = pool.map(probe_file, [item.path for item in items], chunksize=64)
+    for item, duration in zip(items, durations):
+        item.duration = duration
+        if duration is None:
+            item.error = "Could not read audio file"
+
+
+def decoded_batches(
+    batches: list[list[BulkItem]], pool: Executor
+) -> Iterator[tuple[list[BulkItem], list[dict | None]]]:
+    """Decode batches in `pool`, keeping a few batches ahead of the consumer."""
+
+    pending = deque()
+
+    def submit(batch: list[BulkItem]) -> None:
+        pending.append((batch, [pool.submit(decode_file, item.path) for item in batch]))
+
+    batches = iter(batches)
+    for batch in itertools.islice(batches, PREFETCH_BATCHES + 1):
+        submit(batch)
+
+    while pending:
+        batch, futures = pending.popleft()
+        audio = [future.result() for future in futures]
+        next_batch = next(batches, None)
+        if next_batch is not None:
+            submit(next_batch)
+        yield batch, audio
+
+
+def transcribe_batch(
+    batch: list[BulkItem],
+    audio: list[dict],
+    transcribe: Callable[[list[dict], list[str | None]], list[str]],
+) -> list[dict]:
+    """
+    Result records of a decoded batch.
+
+    If the batch fails, its files are retried one at a time, so one bad file
+    only fails itself and the run moves on past it.
+    """
+
+    try:
+        texts = transcribe(audio, [item.language for item in batch])
+    except Exception:
+        if len(batch) == 1:
+            logger.exception(f"Failed to transcribe {batch[0].path}")
+            return [{"path": batch[0].path, "error": "Could not transcribe audio"}]
+        logger.exception(
+            f"Failed to transcribe a batch of {len(batch)} files, retrying them "
+            f"one at a time"
+        )
+        return [
+            record
+            for item, decoded in zip(batch, audio)
+            for record in transcribe_batch([item], [decoded], transcribe)
+        ]
+
+    return [
+        {"path": item.path, "text": text, "duration": round(item.duration, 3)}
+        for item, text in zip(batch, texts)
+    ]
+
+
+def transcribe_items(
+    items: list[BulkItem],
+    transcribe: Callable[[list[dict], list[str | None]], list[str]],
+    writer: ResultWriter,
+    pool: Executor,
+    batch_size_for: Callable[[float], int],
+    max_audio_seconds: float | None,
+) -> None:
+    """
+    Transcribe `items` and write their results.
+
+    Args:
+        items: Audio files not transcribed yet
+        transcribe: Transcribes a batch of decoded audio with their languages
+        writer: Output for the results
+        pool: Executor for probing and decoding
+        batch_size_for: Batch size for audio of a duration in seconds
+        max_audio_seconds: Longest audio the model accepts, None if unlimited
+    """
+
+    probe_items(items, pool)
+    for item in items:
+        if max_audio_seconds is not None and (item.duration or 0) > max_audio_seconds:
+            item.error = f"Audio is longer than {max_audio_seconds} seconds"
+
+    failed = [item for item in items if item.error]
+    if failed:
+        writer.write([{"path": item.path, "error": item.error} for item in failed])
+        logger.warning(f"Skipping {len(failed)} files that cannot be transcribed")
+
+    batches = plan_batches([item for item in items if not item.error], batch_size_for)
+    total = sum(len(batch) for batch in batches)
+    done = 0
+    audio_seconds = 0.0
+    start = time.perf_counter()
+
+    for batch, audio in decoded_batches(batches, pool):
+        records = [
+            {"path": item.path, "error": "Could not decode audio file"}
+            for item, decoded in zip(batch, audio)
+            if decoded is None
+        ]
+        batch = [item for item, decoded in zip(batch, audio) if decoded is not None]
+        audio = [decoded for decoded in audio if decoded is not None]
+
+        if batch:
+            records += transcribe_batch(batch, audio, transcribe)
+        writer.write(records)
+
+        done += len(records)
+        audio_seconds += sum(item.duration for item in batch)
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Transcribed {done}/{total} files, {audio_seconds:.0f}s of audio "
+            f"at {audio_seconds / elapsed:.1f}x realtime"
+        )
@@ -0,0 +1,85 @@
+"""
+CTC-first cascade decoding.
+
+Every request is transcribed by the CTC model first. Its frame posteriors give
+a confidence score for the transcript, and only requests scoring below the
+configured threshold are decoded again by the (several times more expensive)
+LLM model.
+"""
+
+import torch
+from fairseq2.nn import BatchLayout
+from omnilingual_asr.models.inference.pipeline import ASRInferencePipeline
+from torch import Tensor
+
+# fairseq2 trains the CTC head with `ctc_loss`'s default blank index
+CTC_BLANK_IDX = 0
+
+
+def ctc_confidence(logits: Tensor) -> float:
+    """
+    Confidence of a greedy CTC decode from the logits of a single sequence.
+
+    The score is the mean probability of the most likely token over the
+    frames that emit a token. Blank frames are left out, as they dominate
+    the sequence and are almost always confident. Audio that decodes to blanks
+    only is scored over all frames.
+
+    Args:
+        logits: Logits of shape (frames, vocab)
+
+    Returns:
+        Confidence between 0 and 1
+    """
+
+    probs, pred_ids = torch.softmax(logits.float(), dim=-1).max(dim=-1)
+    return frame_confidence(probs, pred_ids)
+
+
+def frame_confidence(probs: Tensor, pred_ids: Tensor) -> float:
+    """`ctc_confidence` from the most likely token and its probability per frame."""
+
+    emitting = pred_ids != CTC_BLANK_IDX
+    if emitting.any():
+        probs = probs[emitting]
+
+    return probs.mean().item() if probs.numel() else 0.0
+
+
+def collapse_repeats(pred_ids: Tensor) -> Tensor:
+    """Greedy CTC decoding: collapse repeated tokens, the token decoder drops blanks."""
+
+    mask = torch.ones_like(pred_ids, dtype=torch.bool)
+    mask[1:] = pred_ids[1:] != pred_ids[:-1]
+    return pred_ids[mask]
+
+
+@torch.inference_mode()
+def transcribe_with_confidence(
+    pipeline: ASRInferencePipeline, audio: bytes | dict
+) -> tuple[str, float]:
+    """
+    Transcribe audio with a CTC pipeline and score the transcript.
+
+    Decoding matches `ASRInferencePipeline.transcribe` for CTC models, but the
+    logits are kept to compute the confidence.
+
+    Returns:
+        Transcribed text and its confidence
+    """
+
+    builder = pipeline._build_audio_wavform_pipeline([audio])
+    waveform = next(iter(builder.and_return()))
+    batch = pipeline._create_batch_simple([(waveform, None)])
+
+    batch_layout = BatchLayout(
+        batch.source_seqs.shape,
+        seq_lens=batch.source_seq_lens,
+        device=batch.source_seqs.device,
+    )
+    logits, logits_layout = pipeline.model(batch.source_seqs, batch_layout)
+    logits = logits[0, : logits_layout.seq_lens[0]]
+
+    text = pipeline.token_decoder(collapse_repeats(torch.argmax(logits, dim=-1)))
+
+    return text, ctc_confidence(logits)
@@ -0,0 +1,127 @@
+"""
+Pre-cast, memory-mapped model checkpoints.
+
+`scripts/preload.py` writes the model weights already cast to the serving dtype
+into a single torch checkpoint. At startup the model skeleton is created on the
+meta device and the checkpoint is memory-mapped and assigned in place, so no
+weights are copied or cast on CPU and pages are only read when first touched.
+"""
+
+import logging
+import os
+from pathlib import Path
+
+import torch
+from fairseq2.assets import AssetStore
+from fairseq2.data.tokenizers.hub import load_tokenizer
+from fairseq2.device import CPU
+from fairseq2.gang import create_fake_gangs
+from fairseq2.models.family import ModelFamily
+from fairseq2.nn.utils.module import reset_non_persistent_buffers
+from fairseq2.runtime.dependency import get_dependency_resolver
+from omnilingual_asr.models.inference.pipeline import ASRInferencePipeline
+from torch import nn
+
+from app.config import CHECKPOINT_DIR
+
+logger = logging.getLogger(__name__)
+
+
+def precast_checkpoint_path(model_name: str, dtype: torch.dtype) -> Path:
+    """Location of the pre-cast checkpoint for a model card and dtype."""
+
+    dtype_name = str(dtype).removeprefix("torch.")
+    return Path(CHECKPOINT_DIR) / f"{model_name}.{dtype_name}.pt"
+
+
+def save_precast_checkpoint(model: nn.Module, path: Path, dtype: torch.dtype) -> None:
+    """
+    Save the model's state dict with floating point tensors cast to `dtype`.
+
+    The file is written next to its final location and renamed into place, so
+    an interrupted build never leaves a truncated checkpoint behind.
+    """
+
+    state_dict = {
+        key: (tensor.to(dtype) if tensor.is_floating_point() else tensor)
+        .detach()
+        .contiguous()
+        for key, tensor in model.state_dict().items()
+    }
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    torch.save(state_dict, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def assign_precast_checkpoint(model: nn.Module, path: Path) -> nn.Module:
+    """
+    Memory-map the checkpoint at `path` and assign its tensors to `model`.
+
+    `model` is expected to live on the meta device. Its parameters and
+    persistent buffers are replaced by tensors backed by the mapped file, and
+    non-persistent buffers (which are not part of the state dict) are
+    materialized on CPU and re-initialized.
+    """
+
+    state_dict = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    model.load_state_dict(state_dict, strict=True, assign=True)
+
+    for module in model.modules():
+        for name, buffer in module.named_buffers(recurse=False):
+            if buffer is not None and buffer.is_meta:
+                module.register_buffer(
+                    name, torch.empty_like(buffer, device="cpu"), persistent=False
+                )
+
+    reset_non_persistent_buffers(model)
+    return model
+
+
+def load_precast_model(model_name: str, path: Path, dtype: torch.dtype) -> nn.Module:
+    """Create the model for `model_name` without weights and load them from `path`."""
+
+    resolver = get_dependency_resolver()
+    card = resolver.resolve(AssetStore).retrieve_card(model_name)
+
+    family_name = card.field("model_family").as_(str)
+    family = resolver.resolve_optional(ModelFamily, key=family_name)
+    if family is None:
+        raise RuntimeError(f"Unknown model family {family_name} for {model_name}")
+
+    config = family.get_model_config(card)
+    model = family.create_new_model(
+        config, create_fake_gangs(CPU), dtype, meta=family.supports_meta
+    )
+
+    return assign_precast_checkpoint(model, path)
+
+
+def load_pipeline(
+    model_name: str, device: str, dtype: torch.dtype
+) -> ASRInferencePipeline:
+    """Create the inference pipeline for `model_name`, preferring a pre-cast checkpoint."""
+
+    logger.info(f"Loading model {model_name} on {device}...")
+
+    # Prefer the pre-cast checkpoint from scripts/preload.py: it is
+    # memory-mapped in the target dtype instead of loaded and cast
+    checkpoint_path = precast_checkpoint_path(model_name, dtype)
+    if checkpoint_path.exists():
+        logger.info(f"Using pre-cast checkpoint {checkpoint_path}")
+        model = load_precast_model(model_name, checkpoint_path, dtype)
+        pipeline = ASRInferencePipeline(
+            model_card=None,
+            model=model,
+            tokenizer=load_tokenizer(model_name),
+            device=device,
+            dtype=dtype,
+        )
+    else:
+        pipeline = ASRInferencePipeline(
+            model_card=model_name, device=device, dtype=dtype
+        )
+    logger.info(f"Model {model_name} loaded successfully on {device}")
+
+    return pipeline
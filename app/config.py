@@ -10,3 +10,97 @@ import os
 # - omniASR_LLM_{300M,1B,3B,7B}_v2: Language-conditioned autoregressive
 # - omniASR_LLM_Unlimited_{300M,1B,3B,7B}_v2: Unlimited audio length
 MODEL_NAME = os.getenv("MODEL_NAME", "omniASR_CTC_300M_v2")
+
+# Directory with pre-cast, memory-mappable checkpoints written by
+# scripts/preload.py. When no checkpoint matches the model and dtype, the
+# fairseq2 checkpoint is loaded and cast at startup instead.
+CHECKPOINT_DIR = os.getenv(
+    "OMNILINGUAL_CHECKPOINT_DIR", os.path.expanduser("~/.cache/omniasr-server")
+)
+
+# LLM models decode with continuous (iteration-level) batching: finished
+# sequences leave the batch and new requests join between decoder steps.
+LLM_CONTINUOUS_BATCHING = os.getenv("LLM_CONTINUOUS_BATCHING", "true").lower() == "true"
+# Maximum number of sequences decoded at once (KV cache slots). 0 uses the
+# autotuned batch size for the longest audio, or 32 without a tuning profile.
+LLM_MAX_ACTIVE_SEQUENCES = int(os.getenv("LLM_MAX_ACTIVE_SEQUENCES", "0"))
+# Maximum number of decoder batches stepped per iteration
+LLM_MAX_COHORTS = int(os.getenv("LLM_MAX_COHORTS", "4"))
+# Languages (comma-separated, any accepted spelling) whose language-conditioning
+# tokens are embedded when the model loads rather than on first use
+LLM_PRELOAD_LANGUAGES = tuple(
+    language
+    for language in os.getenv("LLM_PRELOAD_LANGUAGES", "").split(",")
+    if language
+)
+
+# CTC models run decode, collate, forward pass and token decoding as
+# concurrent stages, so the model never waits for audio decoding
+CTC_PIPELINED_STAGES = os.getenv("CTC_PIPELINED_STAGES", "true").lower() == "true"
+# Threads decoding audio for the pipelined stages
+CTC_DECODE_THREADS = int(os.getenv("CTC_DECODE_THREADS", "2"))
+# Maximum CTC batch size. 0 uses the autotuned batch size for each audio
+# duration, or 8 without a tuning profile.
+CTC_MAX_BATCH_SIZE = int(os.getenv("CTC_MAX_BATCH_SIZE", "0"))
+# Backend running the CTC model in the pipelined stages:
+# - fairseq2: the fairseq2 model, run eagerly on any device
+# - exported: graphs exported ahead of time with torch.export, CPU only
+CTC_BACKEND = os.getenv("CTC_BACKEND", "fairseq2")
+# Batch sizes and audio durations (seconds) the exported backend builds a
+# graph for, every combination is exported at startup
+CTC_EXPORT_BATCH_SIZES = tuple(
+    int(size) for size in os.getenv("CTC_EXPORT_BATCH_SIZES", "1,4,8").split(",")
+)
+CTC_EXPORT_BUCKET_SECONDS = tuple(
+    float(seconds)
+    for seconds in os.getenv("CTC_EXPORT_BUCKET_SECONDS", "5,10,20,40").split(",")
+)
+
+# Memory budget (MB) for cached encoder outputs, keyed by audio content and
+# model, so a clip sent again (e.g. with another language or response format)
+# skips the encoder. 0 disables the cache.
+ENCODER_CACHE_MB = int(os.getenv("ENCODER_CACHE_MB", "256"))
+
+# CTC-first cascade: requests are transcribed by the CTC model set in
+# MODEL_NAME and only low-confidence transcripts are decoded again by this LLM
+# model (e.g. omniASR_LLM_300M_v2). Empty disables the cascade.
+CASCADE_LLM_MODEL_NAME = os.getenv("CASCADE_LLM_MODEL_NAME", "")
+# CTC transcripts with a confidence below this threshold (0-1) are escalated
+CASCADE_CONFIDENCE_THRESHOLD = float(os.getenv("CASCADE_CONFIDENCE_THRESHOLD", "0.9"))
+
+# Requests transcribed at once. Further requests queue in the fair scheduler
+# and are admitted by priority class and tenant weight. 0 picks a default for
+# the model: the LLM engine's sequence slots, or 1 for CTC models.
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "0"))
+# Requests transcribed at once per tenant (0 for no per-tenant cap)
+TENANT_MAX_CONCURRENCY = int(os.getenv("TENANT_MAX_CONCURRENCY", "0"))
+# Share of the server per tenant in audio-seconds, as `tenant=weight,...`.
+# Tenants not listed have weight 1.
+TENANT_WEIGHTS = os.getenv("TENANT_WEIGHTS", "")
+# Tenants reported under their own metric labels, the busiest first. The rest
+# are summed under `tenant="other"`.
+TENANT_METRICS_MAX = int(os.getenv("TENANT_METRICS_MAX", "50"))
+
+# Benchmark dtype, thread counts and batch sizes at startup when no tuning
+# profile exists for this model and hardware yet. Saved profiles are always
+# used, `python -m scripts.autotune` creates one ahead of time.
+AUTOTUNE = os.getenv("AUTOTUNE", "false").lower() == "true"
+# Directory for tuning profiles
+AUTOTUNE_PROFILE_DIR = os.getenv("AUTOTUNE_PROFILE_DIR", CHECKPOINT_DIR)
+
+# Bearer token for the /admin endpoints. Empty disables them.
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+# Directory for traces written by /admin/profile
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/omniasr-profiles")
+# Upper bound on the length of a profiling session, in seconds
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))
+
+# Front-end worker processes (0 to serve everything from one process). Workers
+# parse uploads and decode audio, then hand the samples to the engine process
+# through shared memory, so the model is loaded only once.
+FRONTEND_WORKERS = int(os.getenv("FRONTEND_WORKERS", "0"))
+# Unix socket the engine process accepts front-end workers on
+ENGINE_SOCKET = os.getenv("ENGINE_SOCKET", "/tmp/omniasr-engine.sock")
+# Shared-memory ring buffer per front-end worker, in MiB. Audio that does not
+# fit is sent to the engine undecoded.
+FRONTEND_SHM_MB = int(os.getenv("FRONTEND_SHM_MB", "64"))
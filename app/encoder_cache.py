@@ -0,0 +1,119 @@
+"""
+Cache of encoder outputs.
+
+Clients often send the same clip again, with another language hint to retry
+LLM decoding or another response format. The audio encoder dominates the cost
+of a request, so its output is kept in a bounded LRU cache keyed by a hash of
+the audio and the model card, and only the decoder runs on a hit:
+
+- CTC models cache the most likely token and its probability per frame, which
+  is all token decoding needs and far smaller than the encoder states.
+- LLM models cache the projected audio embeddings, which the language and BOS
+  tokens are appended to before the decoder runs.
+
+Cached tensors stay on the model's device. Entries are evicted, least
+recently used first, to keep the bytes held within `ENCODER_CACHE_MB`.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+
+import numpy as np
+from torch import Tensor
+
+from app.config import ENCODER_CACHE_MB
+from app.metrics import metrics, ratio
+
+
+def audio_digest(audio: bytes | dict) -> str:
+    """Hash identifying raw or decoded audio by content."""
+
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(audio, dict):
+        h.update(str(audio["sample_rate"]).encode())
+        h.update(np.ascontiguousarray(audio["waveform"]).data)
+    else:
+        h.update(audio)
+    return h.hexdigest()
+
+
+def nbytes(value: object) -> int:
+    """Bytes held by the tensors in `value`, a tensor or a dataclass of tensors."""
+
+    if isinstance(value, Tensor):
+        return value.nbytes
+    if is_dataclass(value):
+        return sum(nbytes(getattr(value, f.name)) for f in fields(value))
+    return 0
+
+
+class EncoderCache:
+    """Thread-safe LRU cache of encoder outputs with a memory budget."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[object, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, model_name: str, digest: str) -> object | None:
+        """Cached output of `model_name` for the audio with `digest`, if any."""
+
+        with self._lock:
+            entry = self._entries.get((model_name, digest))
+            if entry is not None:
+                self._entries.move_to_end((model_name, digest))
+
+        metrics.increment(
+            "encoder_cache_hits_total" if entry else "encoder_cache_misses_total"
+        )
+        return entry[0] if entry else None
+
+    def put(self, model_name: str, digest: str, value: object) -> None:
+        """Cache `value`, evicting the least recently used entries to fit it."""
+
+        size = nbytes(value)
+        if size > self.max_bytes:
+            return
+
+        key = (model_name, digest)
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            while self.bytes + size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+            self._entries[key] = (value, size)
+            self.bytes += size
+
+    def drop(self, model_name: str) -> None:
+        """Remove all entries of `model_name`, e.g. when the model is unloaded."""
+
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == model_name]:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "encoder_cache_bytes": self.bytes,
+            "encoder_cache_entries": len(self._entries),
+            "encoder_cache_hit_rate": ratio(
+                metrics.get("encoder_cache_hits_total"),
+                metrics.get("encoder_cache_hits_total")
+                + metrics.get("encoder_cache_misses_total"),
+            ),
+        }
+
+
+# Global encoder cache
+encoder_cache = EncoderCache(ENCODER_CACHE_MB * 1024 * 1024)
+metrics.register_collector(encoder_cache.stats)
@@ -0,0 +1,199 @@
+"""
+Engine side of the front-end worker handoff.
+
+Listens on a Unix socket for front-end workers. Each worker announces its
+shared-memory ring buffer when it connects, then sends transcription requests
+that point into the ring. Requests are admitted and transcribed exactly like
+requests to the transcription endpoint, and the text or error is sent back.
+
+Workers also forward the routes that report or change engine state (`/load`,
+`/metrics`, `/v1/models`, `/admin/...`), which are run through the engine's
+own app. Every message to a worker carries the engine's length limit and load
+report, so workers can reject over-length audio before decoding it and add
+the `X-Load-Report` header to their responses.
+"""
+
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+from contextlib import asynccontextmanager
+from multiprocessing.shared_memory import SharedMemory
+
+from starlette.types import ASGIApp, Message
+
+from app.config import ENGINE_SOCKET, FRONTEND_WORKERS
+from app.exceptions import APIError
+from app.load import load_report, load_report_header
+from app.metrics import metrics
+from app.routes import transcribe_audio
+from app.scheduler import Priority
+from app.service import asr_service
+from app.shm import attach_shared_memory, read_message, read_samples, send_message
+
+logger = logging.getLogger(__name__)
+
+
+def engine_status() -> dict:
+    """Engine state sent to workers with every message."""
+
+    return {
+        "max_audio_seconds": asr_service.max_audio_seconds,
+        "load": load_report_header(load_report()),
+    }
+
+
+async def handle_request(shm: SharedMemory, header: dict, payload: bytes) -> dict:
+    """Transcribe one front-end request and build the reply."""
+
+    if payload:
+        # The worker could not decode the file, let the model's decoder try
+        audio = payload
+    else:
+        audio = {
+            "waveform": read_samples(shm, header["offset"], header["shape"]),
+            "sample_rate": header["sample_rate"],
+        }
+
+    try:
+        text = await transcribe_audio(
+            audio,
+            filename=header["filename"],
+            language=header["language"],
+            tenant=header["tenant"],
+            priority=Priority[header["priority"]],
+            duration=header["duration"],
+        )
+    except APIError as e:
+        return {
+            "id": header["id"],
+            "error": {
+                "status_code": e.status_code,
+                "message": e.message,
+                "error_type": e.error_type,
+                "param": e.param,
+                "code": e.code,
+            },
+        }
+
+    return {"id": header["id"], "text": text}
+
+
+async def handle_http(app: ASGIApp, header: dict, body: bytes) -> tuple[dict, bytes]:
+    """Run an HTTP request forwarded by a front-end worker through `app`."""
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": header["method"],
+        "scheme": "http",
+        "path": header["path"],
+        "raw_path": header["path"].encode(),
+        "query_string": header["query"].encode(),
+        "root_path": "",
+        "headers": [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in header["headers"]
+        ],
+        "client": None,
+        "server": None,
+    }
+    response = {"status": 500, "headers": []}
+    chunks = []
+    request_sent = False
+    response_sent = asyncio.Event()
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_sent.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = [
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, value in message.get("headers", [])
+            ]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_sent.set()
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        logger.exception(
+            f"Forwarded request {header['method']} {header['path']} failed"
+        )
+        if not response_sent.is_set():
+            response, chunks = {"status": 500, "headers": []}, []
+
+    return {"id": header["id"]} | response, b"".join(chunks)
+
+
+async def serve_frontend(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, app: ASGIApp
+) -> None:
+    """Serve one front-end worker connection until it closes."""
+
+    hello, _ = await read_message(reader)
+    shm = attach_shared_memory(hello["shm"])
+    logger.info(f"Front-end worker {hello['pid']} connected")
+    metrics.increment("frontend_connections_total")
+    await send_message(writer, {"engine": engine_status()})
+
+    tasks: set[asyncio.Task] = set()
+
+    async def respond(header: dict, payload: bytes) -> None:
+        if header["type"] == "http":
+            reply, body = await handle_http(app, header, payload)
+        else:
+            reply, body = await handle_request(shm, header, payload), b""
+        await send_message(writer, reply | {"engine": engine_status()}, body)
+
+    try:
+        while True:
+            header, payload = await read_message(reader)
+            task = asyncio.create_task(respond(header, payload))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        logger.info(f"Front-end worker {hello['pid']} disconnected")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        writer.close()
+        # Views into the buffer may outlive a cancelled request briefly
+        with contextlib.suppress(BufferError):
+            shm.close()
+
+
+@asynccontextmanager
+async def frontend_listener(app: ASGIApp):
+    """Accept front-end worker connections to `app` while it runs, if enabled."""
+
+    if not FRONTEND_WORKERS:
+        yield
+        return
+
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(ENGINE_SOCKET)
+
+    server = await asyncio.start_unix_server(
+        functools.partial(serve_frontend, app=app), path=ENGINE_SOCKET
+    )
+    logger.info(f"Accepting front-end workers on {ENGINE_SOCKET}")
+    try:
+        yield
+    finally:
+        server.close()
+        await server.wait_closed()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(ENGINE_SOCKET)
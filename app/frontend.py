@@ -0,0 +1,310 @@
+"""
+Front-end worker app for multi-worker serving.
+
+Run as several uvicorn workers in front of one engine process. Workers accept
+uploads, probe and decode audio and format responses, and never import torch.
+Decoded audio is written to the worker's shared-memory ring buffer and only
+its location is sent to the engine, which runs admission and inference.
+
+Routes that report or change engine state (`/v1/models`, `/load`, `/metrics`,
+`/admin/...`) are forwarded to the engine over the same socket, and every
+response carries the engine's latest `X-Load-Report`.
+"""
+
+import asyncio
+import functools
+import itertools
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Form, Header, Request, Response, UploadFile
+from fastapi.exceptions import RequestValidationError
+
+from app import __version__
+from app.audio_probe import decode_audio, probe_audio
+from app.config import ENGINE_SOCKET, FRONTEND_SHM_MB, MODEL_NAME
+from app.exceptions import APIError
+from app.handlers import api_error_handler, validation_error_handler
+from app.scheduler import Priority, resolve_tenant
+from app.shm import SharedAudioBuffer, read_message, send_message
+from app.uploads import (
+    check_audio_length,
+    parse_priority,
+    read_upload,
+    transcription_response,
+)
+
+logger = logging.getLogger(__name__)
+
+# Delay between attempts to connect to the engine process
+RECONNECT_DELAY_SECONDS = 1.0
+
+
+class EngineClient:
+    """Connection from a front-end worker to the engine process."""
+
+    def __init__(self, socket_path: str, buffer_size: int):
+        self.socket_path = socket_path
+        self.buffer = SharedAudioBuffer(buffer_size)
+        self._writer: asyncio.StreamWriter | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._task: asyncio.Task | None = None
+        self._frees: set[asyncio.Task] = set()
+
+        # Engine state, updated with every message from the engine
+        self.max_audio_seconds: float | None = None
+        self.load_report: str | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.buffer.close()
+
+    async def _run(self) -> None:
+        """Keep a connection to the engine and route its replies."""
+
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path)
+            except OSError:
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+                continue
+
+            await send_message(
+                writer, {"type": "hello", "shm": self.buffer.name, "pid": os.getpid()}
+            )
+            self._writer = writer
+            logger.info(f"Connected to engine at {self.socket_path}")
+
+            try:
+                while True:
+                    reply, payload = await read_message(reader)
+                    self.max_audio_seconds = reply["engine"]["max_audio_seconds"]
+                    self.load_report = reply["engine"]["load"]
+                    future = self._pending.pop(reply.get("id"), None)
+                    if future and not future.done():
+                        future.set_result((reply, payload))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.warning("Lost connection to engine, reconnecting")
+            finally:
+                self._writer = None
+                writer.close()
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(_engine_unavailable())
+                self._pending.clear()
+
+    async def transcribe(
+        self,
+        audio_bytes: bytes,
+        *,
+        filename: str,
+        language: str | None,
+        tenant: str,
+        priority: Priority,
+        duration: float | None,
+    ) -> str:
+        """
+        Transcribe audio in the engine process.
+
+        Audio is decoded here and passed through shared memory. Audio that
+        cannot be decoded here, or does not fit the buffer, is sent as is.
+        """
+
+        if not self.connected:
+            raise _engine_unavailable()
+
+        header = {
+            "type": "transcribe",
+            "filename": filename,
+            "language": language,
+            "tenant": tenant,
+            "priority": priority.name,
+            "duration": duration,
+        }
+
+        decoded = await asyncio.to_thread(decode_audio, audio_bytes)
+        offset = None
+        payload = audio_bytes
+        if decoded is not None and decoded[0].nbytes <= self.buffer.size:
+            samples, sample_rate = decoded
+            offset = await self.buffer.write(samples)
+            header |= {
+                "offset": offset,
+                "shape": list(samples.shape),
+                "sample_rate": sample_rate,
+            }
+            payload = b""
+
+        reply, _ = await self._call(header, payload, offset)
+        if "error" in reply:
+            raise APIError(**reply["error"])
+        return reply["text"]
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        query: str,
+        headers: list[tuple[str, str]],
+        body: bytes,
+    ) -> tuple[int, list[tuple[str, str]], bytes]:
+        """Run an HTTP request in the engine's app, returning status, headers and body."""
+
+        header = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query": query,
+            "headers": headers,
+        }
+        reply, payload = await self._call(header, body)
+        return reply["status"], [tuple(item) for item in reply["headers"]], payload
+
+    async def _call(
+        self, header: dict, payload: bytes, offset: int | None = None
+    ) -> tuple[dict, bytes]:
+        """Send a message to the engine and wait for its reply."""
+
+        future = asyncio.get_running_loop().create_future()
+        if offset is not None:
+            # The engine reads the samples until it replies, so the ring space
+            # is freed only on the reply or a lost connection, even if this
+            # request is cancelled first
+            future.add_done_callback(functools.partial(self._free, offset))
+
+        if not self.connected:
+            future.cancel()
+            raise _engine_unavailable()
+
+        header["id"] = next(self._ids)
+        self._pending[header["id"]] = future
+        await send_message(self._writer, header, payload)
+        return await asyncio.shield(future)
+
+    def _free(self, offset: int, future: asyncio.Future) -> None:
+        """Free the ring space of a request once the engine is done with it."""
+
+        if not future.cancelled():
+            # Retrieve the error, nobody awaits a cancelled request's reply
+            future.exception()
+        task = asyncio.create_task(self.buffer.free(offset))
+        self._frees.add(task)
+        task.add_done_callback(self._frees.discard)
+
+
+def _engine_unavailable() -> APIError:
+    return APIError(
+        status_code=503,
+        message="The transcription engine is not available. Retry shortly.",
+        error_type="server_error",
+    )
+
+
+engine_client: EngineClient | None = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create this worker's buffer and connect to the engine."""
+    global engine_client
+
+    engine_client = EngineClient(ENGINE_SOCKET, FRONTEND_SHM_MB * 1024 * 1024)
+    engine_client.start()
+    yield
+    await engine_client.close()
+
+
+app = FastAPI(
+    title="Omnilingual-ASR Server",
+    description="OpenAI Whisper-compatible API for Omnilingual-ASR",
+    version=__version__,
+    lifespan=lifespan,
+)
+
+app.add_exception_handler(APIError, api_error_handler)
+app.add_exception_handler(RequestValidationError, validation_error_handler)
+
+
+@app.middleware("http")
+async def add_load_report_header(request: Request, call_next):
+    """Pass on the engine's latest load report, see `app.load`."""
+    response = await call_next(request)
+    if engine_client.load_report is not None:
+        response.headers.setdefault("X-Load-Report", engine_client.load_report)
+    return response
+
+
+@app.get("/health-check")
+async def health_check():
+    """Health check endpoint."""
+    return "ok"
+
+
+@app.get("/v1/models")
+@app.get("/load")
+@app.get("/metrics")
+@app.api_route("/admin/{path:path}", methods=["GET", "POST"])
+async def forward_to_engine(request: Request):
+    """Serve routes on engine state from the engine, see `app.routes` and `app.admin`."""
+    status, headers, body = await engine_client.request(
+        request.method,
+        request.url.path,
+        request.url.query,
+        [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in request.headers.raw
+        ],
+        await request.body(),
+    )
+    return Response(body, status_code=status, headers=dict(headers))
+
+
+@app.post("/v1/audio/transcriptions")
+async def transcribe(
+    file: UploadFile,
+    model: str = Form(default=MODEL_NAME),
+    language: str | None = Form(default=None),
+    prompt: str | None = Form(default=None),
+    response_format: str = Form(default="json"),
+    temperature: float = Form(default=0.0),
+    timestamp_granularities: str | None = Form(default=None),
+    authorization: str | None = Header(default=None),
+    x_tenant_id: str | None = Header(default=None),
+    x_priority: str = Header(default="interactive"),
+):
+    """OpenAI Whisper-compatible transcription endpoint, see `app.routes`."""
+    priority = parse_priority(x_priority)
+    audio_bytes = await read_upload(file)
+
+    audio_info = probe_audio(audio_bytes)
+    duration = audio_info.duration if audio_info else None
+
+    logger.info(
+        f"Transcription request: file={file.filename}, language={language}, "
+        f"format={response_format}, duration={duration}"
+    )
+
+    # Reject over-length audio before decoding it, the engine checks it again
+    check_audio_length(duration, engine_client.max_audio_seconds)
+
+    text = await engine_client.transcribe(
+        audio_bytes,
+        filename=file.filename,
+        language=language,
+        tenant=resolve_tenant(x_tenant_id, authorization),
+        priority=priority,
+        duration=duration,
+    )
+
+    return transcription_response(text, response_format)
@@ -2,6 +2,7 @@
 Language mappings for ASR systems.
 """
 
+import functools
 import logging
 
 from omnilingual_asr.models.wav2vec2_llama.lang_ids import supported_langs
@@ -328,6 +329,34 @@ WHISPER_TO_OMNILINGUAL: dict[str, str] = {
 }
 
 
+DEFAULT_LANGUAGE = "eng_Latn"
+
+
+def _build_language_index() -> dict[str, str]:
+    """
+    Every accepted spelling of a language mapped to its Omnilingual-ASR code:
+    native codes as written and lowercased, and Whisper codes and names.
+    """
+
+    index = {}
+    for code in OMNILINGUAL_ASR_LANGUAGES:
+        index[code.lower()] = code
+    index.update(WHISPER_TO_OMNILINGUAL)
+    for code in OMNILINGUAL_ASR_LANGUAGES:
+        index[code] = code
+    return index
+
+
+LANGUAGE_INDEX: dict[str, str] = _build_language_index()
+
+
+@functools.lru_cache(maxsize=1024)
+def _warn_unknown_language(language: str) -> None:
+    """Log an unknown language once rather than on every request."""
+
+    logger.warning(f"Unknown language: {language}. Defaulting to '{DEFAULT_LANGUAGE}'.")
+
+
 def map_whisper_to_omnilingual(language: str) -> str:
     """
     Map Whisper/OpenAI language codes to Omnilingual-ASR format.
@@ -338,12 +367,14 @@ def map_whisper_to_omnilingual(language: str) -> str:
     Returns:
         Omnilingual-ASR language code
     """
-    lang_lower = language.lower()
-    if lang_lower in WHISPER_TO_OMNILINGUAL:
-        return WHISPER_TO_OMNILINGUAL[lang_lower]
+    code = LANGUAGE_INDEX.get(language)
+    if code is not None:
+        return code
 
-    if language in OMNILINGUAL_ASR_LANGUAGES:
-        return language
+    # Only spellings in another case need normalizing
+    code = LANGUAGE_INDEX.get(language.lower())
+    if code is not None:
+        return code
 
-    logger.warning(f"Unknown language: {language}. Defaulting to 'eng_Latn'.")
-    return "eng_Latn"
+    _warn_unknown_language(language)
+    return DEFAULT_LANGUAGE
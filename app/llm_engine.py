@@ -0,0 +1,485 @@
+"""
+Continuous (iteration-level) batching for the LLM autoregressive decoder.
+
+Requests are scheduled between decoder steps instead of per static batch:
+finished sequences leave immediately and new requests join after their
+encoder pass. The fairseq2 decoder keeps a single step counter per KV cache
+(`IncrementalStateBag`), so sequences that share a cache must sit at the same
+position. Active sequences are therefore grouped into cohorts, one batched KV
+cache each. A new sequence joins a running cohort at step `t` when its decoder
+context is longer than `t`: its first `t` context positions are prefilled and
+merged into the cohort's cache, and the rest of its context is fed step by step
+alongside the other rows, exactly like the upstream beam search handles mixed
+context lengths. Otherwise it starts a new cohort.
+
+A decoder context is the request's audio embeddings followed by its
+language-conditioning tokens (`[<lid marker> lang] <bos>`). Those tokens only
+depend on the language, so their embeddings are computed once per language
+and appended to the encoder output instead of running the model's syntax
+builder per batch. With an encoder cache, a clip seen before skips the
+encoder and only the language tokens are appended.
+"""
+
+import logging
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+import numpy as np
+import torch
+from fairseq2.models.transformer import FullAttentionState
+from fairseq2.nn import BatchLayout, IncrementalStateBag
+from omnilingual_asr.models.inference.pipeline import ASRInferencePipeline
+from omnilingual_asr.models.wav2vec2_llama.config import ModelType
+from omnilingual_asr.models.wav2vec2_llama.model import Wav2Vec2LlamaModel
+from omnilingual_asr.models.wav2vec2_llama.syntax import lang_id_getter
+from torch import Tensor
+
+from app.encoder_cache import EncoderCache, audio_digest
+from app.profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+
+def supports_continuous_batching(pipeline: ASRInferencePipeline) -> bool:
+    """Whether the pipeline's model can be served by `LLMDecodeEngine`."""
+
+    model = pipeline.model
+    return (
+        isinstance(model, Wav2Vec2LlamaModel)
+        and model.model_type in (ModelType.LLM_ASR, ModelType.LLM_ASR_LID)
+        and not pipeline.streaming_config.is_streaming
+    )
+
+
+@dataclass
+class _Sequence:
+    """A single request being decoded."""
+
+    future: Future
+    audio: bytes | dict | None = None
+    lang: str | None = None
+    # Audio hash, set when audio embeddings are cached
+    digest: str | None = None
+    context: Tensor | None = None
+    tokens: list[int] = field(default_factory=list)
+    next_input: Tensor | None = None
+
+    @property
+    def context_len(self) -> int:
+        return self.context.size(0)
+
+
+@dataclass
+class _Cohort:
+    """Sequences sharing one batched KV cache, all at the same decoder step."""
+
+    state_bag: IncrementalStateBag
+    sequences: list[_Sequence]
+
+    @property
+    def step_nr(self) -> int:
+        return self.state_bag.step_nr
+
+
+class KVCachePool:
+    """
+    Bounded pool of KV cache slots.
+
+    Every active sequence holds one slot from admission until it finishes, so
+    the number of rows across all cohort caches never exceeds `max_slots`.
+    """
+
+    def __init__(self, max_slots: int):
+        self.max_slots = max_slots
+        self.used_slots = 0
+        self._state_bags: list[IncrementalStateBag] = []
+
+    @property
+    def free_slots(self) -> int:
+        return self.max_slots - self.used_slots
+
+    def acquire(self, n: int) -> None:
+        if n > self.free_slots:
+            raise RuntimeError(f"KV cache pool exhausted: {n} > {self.free_slots}")
+        self.used_slots += n
+
+    def release(self, n: int) -> None:
+        self.used_slots -= n
+
+    def new_state_bag(self, max_num_steps: int) -> IncrementalStateBag:
+        state_bag = IncrementalStateBag(max_num_steps)
+        self._state_bags.append(state_bag)
+        return state_bag
+
+    def drop_state_bag(self, state_bag: IncrementalStateBag) -> None:
+        self._state_bags.remove(state_bag)
+
+    def capacity_bytes(self) -> int:
+        """Bytes reserved by the KV caches of all live cohorts."""
+
+        return sum(state_bag.capacity_bytes() for state_bag in self._state_bags)
+
+
+class LLMDecodeEngine:
+    """Iteration-level scheduler for `omniASR_LLM_*` models."""
+
+    def __init__(
+        self,
+        pipeline: ASRInferencePipeline,
+        max_active_sequences: int = 32,
+        max_cohorts: int = 4,
+        cache: EncoderCache | None = None,
+        model_name: str = "",
+    ):
+        self.pipeline = pipeline
+        self.model = pipeline.model
+        self.cache = cache
+        self.model_name = model_name
+        self.max_cohorts = max_cohorts
+        self.kv_pool = KVCachePool(max_active_sequences)
+
+        vocab_info = self.model.target_vocab_info
+        self.eos_idx = vocab_info.eos_idx
+        self.max_steps = self.model.max_generation_length
+
+        config = pipeline.beam_search_generator.config
+        self.compression_window = config.compression_window
+        self.compression_threshold = config.compression_threshold
+
+        # Embedded language and BOS tokens per language, see `language_context`
+        self._language_contexts: dict[str | None, Tensor] = {}
+        self._pending: deque[_Sequence] = deque()
+        self._waiting: list[_Sequence] = []
+        self._cohorts: list[_Cohort] = []
+        self._wakeup = threading.Condition()
+        self._stopped = False
+        self._thread: threading.Thread | None = None
+
+    @property
+    def active_sequences(self) -> int:
+        return self.kv_pool.used_slots
+
+    @property
+    def pending_sequences(self) -> int:
+        return len(self._pending)
+
+    @property
+    def active_cohorts(self) -> int:
+        return len(self._cohorts)
+
+    def start(self) -> None:
+        """Start the decode loop in a background thread."""
+
+        self._thread = threading.Thread(
+            target=self._run, name="llm-decode-engine", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the decode loop and fail any request still queued."""
+
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        for sequence in [*self._pending, *self._waiting]:
+            sequence.future.set_exception(RuntimeError("Decode engine stopped"))
+        for cohort in self._cohorts:
+            for sequence in cohort.sequences:
+                sequence.future.set_exception(RuntimeError("Decode engine stopped"))
+
+    def submit(self, audio: bytes | dict, lang: str | None = None) -> Future:
+        """Queue raw or decoded audio for transcription. The future resolves to the text."""
+
+        return self._enqueue(_Sequence(future=Future(), audio=audio, lang=lang))
+
+    def submit_context(self, context: Tensor) -> Future:
+        """Queue an already-embedded decoder context of shape (S, M)."""
+
+        return self._enqueue(_Sequence(future=Future(), context=context))
+
+    def _enqueue(self, sequence: _Sequence) -> Future:
+        with self._wakeup:
+            self._pending.append(sequence)
+            self._wakeup.notify()
+        return sequence.future
+
+    def _run(self) -> None:
+        with torch.inference_mode():
+            while True:
+                with self._wakeup:
+                    while not self._stopped and not self._has_work():
+                        self._wakeup.wait()
+                    if self._stopped:
+                        return
+                    admitted = self._take_pending()
+
+                try:
+                    with profiler.batch("llm_decode_iteration"):
+                        self._admit(admitted)
+                        for cohort in list(self._cohorts):
+                            self._step(cohort)
+                except Exception as e:
+                    logger.exception("Decode engine iteration failed")
+                    self._fail_all(e)
+
+    def _has_work(self) -> bool:
+        return bool(self._cohorts or self._waiting or self._pending)
+
+    def _take_pending(self) -> list[_Sequence]:
+        n = min(self.kv_pool.free_slots, len(self._pending))
+        return [self._pending.popleft() for _ in range(n)]
+
+    def _admit(self, admitted: list[_Sequence]) -> None:
+        """Encode newly admitted requests and place them into cohorts."""
+
+        to_encode = [s for s in admitted if s.context is None]
+        if to_encode:
+            self._encode(to_encode)
+
+        ready = [s for s in admitted if s.context is not None]
+        self.kv_pool.acquire(len(ready))
+
+        candidates = self._waiting + ready
+        self._waiting = []
+
+        # Join the running cohort with the most rows that can take the sequence
+        for cohort in sorted(self._cohorts, key=lambda c: -len(c.sequences)):
+            joiners = [s for s in candidates if cohort.step_nr < s.context_len]
+            if joiners:
+                self._join(cohort, joiners)
+                candidates = [s for s in candidates if s not in joiners]
+
+        if candidates:
+            if len(self._cohorts) < self.max_cohorts:
+                self._cohorts.append(self._prefill(candidates))
+            else:
+                self._waiting = candidates
+
+    def _encode(self, sequences: list[_Sequence]) -> None:
+        """Run the encoder for newly admitted requests and build their decoder contexts."""
+
+        decoded = []
+        for sequence in sequences:
+            try:
+                if self._context_from_cache(sequence):
+                    continue
+                builder = self.pipeline._build_audio_wavform_pipeline([sequence.audio])
+                decoded.append((next(iter(builder.and_return())), sequence))
+            except Exception as e:
+                logger.exception("Decoding LLM request audio failed")
+                sequence.future.set_exception(e)
+
+        if decoded:
+            self._encode_batch(decoded)
+
+    def _encode_batch(self, group: list[tuple[Tensor, _Sequence]]) -> None:
+        # Only the audio goes through the encoder, so sequences with and
+        # without a language share a batch
+        try:
+            batch = self.pipeline._create_batch_simple(
+                [(wav, None) for wav, _ in group]
+            )
+            audio, audio_seq_lens = self.model.embed_audio(
+                batch.source_seqs, [int(n) for n in batch.source_seq_lens]
+            )
+        except Exception as e:
+            logger.exception("Encoding LLM request audio failed")
+            for _, sequence in group:
+                sequence.future.set_exception(e)
+            return
+
+        for i, (_, sequence) in enumerate(group):
+            audio_embedding = audio[i, : audio_seq_lens[i]]
+            if sequence.digest is not None:
+                self.cache.put(
+                    self.model_name, sequence.digest, audio_embedding.clone()
+                )
+            self._set_context(sequence, audio_embedding)
+
+    def _context_from_cache(self, sequence: _Sequence) -> bool:
+        """Build the decoder context from cached audio embeddings, if any."""
+
+        if self.cache is None:
+            return False
+
+        sequence.digest = audio_digest(sequence.audio)
+        audio_embedding = self.cache.get(self.model_name, sequence.digest)
+        if audio_embedding is None:
+            return False
+
+        self._set_context(sequence, audio_embedding)
+        return True
+
+    def _set_context(self, sequence: _Sequence, audio_embedding: Tensor) -> None:
+        try:
+            sequence.context = torch.cat(
+                [audio_embedding, self.language_context(sequence.lang)]
+            )
+        except Exception as e:
+            logger.exception("Building LLM decoder context failed")
+            sequence.future.set_exception(e)
+        sequence.audio = None
+
+    def preload_languages(self, langs: list[str | None]) -> None:
+        """Embed the language contexts of `langs` ahead of their first request."""
+
+        with torch.inference_mode():
+            for lang in langs:
+                self.language_context(lang)
+
+    def language_context(self, lang: str | None) -> Tensor:
+        """
+        Embedded tokens following the audio in the decoder context, mirroring
+        the model's default syntax: `audio [<lid marker> lang] <bos>`.
+
+        They only depend on the language, so they are embedded once per
+        language and reused for every request.
+        """
+
+        context = self._language_contexts.get(lang)
+        if context is None:
+            context = self._embed_language_context(lang)
+            self._language_contexts[lang] = context
+        return context
+
+    def _embed_language_context(self, lang: str | None) -> Tensor:
+        model = self.model
+        device, dtype = self.pipeline.device, self.pipeline.dtype
+
+        def token(idx: int) -> Tensor:
+            return torch.tensor([idx], device=device)
+
+        tokens = []
+        if model.lang_embeddings_p > 0.0:
+            lang_id = lang_id_getter(model.lang_mapping, lang) if lang else 0
+            tokens.append(
+                model.embed_text(token(model.special_tokens.lid_marker), dtype)
+            )
+            tokens.append(model.lang_embeddings(token(lang_id)).to(dtype))
+        tokens.append(model.embed_text(token(model.target_vocab_info.bos_idx), dtype))
+        return torch.cat(tokens)
+
+    def _stack_contexts(self, sequences: list[_Sequence], length: int) -> Tensor:
+        return torch.stack([s.context[:length] for s in sequences])
+
+    def _prefill(self, sequences: list[_Sequence]) -> _Cohort:
+        """Start a new cohort, prefilling up to the shortest context (minus BOS)."""
+
+        state_bag = self.kv_pool.new_state_bag(self.max_steps)
+        n = min(s.context_len for s in sequences) - 1
+        if n > 0:
+            self._run_decoder(self._stack_contexts(sequences, n), state_bag)
+        return _Cohort(state_bag=state_bag, sequences=sequences)
+
+    def _join(self, cohort: _Cohort, sequences: list[_Sequence]) -> None:
+        """Prefill `sequences` up to the cohort's step and merge their KV cache."""
+
+        state_bag = IncrementalStateBag(self.max_steps)
+        self._run_decoder(self._stack_contexts(sequences, cohort.step_nr), state_bag)
+
+        for module in self.model.llama_decoder.modules():
+            dst = cohort.state_bag.maybe_get_state(module, FullAttentionState)
+            src = state_bag.maybe_get_state(module, FullAttentionState)
+            if dst is None or src is None:
+                continue
+
+            (dst_k, dst_v), (src_k, src_v) = dst.get(), src.get()
+            cohort.state_bag.set_state(
+                module,
+                FullAttentionState(
+                    torch.cat([dst_k, src_k]),
+                    torch.cat([dst_v, src_v]),
+                    cohort.state_bag.max_num_steps,
+                    cohort.state_bag.capacity_increment,
+                ),
+            )
+
+        cohort.sequences.extend(sequences)
+
+    def _run_decoder(self, seqs: Tensor, state_bag: IncrementalStateBag) -> Tensor:
+        out = self.model.llama_decoder(
+            seqs=seqs, seqs_layout=BatchLayout.of(seqs), state_bag=state_bag
+        )
+        state_bag.increment_step_nr(seqs.size(1))
+        return out
+
+    def _step(self, cohort: _Cohort) -> None:
+        """Advance every sequence of a cohort by one decoder position."""
+
+        t = cohort.step_nr
+        inputs = [
+            s.context[t] if t < s.context_len else s.next_input
+            for s in cohort.sequences
+        ]
+        dec_out = self._run_decoder(torch.stack(inputs).unsqueeze(1), cohort.state_bag)
+        next_tokens = self.model.final_proj(dec_out).squeeze(1).argmax(dim=-1)
+        embedded = self.model.embed_text(
+            next_tokens.unsqueeze(1), dtype=dec_out.dtype
+        ).squeeze(1)
+
+        keep = []
+        finished = []
+        for i, sequence in enumerate(cohort.sequences):
+            if t < sequence.context_len - 1:
+                keep.append(i)
+                continue
+
+            token = int(next_tokens[i])
+            if token == self.eos_idx:
+                finished.append(sequence)
+                continue
+
+            sequence.tokens.append(token)
+            sequence.next_input = embedded[i]
+            if t >= self.max_steps - 4 or self._is_repeating(sequence):
+                finished.append(sequence)
+            else:
+                keep.append(i)
+
+        if finished:
+            self._finish(finished)
+            cohort.sequences = [cohort.sequences[i] for i in keep]
+            if cohort.sequences:
+                new_order = torch.tensor(keep, device=dec_out.device)
+                cohort.state_bag.reorder(new_order)
+            else:
+                self._cohorts.remove(cohort)
+                self.kv_pool.drop_state_bag(cohort.state_bag)
+
+    def _is_repeating(self, sequence: _Sequence) -> bool:
+        """Early stopping on repetition loops, as in the upstream beam search."""
+
+        n = len(sequence.tokens)
+        if n % 250 != 0 or n <= self.compression_window:
+            return False
+
+        window = np.array(sequence.tokens[-self.compression_window :])
+        text = np.array_str(window).replace("\n", "").encode("utf-8")
+        return len(text) / len(zlib.compress(text)) > self.compression_threshold
+
+    def _finish(self, sequences: list[_Sequence]) -> None:
+        self.kv_pool.release(len(sequences))
+        for sequence in sequences:
+            tokens = torch.tensor(sequence.tokens, dtype=torch.int64)
+            sequence.future.set_result(self.pipeline.token_decoder(tokens))
+
+    def _fail_all(self, e: Exception) -> None:
+        for cohort in self._cohorts:
+            self.kv_pool.release(len(cohort.sequences))
+            self.kv_pool.drop_state_bag(cohort.state_bag)
+            for sequence in cohort.sequences:
+                sequence.future.set_exception(e)
+        self._cohorts = []
+
+        self.kv_pool.release(len(self._waiting))
+        for sequence in self._waiting:
+            sequence.future.set_exception(e)
+        self._waiting = []
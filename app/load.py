@@ -0,0 +1,84 @@
+"""
+Load reporting for load-aware routing.
+
+The report is served by the `/load` endpoint and summarized in the
+`X-Load-Report` header of every response, so a least-loaded or
+power-of-two-choices balancer can route on it without extra requests.
+"""
+
+import os
+
+import torch
+
+from app.scheduler import scheduler
+from app.schemas import LoadReport
+from app.service import asr_service
+
+# Fields summarized in the X-Load-Report header
+HEADER_FIELDS = (
+    "ready",
+    "queued_audio_seconds",
+    "in_flight_requests",
+    "estimated_wait_seconds",
+    "memory_free_bytes",
+)
+
+
+def memory_headroom(device: str | None) -> tuple[int | None, int | None]:
+    """Free and total memory in bytes on `device`, None where unknown."""
+
+    if device == "cuda":
+        return torch.cuda.mem_get_info()
+    if device == "mps":
+        total = torch.mps.recommended_max_memory()
+        return total - torch.mps.driver_allocated_memory(), total
+
+    try:
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        free = os.sysconf("SC_AVPHYS_PAGES") * page_size
+        total = os.sysconf("SC_PHYS_PAGES") * page_size
+    except (ValueError, OSError, AttributeError):
+        return None, None
+    return free, total
+
+
+def estimated_wait_seconds() -> float:
+    """Queued audio divided by the rate at which the server transcribes audio."""
+
+    realtime_factor = asr_service.realtime_factor
+    if realtime_factor is None:
+        return 0.0
+    return scheduler.queued_audio_seconds * realtime_factor / scheduler.max_concurrency
+
+
+def load_report() -> LoadReport:
+    """Current load of this server instance."""
+
+    memory_free, memory_total = memory_headroom(asr_service.device)
+    return LoadReport(
+        model=asr_service.model_name,
+        ready=asr_service.model is not None,
+        queued_requests=scheduler.queued,
+        queued_audio_seconds=scheduler.queued_audio_seconds,
+        in_flight_requests=scheduler.in_flight,
+        in_flight_batches=asr_service.in_flight_batches,
+        estimated_wait_seconds=estimated_wait_seconds(),
+        memory_free_bytes=memory_free,
+        memory_total_bytes=memory_total,
+    )
+
+
+def load_report_header(report: LoadReport) -> str:
+    """Compact `key=value, ...` summary of the report for a response header."""
+
+    values = []
+    for name in HEADER_FIELDS:
+        value = getattr(report, name)
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = int(value)
+        elif isinstance(value, float):
+            value = f"{value:.2f}"
+        values.append(f"{name}={value}")
+    return ", ".join(values)
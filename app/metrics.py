@@ -0,0 +1,69 @@
+"""
+In-process metrics for Omnilingual-ASR server.
+
+Counters are incremented from request handlers and background workers, gauges
+and collectors are callables evaluated when a snapshot is taken. The snapshot
+is served as JSON by the `/metrics` endpoint.
+"""
+
+import threading
+from collections.abc import Callable
+
+
+class Metrics:
+    """Thread-safe registry of named counters, gauges and collectors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, Callable[[], float]] = {}
+        self._collectors: list[Callable[[], dict[str, float]]] = []
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add `value` to the counter `name`, creating it if needed."""
+
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def get(self, name: str) -> float:
+        """Current value of the counter `name`, or 0 if it was never incremented."""
+
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def register_gauge(self, name: str, fn: Callable[[], float]) -> None:
+        """Report the value returned by `fn` under `name` in every snapshot."""
+
+        with self._lock:
+            self._gauges[name] = fn
+
+    def register_collector(self, fn: Callable[[], dict[str, float]]) -> None:
+        """Report all values returned by `fn` in every snapshot."""
+
+        with self._lock:
+            self._collectors.append(fn)
+
+    def snapshot(self) -> dict[str, float]:
+        """All counters, gauges and collected values, sorted by name."""
+
+        with self._lock:
+            values = dict(self._counters)
+            gauges = dict(self._gauges)
+            collectors = list(self._collectors)
+
+        for name, fn in gauges.items():
+            values[name] = fn()
+        for fn in collectors:
+            values.update(fn())
+
+        return dict(sorted(values.items()))
+
+
+def ratio(numerator: float, denominator: float) -> float:
+    """`numerator / denominator`, or 0 when the denominator is 0."""
+
+    return numerator / denominator if denominator else 0.0
+
+
+# Global metrics registry
+metrics = Metrics()
@@ -0,0 +1,292 @@
+"""
+On-demand profiling of live traffic.
+
+An admin starts a bounded session for the next N inference batches or T
+seconds. Every inference batch run while the session is active is recorded by
+the torch profiler, and a background thread samples the Python stack of the
+event loop thread. When the session ends, the batch traces are merged into a
+single Chrome trace (open it in chrome://tracing or Perfetto), the sampled
+stacks are written in folded format (for flame graph tools), and the operators
+with the most self time are summarized.
+
+The torch profiler only records the thread it is started on, and inference
+runs on several threads (pipelined stages, the LLM decode engine), so each
+batch is profiled where it runs and the traces are merged afterwards. The
+profiler backend is process-wide and cannot record two threads at once, so
+batches are recorded one at a time: a batch starting while another is being
+recorded runs unprofiled. Profiler failures are logged and never reach the
+batch being profiled.
+
+Inference code wraps each batch in `profiler.batch(...)`, which returns a
+no-op context manager when no session is running, so profiling costs nothing
+until it is switched on.
+"""
+
+import contextlib
+import json
+import logging
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import torch
+from torch.profiler import ProfilerActivity, profile, record_function
+
+from app.config import PROFILE_DIR, PROFILE_MAX_SECONDS
+from app.schemas import OperatorSummary, ProfileStatusResponse
+
+logger = logging.getLogger(__name__)
+
+# Interval between event loop stack samples
+STACK_SAMPLE_INTERVAL_SECONDS = 0.01
+# Operators listed in the session summary
+TOP_OPERATORS = 20
+
+
+@dataclass
+class _OperatorTotals:
+    calls: int = 0
+    self_cpu_us: float = 0.0
+    cpu_us: float = 0.0
+    self_device_us: float = 0.0
+
+
+@dataclass
+class ProfilingSession:
+    """A bounded profiling session and what it has recorded so far."""
+
+    max_batches: int | None
+    deadline: float
+    loop_thread_id: int
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    started_at: float = field(default_factory=time.monotonic)
+    state: str = "running"
+    batches: int = 0
+    error: str | None = None
+    trace_path: Path | None = None
+    stacks_path: Path | None = None
+    trace_events: list[dict] = field(default_factory=list)
+    operators: dict[str, _OperatorTotals] = field(default_factory=dict)
+    stacks: Counter = field(default_factory=Counter)
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether the session reached its batch count or deadline."""
+
+        if self.max_batches is not None and self.batches >= self.max_batches:
+            return True
+        return time.monotonic() >= self.deadline
+
+    def status(self) -> ProfileStatusResponse:
+        top = sorted(
+            self.operators.items(), key=lambda item: item[1].self_cpu_us, reverse=True
+        )
+        return ProfileStatusResponse(
+            id=self.id,
+            state=self.state,
+            batches=self.batches,
+            elapsed_seconds=time.monotonic() - self.started_at,
+            trace_path=str(self.trace_path) if self.trace_path else None,
+            stacks_path=str(self.stacks_path) if self.stacks_path else None,
+            error=self.error,
+            top_operators=[
+                OperatorSummary(
+                    name=name,
+                    calls=totals.calls,
+                    self_cpu_ms=totals.self_cpu_us / 1000,
+                    cpu_ms=totals.cpu_us / 1000,
+                    self_device_ms=totals.self_device_us / 1000,
+                )
+                for name, totals in top[:TOP_OPERATORS]
+            ],
+        )
+
+
+class Profiler:
+    """Runs at most one profiling session at a time."""
+
+    def __init__(self):
+        self.session: ProfilingSession | None = None
+        self._lock = threading.Lock()
+        # Held while a batch is being recorded
+        self._recording = threading.Lock()
+        self._sampler: threading.Thread | None = None
+
+    @property
+    def active(self) -> bool:
+        session = self.session
+        return session is not None and session.running
+
+    def start(
+        self, batches: int | None = None, seconds: float | None = None
+    ) -> ProfilingSession:
+        """
+        Start a session for `batches` inference batches or `seconds` seconds,
+        whichever ends first. Call from the event loop thread, whose stacks
+        are sampled.
+        """
+
+        with self._lock:
+            if self.active:
+                raise RuntimeError(f"Profiling session {self.session.id} is running")
+
+            seconds = min(seconds or PROFILE_MAX_SECONDS, PROFILE_MAX_SECONDS)
+            self.session = ProfilingSession(
+                max_batches=batches,
+                deadline=time.monotonic() + seconds,
+                loop_thread_id=threading.get_ident(),
+            )
+
+        self._sampler = threading.Thread(
+            target=self._sample_stacks,
+            args=(self.session,),
+            name="profile-stack-sampler",
+            daemon=True,
+        )
+        self._sampler.start()
+        logger.info(
+            f"Profiling session {self.session.id} started: "
+            f"batches={batches}, seconds={seconds}"
+        )
+        return self.session
+
+    def batch(self, name: str):
+        """Context manager profiling one inference batch while a session runs."""
+
+        if not self.active or not self._recording.acquire(blocking=False):
+            return contextlib.nullcontext()
+        return self._profile_batch(name)
+
+    @contextlib.contextmanager
+    def _profile_batch(self, name: str):
+        prof = None
+        try:
+            prof = self._start_profile()
+            with record_function(name):
+                yield
+        finally:
+            if prof is not None:
+                self._stop_profile(prof)
+            self._recording.release()
+
+    def _start_profile(self) -> profile | None:
+        """Start the torch profiler on this thread, None if it fails to start."""
+
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+
+        prof = profile(activities=activities)
+        try:
+            prof.start()
+        except Exception:
+            logger.exception("Failed to start profiling a batch")
+            return None
+        return prof
+
+    def _stop_profile(self, prof: profile) -> None:
+        """Stop the torch profiler and add the batch to the session."""
+
+        try:
+            prof.stop()
+            self._record(prof)
+        except Exception:
+            logger.exception("Failed to record a profiled batch")
+
+    def _record(self, prof: profile) -> None:
+        """Add a finished batch profile to the session."""
+
+        with tempfile.NamedTemporaryFile(suffix=".json") as f:
+            prof.export_chrome_trace(f.name)
+            events = json.loads(Path(f.name).read_text()).get("traceEvents", [])
+
+        with self._lock:
+            session = self.session
+            if session is None or not session.running:
+                return
+
+            session.trace_events.extend(events)
+            for event in prof.key_averages():
+                totals = session.operators.setdefault(event.key, _OperatorTotals())
+                totals.calls += event.count
+                totals.self_cpu_us += event.self_cpu_time_total
+                totals.cpu_us += event.cpu_time_total
+                totals.self_device_us += getattr(event, "self_device_time_total", 0)
+            session.batches += 1
+
+        if session.exhausted:
+            self.finish()
+
+    def finish(self) -> None:
+        """End the running session and write its trace and stacks."""
+
+        with self._lock:
+            session = self.session
+            if session is None or not session.running:
+                return
+            session.state = "writing"
+
+        try:
+            out_dir = Path(PROFILE_DIR)
+            out_dir.mkdir(parents=True, exist_ok=True)
+
+            session.trace_path = out_dir / f"{session.id}.trace.json"
+            session.trace_path.write_text(
+                json.dumps({"traceEvents": session.trace_events})
+            )
+
+            session.stacks_path = out_dir / f"{session.id}.stacks.txt"
+            session.stacks_path.write_text(
+                "".join(
+                    f"{stack} {count}\n"
+                    for stack, count in session.stacks.most_common()
+                )
+            )
+            session.state = "done"
+        except Exception as e:
+            logger.exception(f"Failed to write profiling session {session.id}")
+            session.error = f"{type(e).__name__}: {e}"
+            session.state = "failed"
+        finally:
+            session.trace_events = []
+
+        logger.info(
+            f"Profiling session {session.id} finished after {session.batches} "
+            f"batches, trace written to {session.trace_path}"
+        )
+
+    def _sample_stacks(self, session: ProfilingSession) -> None:
+        """Sample the event loop thread's Python stack until the session ends."""
+
+        while session.running:
+            frame = sys._current_frames().get(session.loop_thread_id)
+            if frame is not None:
+                session.stacks[_fold(frame)] += 1
+            if session.exhausted:
+                self.finish()
+                return
+            time.sleep(STACK_SAMPLE_INTERVAL_SECONDS)
+
+
+def _fold(frame) -> str:
+    """Stack of `frame` in folded format, outermost call first."""
+
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+# Global profiler instance
+profiler = Profiler()
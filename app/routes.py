@@ -4,14 +4,23 @@ API routes for Omnilingual-ASR server.
 
 import logging
 
-from fastapi import APIRouter, Form, UploadFile
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi import APIRouter, Form, Header, UploadFile
 
+from app.audio_probe import probe_audio
 from app.config import MODEL_NAME
 from app.exceptions import APIError
 from app.handlers import handle_runtime_error
-from app.schemas import ModelsResponse, TranscriptionResponse
+from app.load import load_report
+from app.metrics import metrics
+from app.scheduler import Priority, resolve_tenant, scheduler
+from app.schemas import LoadReport, ModelsResponse
 from app.service import asr_service
+from app.uploads import (
+    check_audio_length,
+    parse_priority,
+    read_upload,
+    transcription_response,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +39,7 @@ async def get_models():
     return {
         "data": [
             {
-                "id": MODEL_NAME,
+                "id": asr_service.model_name,
                 "object": "model",
                 "created": 0,
                 "owned_by": "omnilingual-asr",
@@ -39,6 +48,18 @@ async def get_models():
     }
 
 
+@router.get("/load", response_model=LoadReport)
+async def get_load():
+    """Load report for load-aware routing."""
+    return load_report()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Server metrics as JSON."""
+    return metrics.snapshot()
+
+
 @router.post("/v1/audio/transcriptions")
 async def transcribe(
     file: UploadFile,
@@ -48,6 +69,9 @@ async def transcribe(
     response_format: str = Form(default="json"),
     temperature: float = Form(default=0.0),
     timestamp_granularities: str | None = Form(default=None),
+    authorization: str | None = Header(default=None),
+    x_tenant_id: str | None = Header(default=None),
+    x_priority: str = Header(default="interactive"),
 ):
     """
     OpenAI Whisper-compatible transcription endpoint.
@@ -60,44 +84,78 @@ async def transcribe(
         response_format: json, verbose_json, text, srt, or vtt
         temperature: Sampling temperature (not used)
         timestamp_granularities: Timestamp detail level (not used)
+        authorization: API key, identifies the tenant without X-Tenant-ID
+        x_tenant_id: Tenant for fair scheduling
+        x_priority: interactive or batch, interactive requests go first
     """
-    if not file.filename:
-        logger.warning("Transcription request rejected: no file provided")
-        raise APIError(
-            status_code=400,
-            message="No file provided",
-            param="file",
-        )
+    priority = parse_priority(x_priority)
+    audio_bytes = await read_upload(file)
 
-    audio_bytes = await file.read()
-
-    if len(audio_bytes) == 0:
-        logger.warning("Transcription request rejected: empty file")
-        raise APIError(
-            status_code=400,
-            message="Empty file provided",
-            param="file",
-        )
+    # Read only the header, so over-length audio is rejected before decoding
+    audio_info = probe_audio(audio_bytes)
+    duration = audio_info.duration if audio_info else None
 
     logger.info(
         f"Transcription request: file={file.filename}, language={language}, "
-        f"format={response_format}"
+        f"format={response_format}, duration={duration}"
     )
 
+    text = await transcribe_audio(
+        audio_bytes,
+        filename=file.filename,
+        language=language,
+        tenant=resolve_tenant(x_tenant_id, authorization),
+        priority=priority,
+        duration=duration,
+    )
+
+    return transcription_response(text, response_format)
+
+
+async def transcribe_audio(
+    audio: bytes | dict,
+    *,
+    filename: str,
+    language: str | None,
+    tenant: str,
+    priority: Priority,
+    duration: float | None,
+) -> str:
+    """
+    Admit and transcribe a request, mapping failures to API errors.
+
+    Shared by the transcription endpoint and the front-end worker listener.
+
+    Args:
+        audio: Raw audio file bytes, or decoded audio as a dict with
+            `waveform` and `sample_rate`
+        filename: Name of the uploaded file, for logging
+        language: Language code (ISO 639-1 or Omnilingual-ASR format)
+        tenant: Tenant for fair scheduling
+        priority: Priority class for fair scheduling
+        duration: Audio duration in seconds, if known
+
+    Returns:
+        Transcribed text
+    """
+    try:
+        check_audio_length(duration, asr_service.max_audio_seconds)
+    except APIError:
+        metrics.increment("rejected_too_long_total")
+        raise
+
     try:
-        text = await asr_service.transcribe(audio_bytes, language=language)
+        async with scheduler.slot(tenant, priority, duration):
+            return await asr_service.transcribe(
+                audio, language=language, duration=duration
+            )
     except RuntimeError as e:
-        logger.exception(f"Transcription failed for {file.filename}")
+        logger.exception(f"Transcription failed for {filename}")
         handle_runtime_error(e)
     except Exception as e:
-        logger.exception(f"Transcription failed for {file.filename}")
+        logger.exception(f"Transcription failed for {filename}")
         raise APIError(
             status_code=500,
             message=f"Transcription failed: {e}",
             error_type="server_error",
         )
-
-    if response_format == "text":
-        return PlainTextResponse(content=text)
-
-    return JSONResponse(content=TranscriptionResponse(text=text).model_dump())
@@ -0,0 +1,333 @@
+"""
+Weighted fair admission scheduler.
+
+Requests wait here before they are handed to the ASR service, and at most
+`max_concurrency` of them are transcribed at once. Interactive requests are
+always admitted before batch requests. Within a priority class, tenants share
+the service in proportion to their weights, measured in audio-seconds rather
+than requests (start-time fair queuing): every request gets a virtual finish
+tag of `start + duration / weight`, and the queued request with the smallest
+tag is admitted next. A tenant running a bulk backfill therefore cannot starve
+a tenant sending a few short clips.
+
+Tenants are forgotten once they have nothing queued or in flight and virtual
+time has passed their last finish tag, as a new request would then start at
+the virtual time anyway. Tenants are created by whoever sends requests, so
+only the busiest ones get their own metric labels.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+from app.config import TENANT_MAX_CONCURRENCY, TENANT_METRICS_MAX, TENANT_WEIGHTS
+from app.metrics import metrics
+
+# Cost charged for audio whose duration could not be probed
+UNKNOWN_DURATION_COST = 10.0
+# Label summing the tenants beyond the metrics limit
+OTHER_TENANTS_LABEL = "other"
+
+
+class Priority(IntEnum):
+    """Priority classes, admitted strictly in this order."""
+
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+@dataclass
+class _Ticket:
+    """A request waiting for admission."""
+
+    tenant: str
+    cost: float
+    start_tag: float
+    finish_tag: float
+    enqueued_at: float
+    future: asyncio.Future
+
+
+@dataclass
+class _TenantState:
+    """Queues and counters of one tenant."""
+
+    weight: float
+    queues: dict[Priority, deque[_Ticket]] = field(
+        default_factory=lambda: {priority: deque() for priority in Priority}
+    )
+    last_finish: dict[Priority, float] = field(
+        default_factory=lambda: {priority: 0.0 for priority in Priority}
+    )
+    in_flight: int = 0
+    admitted: int = 0
+    wait_seconds: float = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+
+def resolve_tenant(tenant_id: str | None, authorization: str | None) -> str:
+    """
+    Tenant of a request: the tenant header if set, otherwise the API key.
+
+    API keys are hashed so they never show up in metrics or logs.
+    """
+
+    if tenant_id:
+        return tenant_id
+    if authorization:
+        api_key = authorization.removeprefix("Bearer ").strip()
+        return "key-" + hashlib.sha256(api_key.encode()).hexdigest()[:12]
+    return "default"
+
+
+def parse_weights(spec: str) -> dict[str, float]:
+    """Parse tenant weights from `tenant=weight,tenant=weight`."""
+
+    weights = {}
+    for item in spec.split(","):
+        if item.strip():
+            tenant, weight = item.split("=")
+            weights[tenant.strip()] = float(weight)
+    return weights
+
+
+class FairScheduler:
+    """Admission scheduler with priority classes and per-tenant weights and caps."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 1,
+        tenant_max_concurrency: int = 0,
+        weights: dict[str, float] | None = None,
+        max_tenant_labels: int = TENANT_METRICS_MAX,
+    ):
+        """
+        Args:
+            max_concurrency: Requests transcribed at once across all tenants
+            tenant_max_concurrency: Requests transcribed at once per tenant,
+                0 for no per-tenant cap
+            weights: Share of each tenant, tenants not listed have weight 1
+            max_tenant_labels: Tenants reported under their own metric labels
+        """
+
+        self.max_concurrency = max_concurrency
+        self.tenant_max_concurrency = tenant_max_concurrency
+        self.weights = weights or {}
+        self.max_tenant_labels = max_tenant_labels
+
+        self._tenants: dict[str, _TenantState] = {}
+        self._virtual_time = {priority: 0.0 for priority in Priority}
+        self._in_flight = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(state.queued for state in self._tenants.values())
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued_audio_seconds(self) -> float:
+        return sum(
+            ticket.cost
+            for state in self._tenants.values()
+            for queue in state.queues.values()
+            for ticket in queue
+        )
+
+    def set_max_concurrency(self, max_concurrency: int) -> None:
+        """Change the global concurrency limit and admit any requests it frees up."""
+
+        self.max_concurrency = max_concurrency
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(
+        self, tenant: str, priority: Priority, duration: float | None
+    ) -> AsyncIterator[None]:
+        """Wait for admission, hold a slot for the body and release it afterwards."""
+
+        await self.acquire(tenant, priority, duration)
+        try:
+            yield
+        finally:
+            self.release(tenant)
+
+    async def acquire(
+        self, tenant: str, priority: Priority, duration: float | None
+    ) -> None:
+        """Wait until the request is admitted. Must be paired with `release`."""
+
+        state = self._tenant(tenant)
+        cost = duration if duration is not None else UNKNOWN_DURATION_COST
+
+        start_tag = max(self._virtual_time[priority], state.last_finish[priority])
+        finish_tag = start_tag + cost / state.weight
+        state.last_finish[priority] = finish_tag
+
+        ticket = _Ticket(
+            tenant=tenant,
+            cost=cost,
+            start_tag=start_tag,
+            finish_tag=finish_tag,
+            enqueued_at=time.monotonic(),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        state.queues[priority].append(ticket)
+        self._dispatch()
+
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # Admitted just before the caller went away
+                self.release(tenant)
+            else:
+                state.queues[priority].remove(ticket)
+                self._evict_idle()
+            raise
+
+    def release(self, tenant: str) -> None:
+        """Free the slot held by an admitted request of `tenant`."""
+
+        self._tenants[tenant].in_flight -= 1
+        self._in_flight -= 1
+        self._dispatch()
+
+    def stats(self) -> dict[str, float]:
+        """Per-tenant queue depth, in-flight requests and wait times."""
+
+        now = time.monotonic()
+        stats = {
+            "scheduler_queued": self.queued,
+            "scheduler_in_flight": self._in_flight,
+            "scheduler_tenants": len(self._tenants),
+        }
+
+        busiest = sorted(
+            self._tenants.items(),
+            key=lambda item: (item[1].queued + item[1].in_flight, item[1].admitted),
+            reverse=True,
+        )
+        groups = [
+            (tenant, [state]) for tenant, state in busiest[: self.max_tenant_labels]
+        ]
+        if len(busiest) > self.max_tenant_labels:
+            others = [state for _, state in busiest[self.max_tenant_labels :]]
+            groups.append((OTHER_TENANTS_LABEL, others))
+
+        for tenant, states in groups:
+            oldest = [
+                queue[0].enqueued_at
+                for state in states
+                for queue in state.queues.values()
+                if queue
+            ]
+            label = f'{{tenant="{tenant}"}}'
+            stats[f"tenant_queue_depth{label}"] = sum(s.queued for s in states)
+            stats[f"tenant_in_flight{label}"] = sum(s.in_flight for s in states)
+            stats[f"tenant_admitted_total{label}"] = sum(s.admitted for s in states)
+            stats[f"tenant_wait_seconds_total{label}"] = sum(
+                s.wait_seconds for s in states
+            )
+            stats[f"tenant_oldest_wait_seconds{label}"] = (
+                now - min(oldest) if oldest else 0.0
+            )
+        return stats
+
+    def _tenant(self, tenant: str) -> _TenantState:
+        state = self._tenants.get(tenant)
+        if state is None:
+            state = _TenantState(weight=self.weights.get(tenant, 1.0))
+            self._tenants[tenant] = state
+        return state
+
+    def _dispatch(self) -> None:
+        """Admit queued requests while there are free slots."""
+
+        while self._in_flight < self.max_concurrency:
+            ticket = self._next_ticket()
+            if ticket is None:
+                break
+
+            state = self._tenants[ticket.tenant]
+            state.in_flight += 1
+            state.admitted += 1
+            state.wait_seconds += time.monotonic() - ticket.enqueued_at
+            self._in_flight += 1
+            ticket.future.set_result(None)
+
+        self._evict_idle()
+
+    def _evict_idle(self) -> None:
+        """Forget tenants whose state no longer affects admission."""
+
+        if self._in_flight == 0 and self.queued == 0:
+            # The server is idle, so a new busy period starts: no tenant is
+            # owed service, and virtual time moves past every finish tag
+            for priority in Priority:
+                self._virtual_time[priority] = max(
+                    [
+                        self._virtual_time[priority],
+                        *(
+                            state.last_finish[priority]
+                            for state in self._tenants.values()
+                        ),
+                    ]
+                )
+
+        idle = [
+            tenant
+            for tenant, state in self._tenants.items()
+            if state.queued == 0
+            and state.in_flight == 0
+            and all(
+                state.last_finish[priority] <= self._virtual_time[priority]
+                for priority in Priority
+            )
+        ]
+        for tenant in idle:
+            del self._tenants[tenant]
+
+    def _next_ticket(self) -> _Ticket | None:
+        """Pop the eligible ticket with the smallest finish tag in the highest class."""
+
+        for priority in Priority:
+            best = None
+            for state in self._tenants.values():
+                queue = state.queues[priority]
+                if not queue or self._at_tenant_cap(state):
+                    continue
+                if best is None or queue[0].finish_tag < best[0].finish_tag:
+                    best = queue
+
+            if best is not None:
+                ticket = best.popleft()
+                # Start-time fair queuing: virtual time follows the start tag
+                # of the last admitted request
+                self._virtual_time[priority] = max(
+                    self._virtual_time[priority], ticket.start_tag
+                )
+                return ticket
+
+        return None
+
+    def _at_tenant_cap(self, state: _TenantState) -> bool:
+        return 0 < self.tenant_max_concurrency <= state.in_flight
+
+
+# Global scheduler instance, its concurrency is set once the model is loaded
+scheduler = FairScheduler(
+    tenant_max_concurrency=TENANT_MAX_CONCURRENCY,
+    weights=parse_weights(TENANT_WEIGHTS),
+)
+metrics.register_collector(scheduler.stats)
@@ -39,3 +39,81 @@ class ModelsResponse(BaseModel):
         owned_by: str = Field(..., description="The owner of the model")
 
     data: list[ModelInfo] = Field(..., description="List of model information")
+
+
+class LoadReport(BaseModel):
+    """Server load, for load-aware routing across instances."""
+
+    model: str = Field(..., description="The served model identifier")
+    ready: bool = Field(..., description="Whether the model is loaded and serving")
+    queued_requests: int = Field(..., description="Requests waiting for admission")
+    queued_audio_seconds: float = Field(
+        ..., description="Seconds of audio waiting for admission"
+    )
+    in_flight_requests: int = Field(..., description="Requests being transcribed")
+    in_flight_batches: int = Field(..., description="Batches being decoded")
+    estimated_wait_seconds: float = Field(
+        ..., description="Estimated wait before a new request is admitted"
+    )
+    memory_free_bytes: int | None = Field(
+        None, description="Free memory on the model's device"
+    )
+    memory_total_bytes: int | None = Field(
+        None, description="Total memory on the model's device"
+    )
+
+
+class ModelSwapRequest(BaseModel):
+    """Request to hot swap the served model."""
+
+    model: str = Field(
+        ..., description="The model card to load, e.g. omniASR_LLM_1B_v2"
+    )
+
+
+class ModelStatusResponse(BaseModel):
+    """Served model and the state of any hot swap."""
+
+    model: str = Field(..., description="The model serving new requests")
+    loading: str | None = Field(None, description="The model being loaded, if any")
+    error: str | None = Field(None, description="Why the last swap failed, if it did")
+
+
+class ProfileRequest(BaseModel):
+    """Request to start a profiling session."""
+
+    batches: int | None = Field(
+        None, ge=1, description="Stop after this many inference batches"
+    )
+    seconds: float | None = Field(
+        None, gt=0, description="Stop after this many seconds"
+    )
+
+
+class OperatorSummary(BaseModel):
+    """Time spent in one operator during a profiling session."""
+
+    name: str = Field(..., description="Operator or region name")
+    calls: int = Field(..., description="Number of calls")
+    self_cpu_ms: float = Field(..., description="CPU time excluding children")
+    cpu_ms: float = Field(..., description="CPU time including children")
+    self_device_ms: float = Field(
+        ..., description="Accelerator time excluding children"
+    )
+
+
+class ProfileStatusResponse(BaseModel):
+    """State and results of the latest profiling session."""
+
+    id: str = Field(..., description="Session identifier")
+    state: str = Field(..., description="running, writing, done or failed")
+    batches: int = Field(..., description="Inference batches profiled so far")
+    elapsed_seconds: float = Field(..., description="Time since the session started")
+    trace_path: str | None = Field(None, description="Chrome trace file, once done")
+    stacks_path: str | None = Field(
+        None, description="Sampled event loop stacks in folded format, once done"
+    )
+    error: str | None = Field(None, description="Why the session failed, if it did")
+    top_operators: list[OperatorSummary] = Field(
+        default_factory=list, description="Operators with the most self time"
+    )
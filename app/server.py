@@ -2,14 +2,27 @@
 FastAPI server with OpenAI Whisper-compatible API for Omnilingual-ASR.
 """
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 
 from app import __version__
+from app.admin import router as admin_router
+from app.engine_listener import frontend_listener
 from app.exceptions import APIError
 from app.handlers import api_error_handler, validation_error_handler
+from app.load import load_report, load_report_header
 from app.routes import router
-from app.service import lifespan
+from app.service import lifespan as service_lifespan
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the model, then accept front-end workers if they are enabled."""
+    async with service_lifespan(app), frontend_listener(app):
+        yield
+
 
 app = FastAPI(
     title="Omnilingual-ASR Server",
@@ -21,3 +34,12 @@ app = FastAPI(
 app.add_exception_handler(APIError, api_error_handler)
 app.add_exception_handler(RequestValidationError, validation_error_handler)
 app.include_router(router)
+app.include_router(admin_router)
+
+
+@app.middleware("http")
+async def add_load_report_header(request: Request, call_next):
+    """Piggyback a load summary on every response for the upstream balancer."""
+    response = await call_next(request)
+    response.headers["X-Load-Report"] = load_report_header(load_report())
+    return response
@@ -1,97 +1,474 @@
 """Async ASR service for Omnilingual-ASR model."""
 
+import asyncio
+import gc
 import logging
+import time
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 
 import torch
 from fastapi import FastAPI
-from omnilingual_asr.models.inference.pipeline import ASRInferencePipeline
+from omnilingual_asr.models.inference.pipeline import (
+    MAX_ALLOWED_AUDIO_SEC,
+    ASRInferencePipeline,
+)
 
-from app.config import MODEL_NAME
+from app.autotune import (
+    TuningProfile,
+    autotune,
+    default_dtype,
+    load_profile,
+    save_profile,
+    select_device,
+    synthetic_audio,
+)
+from app.backends import create_backend
+from app.cascade import transcribe_with_confidence
+from app.checkpoints import load_pipeline
+from app.config import (
+    AUTOTUNE,
+    CASCADE_CONFIDENCE_THRESHOLD,
+    CASCADE_LLM_MODEL_NAME,
+    CTC_BACKEND,
+    CTC_DECODE_THREADS,
+    CTC_EXPORT_BATCH_SIZES,
+    CTC_EXPORT_BUCKET_SECONDS,
+    CTC_MAX_BATCH_SIZE,
+    CTC_PIPELINED_STAGES,
+    LLM_CONTINUOUS_BATCHING,
+    LLM_MAX_ACTIVE_SEQUENCES,
+    LLM_MAX_COHORTS,
+    LLM_PRELOAD_LANGUAGES,
+    MODEL_NAME,
+    SCHEDULER_MAX_CONCURRENCY,
+)
+from app.encoder_cache import encoder_cache
 from app.languages import map_whisper_to_omnilingual
+from app.llm_engine import LLMDecodeEngine, supports_continuous_batching
+from app.metrics import metrics, ratio
+from app.profiling import profiler
+from app.scheduler import scheduler
+from app.stages import StagedCTCEngine, supports_staged_pipeline
 
 logger = logging.getLogger(__name__)
 
 
+def audio_nbytes(audio: bytes | dict) -> int:
+    """Size of raw or decoded audio in bytes."""
+
+    if isinstance(audio, dict):
+        return audio["waveform"].nbytes
+    return len(audio)
+
+
+def uses_cascade(model_name: str) -> bool:
+    """Whether low-confidence transcripts of `model_name` are escalated to an LLM model."""
+
+    return bool(CASCADE_LLM_MODEL_NAME) and "LLM" not in model_name
+
+
+@dataclass
+class LoadedModel:
+    """A model card and the pipelines serving it, swapped in and out as a whole."""
+
+    model_name: str
+    pipeline: ASRInferencePipeline
+    cascade_pipeline: ASRInferencePipeline | None = None
+    llm_engine: LLMDecodeEngine | None = None
+    ctc_engine: StagedCTCEngine | None = None
+    profile: TuningProfile | None = None
+    # Requests still being transcribed by this model
+    in_flight: int = 0
+    retired: bool = False
+
+    def release(self) -> None:
+        """Stop background workers and free the model's memory."""
+
+        if self.llm_engine is not None:
+            self.llm_engine.stop()
+        if self.ctc_engine is not None:
+            self.ctc_engine.stop()
+
+        self.pipeline = self.cascade_pipeline = None
+        self.llm_engine = self.ctc_engine = None
+        encoder_cache.drop(self.model_name)
+        if uses_cascade(self.model_name):
+            encoder_cache.drop(CASCADE_LLM_MODEL_NAME)
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
 class OmnilingualASRService:
     """Async ASR service wrapping the Omnilingual-ASR pipeline."""
 
     def __init__(self):
-        self.pipeline: ASRInferencePipeline | None = None
+        self.model: LoadedModel | None = None
+        self.device: str | None = None
+        # Smoothed processing time per second of audio
+        self.realtime_factor: float | None = None
+        # Model card being loaded by a hot swap, and the last swap error
+        self.loading_model_name: str | None = None
+        self.swap_error: str | None = None
+        self._swap_task: asyncio.Task | None = None
+        # Retired models being released in the background
+        self._releases: set[asyncio.Task] = set()
+
+        metrics.register_gauge(
+            "cascade_escalation_rate",
+            lambda: ratio(
+                metrics.get("cascade_escalations_total"),
+                metrics.get("cascade_requests_total"),
+            ),
+        )
 
     def load_model(self) -> None:
         """Load the ASR model. Called once at startup."""
 
-        device = "cpu"
-        if torch.cuda.is_available():
-            device = "cuda"
-        elif torch.backends.mps.is_available():
-            device = "mps"
-
-        # Use float16 for compute capability < 8.0 (e.g. T4)
-        dtype = torch.bfloat16
-        if device == "cuda" and torch.cuda.get_device_capability() < (8, 0):
-            dtype = torch.float16
-
-        logger.info(f"Loading model {MODEL_NAME} on {device}...")
-        self.pipeline = ASRInferencePipeline(
-            model_card=MODEL_NAME, device=device, dtype=dtype
-        )
-        logger.info(f"Model {MODEL_NAME} loaded successfully on {device}")
+        self.device = select_device()
+
+        profile = load_profile(MODEL_NAME, self.device)
+        if profile is None and AUTOTUNE:
+            logger.info(f"Autotuning {MODEL_NAME} on {self.device}...")
+            profile = autotune(MODEL_NAME, self.device)
+            logger.info(f"Autotune profile saved to {save_profile(profile)}")
+
+        if profile is not None:
+            profile.apply_threads()
+            logger.info(
+                f"Using tuning profile: {profile.dtype}, "
+                f"threads {profile.intra_op_threads}/{profile.inter_op_threads}, "
+                f"batch sizes {profile.batch_sizes}"
+            )
+
+        self._activate(self._load(MODEL_NAME, profile))
+
+    async def swap_model(self, model_name: str) -> None:
+        """
+        Replace the current model without downtime.
+
+        The new model is loaded and warmed up next to the current one, then
+        swapped in for new requests. Requests already running finish on the old
+        model, which is released once the last of them completes.
+        """
+
+        self.loading_model_name = model_name
+        self.swap_error = None
+        model = None
+        try:
+            profile = load_profile(model_name, self.device)
+            model = await asyncio.to_thread(self._load, model_name, profile)
+            await asyncio.to_thread(self._warmup, model)
+        except Exception as e:
+            logger.exception(f"Failed to load {model_name}, keeping {self.model_name}")
+            self.swap_error = f"{type(e).__name__}: {e}"
+            if model is not None:
+                # Loaded but failed warmup, its weights and engine threads
+                # would otherwise leak
+                await self._release(model)
+            return
+        finally:
+            self.loading_model_name = None
+
+        logger.info(f"Swapping {self.model_name} for {model_name}")
+        previous = self.model
+        self._activate(model)
+
+        if previous is not None:
+            previous.retired = True
+            if previous.in_flight == 0:
+                await self._release(previous)
+
+    def start_swap(self, model_name: str) -> None:
+        """Run `swap_model` in the background. Only one swap runs at a time."""
+
+        if self.swap_in_progress:
+            raise RuntimeError(f"Already loading {self.loading_model_name}")
+        self._swap_task = asyncio.create_task(self.swap_model(model_name))
+
+    @property
+    def swap_in_progress(self) -> bool:
+        return self._swap_task is not None and not self._swap_task.done()
+
+    def _load(self, model_name: str, profile: TuningProfile | None) -> LoadedModel:
+        dtype = profile.torch_dtype if profile else default_dtype(self.device)
+        pipeline = load_pipeline(model_name, self.device, dtype)
+        model = LoadedModel(model_name=model_name, pipeline=pipeline, profile=profile)
+
+        cache = encoder_cache if encoder_cache.enabled else None
+
+        llm_pipeline, llm_model_name = pipeline, model_name
+        if uses_cascade(model_name):
+            model.cascade_pipeline = load_pipeline(
+                CASCADE_LLM_MODEL_NAME, self.device, dtype
+            )
+            llm_pipeline = model.cascade_pipeline
+            llm_model_name = CASCADE_LLM_MODEL_NAME
+            logger.info(
+                f"Cascade enabled: escalating to {CASCADE_LLM_MODEL_NAME} below "
+                f"confidence {CASCADE_CONFIDENCE_THRESHOLD}"
+            )
+
+        if LLM_CONTINUOUS_BATCHING and supports_continuous_batching(llm_pipeline):
+            max_active_sequences = LLM_MAX_ACTIVE_SEQUENCES or (
+                profile.batch_size_for(MAX_ALLOWED_AUDIO_SEC) if profile else 32
+            )
+            model.llm_engine = LLMDecodeEngine(
+                llm_pipeline,
+                max_active_sequences=max_active_sequences,
+                max_cohorts=LLM_MAX_COHORTS,
+                cache=cache,
+                model_name=llm_model_name,
+            )
+            model.llm_engine.preload_languages(
+                [None, *map(map_whisper_to_omnilingual, LLM_PRELOAD_LANGUAGES)]
+            )
+            model.llm_engine.start()
+            logger.info("Continuous batching enabled for LLM decoding")
+
+        if CTC_PIPELINED_STAGES and supports_staged_pipeline(pipeline):
+
+            def batch_size_for(duration: float) -> int:
+                if CTC_MAX_BATCH_SIZE or profile is None:
+                    return CTC_MAX_BATCH_SIZE or 8
+                return profile.batch_size_for(duration)
+
+            backend = create_backend(
+                CTC_BACKEND,
+                pipeline,
+                self.device,
+                CTC_EXPORT_BATCH_SIZES,
+                CTC_EXPORT_BUCKET_SECONDS,
+            )
+            model.ctc_engine = StagedCTCEngine(
+                backend,
+                batch_size_for,
+                decode_threads=CTC_DECODE_THREADS,
+                cache=cache,
+                model_name=model_name,
+            )
+            model.ctc_engine.start()
+            logger.info(
+                f"Pipelined stages enabled for CTC decoding ({backend.name} backend)"
+            )
+
+        return model
+
+    def _warmup(self, model: LoadedModel) -> None:
+        """Run a short synthetic clip through every pipeline of `model`."""
+
+        for pipeline in (model.pipeline, model.cascade_pipeline):
+            if pipeline is not None:
+                pipeline.transcribe([synthetic_audio(1.0)], batch_size=1)
+
+    def _activate(self, model: LoadedModel) -> None:
+        """Serve new requests with `model`."""
+
+        self.model = model
+        scheduler.set_max_concurrency(SCHEDULER_MAX_CONCURRENCY or self.max_concurrency)
+
+    async def _release(self, model: LoadedModel) -> None:
+        """Release a retired model without blocking the event loop."""
+
+        # Joins worker threads and frees device memory, which can take a while
+        await asyncio.to_thread(model.release)
+        logger.info(f"Released model {model.model_name}")
+
+    def shutdown(self) -> None:
+        """Stop background workers. Called once at shutdown."""
+
+        if self.model is not None:
+            self.model.release()
+            self.model = None
+
+    @property
+    def model_name(self) -> str:
+        """Name of the model serving new requests."""
+
+        return self.model.model_name if self.model is not None else MODEL_NAME
 
     @property
     def is_llm_model(self) -> bool:
         """Check if the current model is an LLM-based model (supports language conditioning)."""
 
-        return "LLM" in MODEL_NAME
+        return "LLM" in self.model_name
+
+    @property
+    def is_cascade(self) -> bool:
+        """Check if low-confidence CTC transcripts are escalated to an LLM model."""
+
+        return uses_cascade(self.model_name)
+
+    @property
+    def max_concurrency(self) -> int:
+        """Number of requests worth transcribing at once."""
+
+        if self.model is not None and self.model.llm_engine is not None:
+            return self.model.llm_engine.kv_pool.max_slots
+        if self.model is not None and self.model.ctc_engine is not None:
+            return self.model.ctc_engine.max_in_flight
+        # CTC decoding blocks the event loop, so requests run one at a time
+        return 1
+
+    @property
+    def in_flight_batches(self) -> int:
+        """Number of batches currently being decoded."""
+
+        if self.model is not None and self.model.llm_engine is not None:
+            return self.model.llm_engine.active_cohorts
+        if self.model is not None and self.model.ctc_engine is not None:
+            return self.model.ctc_engine.batches_in_flight
+        return scheduler.in_flight
 
-    async def transcribe(self, audio_bytes: bytes, language: str | None = None) -> str:
+    @property
+    def max_audio_seconds(self) -> float | None:
+        """Longest audio the model accepts, or None if audio length is unlimited."""
+
+        if self.model is not None and self.model.pipeline.streaming_config.is_streaming:
+            return None
+        return MAX_ALLOWED_AUDIO_SEC
+
+    async def transcribe(
+        self,
+        audio: bytes | dict,
+        language: str | None = None,
+        duration: float | None = None,
+    ) -> str:
         """
-        Transcribe audio bytes to text.
+        Transcribe audio to text.
 
         Args:
-            audio_bytes: Raw audio file bytes
+            audio: Raw audio file bytes, or decoded audio as a dict with
+                `waveform` and `sample_rate` (from front-end workers)
             language: Optional language code (OpenAI or Omnilingual-ASR format)
+            duration: Audio duration in seconds from the header probe, if known
 
         Returns:
             Transcribed text
         """
 
-        if self.pipeline is None:
+        # Requests run to completion on the model they started on, even if
+        # another model is swapped in meanwhile
+        model = self.model
+        if model is None:
             logger.error("Transcription attempted before model was loaded")
             raise RuntimeError("Model not loaded. Call load_model() first.")
 
         # Map language code if provided and model supports it
         lang_param = None
-        if language and self.is_llm_model:
+        if language and (
+            "LLM" in model.model_name or model.cascade_pipeline is not None
+        ):
             lang_param = map_whisper_to_omnilingual(language)
-            logger.debug(f"Language mapped: {language} -> {lang_param}")
 
         # Run transcription (sync, but wrapped for async compatibility)
-        audio_size_kb = len(audio_bytes) / 1024
+        audio_size_kb = audio_nbytes(audio) / 1024
+        duration_info = f", duration={duration:.1f}s" if duration is not None else ""
         logger.info(
-            f"Starting transcription: {audio_size_kb:.1f}KB, language={lang_param or 'auto'}"
+            f"Starting transcription: {audio_size_kb:.1f}KB{duration_info}, "
+            f"language={lang_param or 'auto'}"
         )
 
-        if lang_param:
-            transcriptions = self.pipeline.transcribe(
-                [audio_bytes], lang=[lang_param], batch_size=1
-            )
-        else:
-            transcriptions = self.pipeline.transcribe([audio_bytes], batch_size=1)
+        start = time.perf_counter()
+        model.in_flight += 1
+        try:
+            if model.cascade_pipeline is not None:
+                result = await self._transcribe_cascade(model, audio, lang_param)
+            else:
+                result = await self._transcribe_pipeline(
+                    model, model.pipeline, audio, lang_param
+                )
+        finally:
+            model.in_flight -= 1
+            if model.retired and model.in_flight == 0:
+                # Released in the background, so this request does not wait
+                # for the teardown
+                task = asyncio.create_task(self._release(model))
+                self._releases.add(task)
+                task.add_done_callback(self._releases.discard)
 
-        result = transcriptions[0] if transcriptions else ""
         logger.info(f"Transcription complete: {len(result)} chars")
+
+        metrics.increment("transcriptions_total")
+        if duration:
+            metrics.increment("audio_seconds_total", duration)
+            self._update_realtime_factor((time.perf_counter() - start) / duration)
         return result
 
+    def stage_stats(self) -> dict[str, float]:
+        """Utilization and queue depth of the pipelined CTC stages, if in use."""
+
+        if self.model is not None and self.model.ctc_engine is not None:
+            return self.model.ctc_engine.stats()
+        return {}
+
+    def _update_realtime_factor(self, realtime_factor: float) -> None:
+        if self.realtime_factor is None:
+            self.realtime_factor = realtime_factor
+        else:
+            self.realtime_factor += 0.1 * (realtime_factor - self.realtime_factor)
+
+    async def _transcribe_cascade(
+        self, model: LoadedModel, audio: bytes | dict, lang_param: str | None
+    ) -> str:
+        if model.ctc_engine is not None:
+            result, confidence = await asyncio.wrap_future(
+                model.ctc_engine.submit(audio)
+            )
+        else:
+            with profiler.batch("ctc_transcribe"):
+                result, confidence = transcribe_with_confidence(model.pipeline, audio)
+        metrics.increment("cascade_requests_total")
+
+        if confidence >= CASCADE_CONFIDENCE_THRESHOLD:
+            return result
+
+        logger.info(
+            f"CTC confidence {confidence:.3f} below threshold, "
+            f"escalating to {CASCADE_LLM_MODEL_NAME}"
+        )
+        metrics.increment("cascade_escalations_total")
+        return await self._transcribe_pipeline(
+            model, model.cascade_pipeline, audio, lang_param
+        )
+
+    async def _transcribe_pipeline(
+        self,
+        model: LoadedModel,
+        pipeline: ASRInferencePipeline,
+        audio: bytes | dict,
+        lang_param: str | None,
+    ) -> str:
+        if model.llm_engine is not None and model.llm_engine.pipeline is pipeline:
+            # Decoded with continuous batching alongside other requests
+            return await asyncio.wrap_future(model.llm_engine.submit(audio, lang_param))
+
+        if model.ctc_engine is not None and model.ctc_engine.pipeline is pipeline:
+            # Decoded in pipelined stages, batched with other requests
+            text, _ = await asyncio.wrap_future(model.ctc_engine.submit(audio))
+            return text
+
+        with profiler.batch("pipeline_transcribe"):
+            if lang_param:
+                transcriptions = pipeline.transcribe(
+                    [audio], lang=[lang_param], batch_size=1
+                )
+            else:
+                transcriptions = pipeline.transcribe([audio], batch_size=1)
+
+        return transcriptions[0] if transcriptions else ""
+
 
 # Global service instance
 asr_service = OmnilingualASRService()
+metrics.register_collector(asr_service.stage_stats)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """FastAPI lifespan handler - load model on startup."""
+    """FastAPI lifespan handler - load model on startup, stop workers on shutdown."""
 
     asr_service.load_model()
     yield
+    asr_service.shutdown()
@@ -0,0 +1,165 @@
+"""
+Shared-memory audio handoff between front-end workers and the engine process.
+
+Each front-end worker owns a shared-memory ring buffer. It writes decoded
+audio into the ring and sends only a small message with the audio's offset
+and shape to the engine over a Unix socket. The engine maps the same segment
+and reads the samples in place, so audio is never serialized between
+processes. Results come back over the socket and the worker then frees the
+ring space.
+
+Nothing here imports torch, as front-end workers must stay lightweight.
+"""
+
+import asyncio
+import json
+import struct
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# Header and payload lengths that prefix every socket message
+_FRAME = struct.Struct("!II")
+
+
+@dataclass
+class _Allocation:
+    offset: int
+    nbytes: int
+    freed: bool = False
+
+
+class SharedAudioBuffer:
+    """
+    Ring buffer of decoded audio in a shared-memory segment.
+
+    Space is allocated at the head and reclaimed from the tail. Requests may
+    finish out of order, so freed allocations are only reclaimed once every
+    allocation before them is freed too. Writers wait while the ring is full.
+    """
+
+    def __init__(self, size: int):
+        self.shm = SharedMemory(create=True, size=size)
+        self.size = size
+        self._allocations: deque[_Allocation] = deque()
+        self._head = 0
+        self._space = asyncio.Condition()
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(allocation.nbytes for allocation in self._allocations)
+
+    async def write(self, samples: np.ndarray) -> int:
+        """Copy `samples` into the ring and return their offset."""
+
+        samples = np.ascontiguousarray(samples)
+        if samples.nbytes > self.size:
+            raise ValueError(
+                f"{samples.nbytes} bytes of audio exceed the {self.size} byte buffer"
+            )
+
+        async with self._space:
+            offset = self._reserve(samples.nbytes)
+            while offset is None:
+                await self._space.wait()
+                offset = self._reserve(samples.nbytes)
+
+        view = np.ndarray(
+            samples.shape, samples.dtype, buffer=self.shm.buf, offset=offset
+        )
+        view[...] = samples
+        return offset
+
+    async def free(self, offset: int) -> None:
+        """Release the allocation at `offset`."""
+
+        for allocation in self._allocations:
+            if allocation.offset == offset and not allocation.freed:
+                allocation.freed = True
+                break
+
+        while self._allocations and self._allocations[0].freed:
+            self._allocations.popleft()
+
+        async with self._space:
+            self._space.notify_all()
+
+    def _reserve(self, nbytes: int) -> int | None:
+        if not self._allocations:
+            self._head = 0
+
+        # Aligned for any sample dtype
+        nbytes = -(-nbytes // 8) * 8
+        tail = self._allocations[0].offset if self._allocations else 0
+
+        if not self._allocations or self._head > tail:
+            # Free space is [head, size), then [0, tail) after wrapping
+            if self._head + nbytes <= self.size:
+                offset = self._head
+            elif nbytes <= tail:
+                offset = 0
+            else:
+                return None
+        elif self._head + nbytes <= tail:
+            # Wrapped: free space is [head, tail)
+            offset = self._head
+        else:
+            return None
+
+        self._allocations.append(_Allocation(offset, nbytes))
+        self._head = offset + nbytes
+        return offset
+
+    def close(self) -> None:
+        """Release and remove the shared-memory segment."""
+
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_shared_memory(name: str) -> SharedMemory:
+    """
+    Map a segment created by another process.
+
+    Python < 3.13 registers every mapped segment with the resource tracker,
+    which would remove it when this process exits even though the front-end
+    worker owns it.
+    """
+
+    shm = SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def read_samples(
+    shm: SharedMemory, offset: int, shape: list[int], dtype: str = "float32"
+) -> np.ndarray:
+    """View of samples written by `SharedAudioBuffer.write`, without copying."""
+
+    return np.ndarray(tuple(shape), np.dtype(dtype), buffer=shm.buf, offset=offset)
+
+
+async def send_message(
+    writer: asyncio.StreamWriter, header: dict, payload: bytes = b""
+) -> None:
+    """Send a JSON header and optional binary payload as one frame."""
+
+    data = json.dumps(header).encode()
+    writer.write(_FRAME.pack(len(data), len(payload)) + data + payload)
+    await writer.drain()
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[dict, bytes]:
+    """Read a frame sent by `send_message`. Raises `IncompleteReadError` at EOF."""
+
+    header_size, payload_size = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    header = json.loads(await reader.readexactly(header_size))
+    payload = await reader.readexactly(payload_size) if payload_size else b""
+    return header, payload
@@ -0,0 +1,362 @@
+"""
+Pipelined CTC inference.
+
+`ASRInferencePipeline.transcribe` decodes, collates, runs the model and
+decodes tokens one after another, so the accelerator idles while audio is
+decoded and the CPU idles during the forward pass. Here each step is a stage
+with its own thread, connected by bounded queues:
+
+    decode -> collate -> infer -> postprocess
+
+The work of each stage is done by a `CTCBackend` (see `app.backends`), which
+decides how the model is run. With an encoder cache, the decode stage answers
+clips seen before from their cached frames, without batching them.
+
+While batch N runs on the model, batch N+1 is collated and batch N-1 is
+post-processed and returned to its callers. The queues between collate, infer
+and postprocess hold a single batch each (double buffering), so at most a few
+batches are in flight and memory stays bounded.
+
+Every stage reports how busy it was over the last window, which shows where
+the bottleneck is: a stage near 100% limits throughput, and the queue in front
+of it fills up.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+import torch
+from fairseq2.models.wav2vec2.asr import Wav2Vec2AsrModel
+from omnilingual_asr.models.inference.pipeline import ASRInferencePipeline
+from torch import Tensor
+
+from app.backends import SAMPLE_RATE, CTCBackend, CTCBatch, CTCFrames
+from app.encoder_cache import EncoderCache, audio_digest
+from app.profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("decode", "collate", "infer", "postprocess")
+# Utilization is reported over windows of this many seconds
+UTILIZATION_WINDOW_SECONDS = 10.0
+
+# Marks the end of a stage's input
+_STOP = None
+
+
+def supports_staged_pipeline(pipeline: ASRInferencePipeline) -> bool:
+    """Whether the pipeline's model can be served by `StagedCTCEngine`."""
+
+    return isinstance(pipeline.model, Wav2Vec2AsrModel)
+
+
+@dataclass
+class _Request:
+    future: Future
+    audio: bytes | dict
+    waveform: Tensor | None = None
+    # Audio hash, set when results are cached
+    digest: str | None = None
+
+
+@dataclass
+class _Batch:
+    requests: list[_Request]
+    inputs: CTCBatch | None = None
+    frames: CTCFrames | None = None
+
+
+class StageTimer:
+    """Busy time of a stage, reported as a fraction of the last full window."""
+
+    def __init__(self, workers: int = 1, window: float = UTILIZATION_WINDOW_SECONDS):
+        self.workers = workers
+        self.window = window
+        self.busy_seconds_total = 0.0
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_busy = 0.0
+        self._utilization = 0.0
+
+    def record(self, start: float, end: float) -> None:
+        """Add the busy interval [start, end) from `time.monotonic()`."""
+
+        with self._lock:
+            self.busy_seconds_total += end - start
+            self._roll(end)
+            self._window_busy += end - max(start, self._window_start)
+
+    @property
+    def utilization(self) -> float:
+        with self._lock:
+            self._roll(time.monotonic())
+            return self._utilization
+
+    def _roll(self, now: float) -> None:
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return
+
+        # A window with no activity at all reads as idle
+        windows = int(elapsed // self.window)
+        capacity = self.window * self.workers
+        self._utilization = (
+            min(1.0, self._window_busy / capacity) if windows == 1 else 0.0
+        )
+        self._window_start += windows * self.window
+        self._window_busy = 0.0
+
+
+class StagedCTCEngine:
+    """Pipelined batch transcription for `omniASR_CTC_*` models."""
+
+    def __init__(
+        self,
+        backend: CTCBackend,
+        batch_size_for: Callable[[float], int],
+        decode_threads: int = 2,
+        cache: EncoderCache | None = None,
+        model_name: str = "",
+    ):
+        self.backend = backend
+        self.cache = cache
+        self.model_name = model_name
+        self.pipeline = backend.pipeline
+        self._batch_size_for = batch_size_for
+        self.max_batch_size = self.batch_size_for(0)
+        self.decode_threads = decode_threads
+
+        self._requests: queue.Queue[_Request | None] = queue.Queue()
+        self._decoded: queue.Queue[_Request | None] = queue.Queue(
+            maxsize=2 * self.max_batch_size
+        )
+        self._collated: queue.Queue[_Batch | None] = queue.Queue(maxsize=1)
+        self._inferred: queue.Queue[_Batch | None] = queue.Queue(maxsize=1)
+        self.timers = {
+            stage: StageTimer(decode_threads if stage == "decode" else 1)
+            for stage in STAGES
+        }
+
+        self._batches_in_flight = 0
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._decoders: list[threading.Thread] = []
+        self._threads: list[threading.Thread] = []
+
+    def batch_size_for(self, duration: float) -> int:
+        """Batch size for audio of `duration` seconds, within the backend's limit."""
+
+        batch_size = self._batch_size_for(duration)
+        if self.backend.max_batch_size is not None:
+            batch_size = min(batch_size, self.backend.max_batch_size)
+        return batch_size
+
+    @property
+    def max_in_flight(self) -> int:
+        """Requests needed to keep every stage busy."""
+
+        return len(STAGES) * self.max_batch_size
+
+    @property
+    def batches_in_flight(self) -> int:
+        return self._batches_in_flight
+
+    def start(self) -> None:
+        """Start one thread per stage, and `decode_threads` decoders."""
+
+        self._decoders = [
+            threading.Thread(target=self._decode, name=f"ctc-decode-{i}", daemon=True)
+            for i in range(self.decode_threads)
+        ]
+        self._threads = [
+            threading.Thread(target=target, name=f"ctc-{name}", daemon=True)
+            for name, target in (
+                ("collate", self._collate),
+                ("infer", self._infer),
+                ("postprocess", self._postprocess),
+            )
+        ]
+        for thread in self._decoders + self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Finish queued requests and stop all stages."""
+
+        with self._lock:
+            self._stopped = True
+
+        for _ in self._decoders:
+            self._requests.put(_STOP)
+        for thread in self._decoders:
+            thread.join()
+        self._decoded.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._decoders = self._threads = []
+
+    def submit(self, audio: bytes | dict) -> Future:
+        """Queue raw or decoded audio. The future resolves to (text, confidence)."""
+
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("Staged engine stopped")
+            request = _Request(future=Future(), audio=audio)
+            self._requests.put(request)
+        return request.future
+
+    def stats(self) -> dict[str, float]:
+        """Utilization of every stage and depth of the queue in front of it."""
+
+        depths = {
+            "decode": self._requests.qsize(),
+            "collate": self._decoded.qsize(),
+            "infer": self._collated.qsize(),
+            "postprocess": self._inferred.qsize(),
+        }
+        stats = {}
+        for stage, timer in self.timers.items():
+            stats[f'stage_utilization{{stage="{stage}"}}'] = timer.utilization
+            stats[f'stage_busy_seconds_total{{stage="{stage}"}}'] = (
+                timer.busy_seconds_total
+            )
+            stats[f'stage_queue_depth{{stage="{stage}"}}'] = depths[stage]
+        return stats
+
+    def _decode(self) -> None:
+        """Decode, resample and normalize audio."""
+
+        with torch.inference_mode():
+            while (request := self._requests.get()) is not _STOP:
+                start = time.monotonic()
+                try:
+                    if self._answer_from_cache(request):
+                        request = None
+                    else:
+                        request.waveform = self.backend.prepare(request.audio)
+                        request.audio = None
+                except Exception as e:
+                    logger.exception("Decoding staged audio failed")
+                    request.future.set_exception(e)
+                    request = None
+                self.timers["decode"].record(start, time.monotonic())
+
+                if request is not None:
+                    self._decoded.put(request)
+
+    def _answer_from_cache(self, request: _Request) -> bool:
+        """Resolve `request` from cached frames, if its audio was seen before."""
+
+        if self.cache is None:
+            return False
+
+        request.digest = audio_digest(request.audio)
+        frames = self.cache.get(self.model_name, request.digest)
+        if frames is None:
+            return False
+
+        request.future.set_result(self.backend.decode_batch(frames)[0])
+        return True
+
+    def _collate(self) -> None:
+        """Group decoded audio into a padded batch on the model's device."""
+
+        with torch.inference_mode():
+            while (request := self._decoded.get()) is not _STOP:
+                start = time.monotonic()
+                requests = [request]
+                stopping = False
+                longest = request.waveform.size(0) / SAMPLE_RATE
+                # Take what is already decoded, the model must not wait for more
+                while len(requests) < self.batch_size_for(longest):
+                    try:
+                        request = self._decoded.get_nowait()
+                    except queue.Empty:
+                        break
+                    if request is _STOP:
+                        stopping = True
+                        break
+                    requests.append(request)
+                    longest = max(longest, request.waveform.size(0) / SAMPLE_RATE)
+
+                try:
+                    inputs = self.backend.collate(
+                        [request.waveform for request in requests]
+                    )
+                except Exception as e:
+                    logger.exception("Collating staged batch failed")
+                    self._fail(requests, e)
+                else:
+                    for request in requests:
+                        request.waveform = None
+                    with self._lock:
+                        self._batches_in_flight += 1
+                    self.timers["collate"].record(start, time.monotonic())
+                    self._collated.put(_Batch(requests, inputs))
+
+                if stopping:
+                    break
+
+        self._collated.put(_STOP)
+
+    def _infer(self) -> None:
+        """Run the model and reduce the logits to the most likely tokens."""
+
+        with torch.inference_mode():
+            while (batch := self._collated.get()) is not _STOP:
+                start = time.monotonic()
+                try:
+                    with profiler.batch("ctc_infer"):
+                        batch.frames = self.backend.encode(batch.inputs)
+                    batch.inputs = None
+                except Exception as e:
+                    logger.exception("Staged batch inference failed")
+                    self._finish_batch()
+                    self._fail(batch.requests, e)
+                    continue
+                finally:
+                    self.timers["infer"].record(start, time.monotonic())
+
+                self._inferred.put(batch)
+
+        self._inferred.put(_STOP)
+
+    def _postprocess(self) -> None:
+        """Decode tokens to text and return results to the callers."""
+
+        while (batch := self._inferred.get()) is not _STOP:
+            start = time.monotonic()
+            try:
+                results = self.backend.decode_batch(batch.frames)
+            except Exception as e:
+                logger.exception("Decoding staged batch tokens failed")
+                self._fail(batch.requests, e)
+            else:
+                for request, result in zip(batch.requests, results):
+                    request.future.set_result(result)
+                self._cache_frames(batch)
+            self._finish_batch()
+            self.timers["postprocess"].record(start, time.monotonic())
+
+    def _cache_frames(self, batch: _Batch) -> None:
+        """Cache the frames of each clip, after the callers have their results."""
+
+        for i, request in enumerate(batch.requests):
+            if request.digest is None:
+                continue
+            try:
+                self.cache.put(self.model_name, request.digest, batch.frames.row(i))
+            except Exception:
+                logger.exception("Caching encoder output failed")
+
+    def _finish_batch(self) -> None:
+        with self._lock:
+            self._batches_in_flight -= 1
+
+    def _fail(self, requests: list[_Request], e: Exception) -> None:
+        for request in requests:
+            request.future.set_exception(e)
@@ -0,0 +1,78 @@
+"""
+Transcription upload handling shared by the API server and front-end workers.
+
+Front-end workers never import torch, so nothing here may depend on the model.
+"""
+
+import logging
+
+from fastapi import UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.exceptions import APIError
+from app.scheduler import Priority
+from app.schemas import TranscriptionResponse
+
+logger = logging.getLogger(__name__)
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    """Read the uploaded audio file, rejecting missing and empty files."""
+    if not file.filename:
+        logger.warning("Transcription request rejected: no file provided")
+        raise APIError(
+            status_code=400,
+            message="No file provided",
+            param="file",
+        )
+
+    audio_bytes = await file.read()
+
+    if len(audio_bytes) == 0:
+        logger.warning("Transcription request rejected: empty file")
+        raise APIError(
+            status_code=400,
+            message="Empty file provided",
+            param="file",
+        )
+
+    return audio_bytes
+
+
+def parse_priority(value: str) -> Priority:
+    """Parse the X-Priority header."""
+    try:
+        return Priority[value.upper()]
+    except KeyError:
+        raise APIError(
+            status_code=400,
+            message=f"Invalid priority {value}. Use interactive or batch.",
+            param="X-Priority",
+        )
+
+
+def check_audio_length(duration: float | None, max_audio_seconds: float | None) -> None:
+    """Reject audio longer than the model accepts, when both lengths are known."""
+    if duration is None or max_audio_seconds is None or duration <= max_audio_seconds:
+        return
+
+    logger.warning(
+        f"Transcription request rejected: {duration:.1f}s audio exceeds "
+        f"{max_audio_seconds}s"
+    )
+    raise APIError(
+        status_code=400,
+        message=f"Audio file is too long. The maximum audio length is {max_audio_seconds} seconds.",
+        param="file",
+        code="invalid_audio_length",
+    )
+
+
+def transcription_response(
+    text: str, response_format: str
+) -> JSONResponse | PlainTextResponse:
+    """Format the transcript for the requested response format."""
+    if response_format == "text":
+        return PlainTextResponse(content=text)
+
+    return JSONResponse(content=TranscriptionResponse(text=text).model_dump())
@@ -11,6 +11,10 @@
 #                   The model name is used to generate the image tag suffix.
 #                   Example: omniASR_LLM_1B_v2
 #
+#   PRECAST_DTYPES - Comma-separated dtypes to pre-cast the checkpoint to
+#                   (default: bfloat16). Use float16 for GPUs with compute
+#                   capability below 8.0, e.g. T4.
+#
 #   NAMESPACE     - Namespace/registry prefix for the image name (optional)
 #                   If provided, images will be tagged as NAMESPACE/omniasr-server
 #                   Example: abc/omniasr-server
@@ -48,6 +52,7 @@
 
 
 MODEL_NAME=${MODEL_NAME:-omniASR_LLM_300M_v2}
+PRECAST_DTYPES=${PRECAST_DTYPES:-bfloat16}
 BASE_TAG=cu126-pt280
 
 # Convert model name to tag suffix, e.g.:
@@ -75,6 +80,7 @@ fi
 BUILD_CMD="docker buildx build \
     --platform linux/amd64 \
     --build-arg MODEL_NAME=$MODEL_NAME \
+    --build-arg PRECAST_DTYPES=$PRECAST_DTYPES \
     $TAGS"
 
 # Optionally push
@@ -3,10 +3,13 @@ Entry point for the Omnilingual-ASR FastAPI server.
 """
 
 import logging
+import multiprocessing
 import os
 
 import uvicorn
 
+from app.config import FRONTEND_WORKERS
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -15,13 +18,38 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def run_engine(host: str, port: int):
+    """Engine process: loads the model and serves front-end workers."""
+    uvicorn.run("app.server:app", host=host, port=port, reload=False)
+
+
 def main():
     port = int(os.environ.get("OMNILINGUAL_PORT", "8080"))
     host = os.environ.get("OMNILINGUAL_HOST", "0.0.0.0")
 
-    logger.info(f"Starting Omnilingual-ASR server on {host}:{port}")
-
-    uvicorn.run("app.server:app", host=host, port=port, reload=False)
+    if not FRONTEND_WORKERS:
+        logger.info(f"Starting Omnilingual-ASR server on {host}:{port}")
+        uvicorn.run("app.server:app", host=host, port=port, reload=False)
+        return
+
+    # The engine also serves /load, /metrics and /admin on its own local port,
+    # besides the workers forwarding them over the engine socket
+    engine_port = int(os.environ.get("OMNILINGUAL_ENGINE_PORT", str(port + 1)))
+    logger.info(f"Starting Omnilingual-ASR engine on 127.0.0.1:{engine_port}")
+    engine = multiprocessing.get_context("spawn").Process(
+        target=run_engine, args=("127.0.0.1", engine_port)
+    )
+    engine.start()
+
+    logger.info(
+        f"Starting {FRONTEND_WORKERS} Omnilingual-ASR front-end workers on "
+        f"{host}:{port}"
+    )
+    try:
+        uvicorn.run("app.frontend:app", host=host, port=port, workers=FRONTEND_WORKERS)
+    finally:
+        engine.terminate()
+        engine.join()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+"""Benchmark the model on this host and save a tuning profile.
+
+Run from the repository root with `python -m scripts.autotune`. The server
+loads the profile at startup on hosts with the same hardware fingerprint.
+"""
+
+import argparse
+import logging
+
+from app.autotune import autotune, load_profile, save_profile, select_device
+from app.config import MODEL_NAME
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--force", action="store_true", help="Re-tune even if a profile exists"
+    )
+    args = parser.parse_args()
+
+    device = select_device()
+    profile = load_profile(MODEL_NAME, device)
+    if profile is not None and not args.force:
+        print(f"Tuning profile already exists for {MODEL_NAME} on this host: {profile}")
+        return
+
+    print(f"Autotuning {MODEL_NAME} on {device}")
+    profile = autotune(MODEL_NAME, device)
+    path = save_profile(profile)
+    print(f"Tuning profile written to: {path}")
+    print(
+        f"dtype={profile.dtype}, intra_op_threads={profile.intra_op_threads}, "
+        f"inter_op_threads={profile.inter_op_threads}, batch_sizes={profile.batch_sizes}"
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
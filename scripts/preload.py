@@ -1,12 +1,22 @@
-"""Pre-download model and tokenizer to cache."""
+"""Pre-download model and tokenizer to cache and write pre-cast checkpoints.
+
+Run from the repository root with `python -m scripts.preload`.
+"""
 
 import os
 
+import torch
 from fairseq2.assets import AssetDownloadManager, AssetStore
 from fairseq2.data.tokenizers.ref import resolve_tokenizer_reference
+from fairseq2.models.hub import load_model
 from fairseq2.runtime.dependency import get_dependency_resolver
 
-MODEL_NAME = os.getenv("MODEL_NAME", "omniASR_CTC_300M_v2")
+from app.checkpoints import precast_checkpoint_path, save_precast_checkpoint
+from app.config import MODEL_NAME
+
+# Comma-separated dtypes to pre-cast the checkpoint to. The server picks
+# bfloat16, or float16 on CUDA devices with compute capability < 8.0 (e.g. T4).
+PRECAST_DTYPES = os.getenv("PRECAST_DTYPES", "bfloat16")
 
 
 def preload_model():
@@ -40,5 +50,24 @@ def preload_model():
     print(f"All assets for {MODEL_NAME} downloaded successfully!")
 
 
+def precast_model():
+    """Write memory-mappable checkpoints already cast to the serving dtypes."""
+    for dtype_name in PRECAST_DTYPES.split(","):
+        dtype = getattr(torch, dtype_name.strip())
+        path = precast_checkpoint_path(MODEL_NAME, dtype)
+        if path.exists():
+            print(f"Pre-cast checkpoint already exists: {path}")
+            continue
+
+        print(f"Casting {MODEL_NAME} to {dtype}")
+        model = load_model(
+            MODEL_NAME, device=torch.device("cpu"), dtype=dtype, mmap=True
+        )
+        save_precast_checkpoint(model, path, dtype)
+        del model
+        print(f"Pre-cast checkpoint written to: {path}")
+
+
 if __name__ == "__main__":
     preload_model()
+    precast_model()
@@ -0,0 +1,115 @@
+"""
+Micro-benchmark harness.
+
+Benchmarks are skipped unless `BENCHMARK=1` is set, as timings are only
+meaningful on a quiet machine:
+
+    BENCHMARK=1 python -m pytest tests/benchmarks             # compare to baselines
+    BENCHMARK=1 BENCHMARK_UPDATE=1 python -m pytest tests/benchmarks  # record baselines
+
+Timings are stored relative to a fixed pure-Python calibration workload
+measured in the same run, so baselines recorded on one machine stay usable on
+a faster or slower one. A benchmark fails when its relative time exceeds the
+baseline by more than `BENCHMARK_TOLERANCE` (default 0.25, i.e. 25% slower).
+"""
+
+import asyncio
+import json
+import os
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+ENABLED = os.getenv("BENCHMARK", "") == "1"
+UPDATE = os.getenv("BENCHMARK_UPDATE", "") == "1"
+TOLERANCE = float(os.getenv("BENCHMARK_TOLERANCE", "0.25"))
+# Each timing is the best of this many runs of at least 0.2 seconds
+REPEATS = 5
+
+
+def pytest_collection_modifyitems(config, items):
+    if ENABLED:
+        return
+    skip = pytest.mark.skip(reason="Set BENCHMARK=1 to run micro-benchmarks")
+    for item in items:
+        if "benchmarks" in item.path.parts:
+            item.add_marker(skip)
+
+
+def time_per_call(fn: Callable[[], object]) -> float:
+    """Best time of one call to `fn`, in seconds."""
+
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=REPEATS, number=number)) / number
+
+
+def calibration_workload() -> int:
+    return sum(i * i for i in range(1000))
+
+
+@pytest.fixture(scope="session")
+def baselines():
+    """Stored baselines, rewritten at the end of the session when updating."""
+
+    data = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+    recorded = {}
+    yield data, recorded
+
+    if UPDATE and recorded:
+        data.update(recorded)
+        BASELINES_PATH.write_text(
+            json.dumps(dict(sorted(data.items())), indent=2) + "\n"
+        )
+
+
+@pytest.fixture(scope="session")
+def calibration() -> float:
+    return time_per_call(calibration_workload)
+
+
+@pytest.fixture
+def benchmark(request, baselines, calibration):
+    """
+    Time a callable (or a coroutine function) and compare it to its baseline,
+    stored under the test's name.
+    """
+
+    data, recorded = baselines
+    loop = asyncio.new_event_loop()
+
+    def run(fn: Callable[[], object]) -> float:
+        call = fn
+        if asyncio.iscoroutinefunction(fn):
+
+            def call() -> object:
+                return loop.run_until_complete(fn())
+
+        seconds = time_per_call(call)
+        relative = seconds / calibration
+        name = request.node.name
+        recorded[name] = {
+            "relative": float(f"{relative:.4g}"),
+            "seconds": float(f"{seconds:.4g}"),
+        }
+
+        if UPDATE:
+            return seconds
+
+        baseline = data.get(name)
+        if baseline is None:
+            pytest.fail(f"No baseline for {name}, record one with BENCHMARK_UPDATE=1")
+
+        limit = baseline["relative"] * (1 + TOLERANCE)
+        assert relative <= limit, (
+            f"{name} regressed: {relative:.3f}x calibration, baseline "
+            f"{baseline['relative']:.3f}x (limit {limit:.3f}x), "
+            f"{seconds * 1e6:.1f}us per call"
+        )
+        return seconds
+
+    yield run
+    loop.close()
@@ -0,0 +1,121 @@
+"""Micro-benchmarks for the per-request costs outside the model."""
+
+import io
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.exceptions import APIError
+from app.handlers import handle_runtime_error
+from app.languages import map_whisper_to_omnilingual
+from app.server import app
+from app.uploads import read_upload, transcription_response
+
+TRANSCRIPT = "the quick brown fox jumps over the lazy dog " * 20
+
+
+def wav_bytes(seconds: float = 5.0) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(int(seconds * 16000), np.float32), 16000, format="WAV")
+    return buffer.getvalue()
+
+
+def multipart_body(audio: bytes) -> tuple[bytes, str]:
+    boundary = "benchmarkboundary"
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="audio.wav"\r\n'
+        "Content-Type: audio/wav\r\n\r\n"
+    ).encode()
+    body += audio
+    body += (
+        f"\r\n--{boundary}\r\n"
+        'Content-Disposition: form-data; name="language"\r\n\r\n'
+        f"en\r\n--{boundary}--\r\n"
+    ).encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Test client with a stubbed model that answers instantly."""
+    with patch("app.service.asr_service") as mock_service:
+        mock_service.load_model = MagicMock()
+        mock_service.max_concurrency = 1
+        with (
+            TestClient(app) as test_client,
+            patch("app.routes.asr_service") as routes_service,
+            patch("app.load.asr_service") as load_service,
+        ):
+            routes_service.max_audio_seconds = 40
+            routes_service.transcribe = AsyncMock(return_value=TRANSCRIPT)
+            load_service.model_name = "omniASR_CTC_300M_v2"
+            load_service.model = None
+            load_service.realtime_factor = None
+            yield test_client
+
+
+@pytest.mark.parametrize("language", ["en", "english", "eng_Latn", "zul_Latn"])
+def test_map_language(benchmark, language):
+    benchmark(lambda: map_whisper_to_omnilingual(language))
+
+
+def test_multipart_parse_and_read(benchmark):
+    body, content_type = multipart_body(wav_bytes())
+
+    async def parse():
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        request = Request(
+            {
+                "type": "http",
+                "method": "POST",
+                "headers": [(b"content-type", content_type.encode())],
+            },
+            receive,
+        )
+        form = await request.form()
+        await read_upload(form["file"])
+        await form.close()
+
+    benchmark(parse)
+
+
+def test_transcription_endpoint(benchmark, client):
+    audio = wav_bytes()
+
+    def post():
+        response = client.post(
+            "/v1/audio/transcriptions",
+            files={"file": ("audio.wav", audio, "audio/wav")},
+            data={"language": "en"},
+        )
+        assert response.status_code == 200
+
+    benchmark(post)
+
+
+@pytest.mark.parametrize(
+    "cause", ["Error in sndfile decoder", "exceeds max audio length", "out of memory"]
+)
+def test_handle_runtime_error(benchmark, cause):
+    error = RuntimeError("pipeline failed")
+    error.__cause__ = RuntimeError(cause)
+
+    def handle():
+        try:
+            handle_runtime_error(error)
+        except APIError:
+            pass
+
+    benchmark(handle)
+
+
+@pytest.mark.parametrize("response_format", ["json", "text"])
+def test_transcription_response(benchmark, response_format):
+    benchmark(lambda: transcription_response(TRANSCRIPT, response_format))
@@ -0,0 +1,97 @@
+"""Integration tests for admin API routes."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.profiling import Profiler
+from app.server import app
+
+ADMIN_HEADERS = {"Authorization": "Bearer admin-secret"}
+
+
+@pytest.fixture
+def client():
+    """Create a test client with mocked model loading and an admin key."""
+    with (
+        patch("app.service.asr_service") as mock_service,
+        patch("app.admin.ADMIN_API_KEY", "admin-secret"),
+    ):
+        mock_service.load_model = MagicMock()
+        with TestClient(app) as test_client:
+            yield test_client
+
+
+def test_admin_disabled_without_key(client: TestClient):
+    """Admin routes should be disabled when no admin key is configured."""
+    with patch("app.admin.ADMIN_API_KEY", ""):
+        response = client.get("/admin/model", headers=ADMIN_HEADERS)
+
+    assert response.status_code == 403
+
+
+def test_admin_rejects_wrong_key(client: TestClient):
+    """Admin routes should require the admin key."""
+    response = client.get("/admin/model", headers={"Authorization": "Bearer nope"})
+
+    assert response.status_code == 401
+    assert response.json()["error"]["code"] == "invalid_api_key"
+
+
+def test_swap_model_starts_in_background(client: TestClient):
+    """A swap request should start loading and return immediately."""
+    with patch("app.admin.asr_service") as mock_service:
+        mock_service.swap_in_progress = False
+        mock_service.model_name = "omniASR_CTC_300M_v2"
+        mock_service.loading_model_name = "omniASR_LLM_300M_v2"
+        mock_service.swap_error = None
+        response = client.post(
+            "/admin/model", json={"model": "omniASR_LLM_300M_v2"}, headers=ADMIN_HEADERS
+        )
+
+    assert response.status_code == 202
+    assert response.json()["loading"] == "omniASR_LLM_300M_v2"
+    mock_service.start_swap.assert_called_once_with("omniASR_LLM_300M_v2")
+
+
+def test_swap_model_conflict(client: TestClient):
+    """Only one swap should run at a time."""
+    with patch("app.admin.asr_service") as mock_service:
+        mock_service.swap_in_progress = True
+        response = client.post(
+            "/admin/model", json={"model": "omniASR_LLM_300M_v2"}, headers=ADMIN_HEADERS
+        )
+
+    assert response.status_code == 409
+    mock_service.start_swap.assert_not_called()
+
+
+def test_profile_requires_bounds(client: TestClient):
+    """A profiling session should be bounded by batches or seconds."""
+    response = client.post("/admin/profile", json={}, headers=ADMIN_HEADERS)
+
+    assert response.status_code == 400
+
+
+def test_profile_starts_session(client: TestClient, tmp_path):
+    """A profiling request should start a session and report it."""
+    with (
+        patch("app.admin.profiler", Profiler()) as profiler,
+        patch("app.profiling.PROFILE_DIR", str(tmp_path)),
+    ):
+        response = client.post(
+            "/admin/profile", json={"batches": 5, "seconds": 30}, headers=ADMIN_HEADERS
+        )
+        conflict = client.post(
+            "/admin/profile", json={"batches": 5}, headers=ADMIN_HEADERS
+        )
+        status = client.get("/admin/profile", headers=ADMIN_HEADERS)
+        trace = client.get("/admin/profile/trace", headers=ADMIN_HEADERS)
+        profiler.finish()
+
+    assert response.status_code == 202
+    assert response.json()["state"] == "running"
+    assert conflict.status_code == 409
+    assert status.json()["id"] == response.json()["id"]
+    assert trace.status_code == 404
@@ -0,0 +1,43 @@
+"""Tests for the audio header probe."""
+
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.audio_probe import probe_audio
+
+
+def make_audio(seconds: float, sample_rate: int, channels: int, format: str) -> bytes:
+    buffer = io.BytesIO()
+    samples = np.zeros((int(seconds * sample_rate), channels), dtype=np.float32)
+    sf.write(buffer, samples, sample_rate, format=format)
+    return buffer.getvalue()
+
+
+class TestProbeAudio:
+    """Tests for reading audio properties from container headers."""
+
+    @pytest.mark.parametrize("format", ["WAV", "FLAC", "OGG"])
+    def test_reads_header(self, format: str):
+        """Duration, sample rate and channels should be read from the header."""
+        info = probe_audio(make_audio(2.5, 22050, 2, format))
+
+        assert info is not None
+        assert info.duration == pytest.approx(2.5, abs=0.01)
+        assert info.sample_rate == 22050
+        assert info.channels == 2
+        assert info.format == format
+
+    def test_unreadable_header(self):
+        """Unknown formats should return None and leave the decision to the decoder."""
+        assert probe_audio(b"not an audio file" * 10) is None
+
+    def test_reads_file_header(self, tmp_path):
+        """A path should be probed like its bytes, and a missing file return None."""
+        path = tmp_path / "audio.flac"
+        path.write_bytes(make_audio(1.5, 16000, 1, "FLAC"))
+
+        assert probe_audio(str(path)).duration == pytest.approx(1.5)
+        assert probe_audio(str(tmp_path / "missing.wav")) is None
@@ -0,0 +1,90 @@
+"""Tests for per-host performance autotuning."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+import torch
+
+from app.autotune import (
+    TuningProfile,
+    load_profile,
+    measure_throughput,
+    save_profile,
+    tune_batch_size,
+)
+
+
+def make_profile(fingerprint: str) -> TuningProfile:
+    return TuningProfile(
+        model_name="omniASR_CTC_300M_v2",
+        fingerprint=fingerprint,
+        device="cpu",
+        dtype="float32",
+        intra_op_threads=4,
+        inter_op_threads=1,
+        batch_sizes={5: 16, 10: 8, 20: 4, 40: 2},
+        throughput=123.0,
+    )
+
+
+class TestTuningProfile:
+    """Tests for saving, loading and using tuning profiles."""
+
+    def test_round_trip_keyed_by_fingerprint(self, tmp_path):
+        """A saved profile should only be loaded on hosts with the same fingerprint."""
+        with (
+            patch("app.autotune.AUTOTUNE_PROFILE_DIR", str(tmp_path)),
+            patch("app.autotune.hardware_fingerprint", return_value="host-a"),
+        ):
+            save_profile(make_profile("host-a"))
+            loaded = load_profile("omniASR_CTC_300M_v2", "cpu")
+
+        with (
+            patch("app.autotune.AUTOTUNE_PROFILE_DIR", str(tmp_path)),
+            patch("app.autotune.hardware_fingerprint", return_value="host-b"),
+        ):
+            other_host = load_profile("omniASR_CTC_300M_v2", "cpu")
+
+        assert loaded == make_profile("host-a")
+        assert loaded.torch_dtype == torch.float32
+        assert other_host is None
+
+    @pytest.mark.parametrize(
+        "duration,expected", [(1.0, 16), (5.0, 16), (7.5, 8), (40.0, 2), (90.0, 2)]
+    )
+    def test_batch_size_for(self, duration: float, expected: int):
+        """Audio should use the batch size of the smallest bucket it fits in."""
+        assert make_profile("host").batch_size_for(duration) == expected
+
+
+class TestTuneBatchSize:
+    """Tests for choosing a batch size from throughput measurements."""
+
+    def test_stops_when_gain_is_small(self):
+        """A larger batch should only be chosen if it is clearly faster."""
+        throughputs = {1: 10.0, 2: 18.0, 4: 30.0, 8: 31.0, 16: 40.0}
+
+        assert tune_batch_size(throughputs.__getitem__) == (4, 30.0)
+
+    def test_stops_at_out_of_memory(self):
+        """The largest batch that fits should be chosen."""
+
+        def measure(batch_size: int) -> float:
+            if batch_size > 2:
+                raise torch.OutOfMemoryError()
+            return 10.0 * batch_size
+
+        assert tune_batch_size(measure) == (2, 20.0)
+
+
+def test_measure_throughput_uses_full_batches():
+    """Throughput should be measured on a batch of synthetic clips."""
+    pipeline = MagicMock()
+
+    assert measure_throughput(pipeline, 5, 4) > 0
+
+    batch = pipeline.transcribe.call_args.args[0]
+    assert len(batch) == 4
+    assert batch[0]["sample_rate"] == 16000
+    assert len(batch[0]["waveform"]) == 5 * 16000
+    assert pipeline.transcribe.call_args.kwargs == {"batch_size": 4}
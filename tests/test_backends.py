@@ -0,0 +1,153 @@
+"""Tests for CTC inference backends."""
+
+from types import SimpleNamespace
+
+import pytest
+import torch
+from fairseq2.models.wav2vec2.asr import Wav2Vec2AsrConfig, create_wav2vec2_asr_model
+
+from app.backends import ExportedCTCBackend, Fairseq2Backend, create_backend
+
+VOCAB_SIZE = 12
+
+
+def tiny_ctc_model(layer_norm_convs=True):
+    """Randomly initialized CTC model, small enough to export in a second."""
+
+    config = Wav2Vec2AsrConfig(target_vocab_size=VOCAB_SIZE, use_masking=False)
+    encoder = config.encoder_config
+    encoder.model_dim = 32
+    encoder.feature_dim = 16
+    # Like the large_lv60k-based CTC cards, so features do not depend on padding
+    encoder.feature_extractor_layer_norm_convs = layer_norm_convs
+    encoder.feature_extractor_layer_descs = (
+        [(16, 10, 5)] + [(16, 3, 2)] * 4 + [(16, 2, 2)] * 2
+    )
+    encoder.pos_conv_kernel_size = 16
+    encoder.num_pos_conv_groups = 4
+    encoder.num_encoder_layers = 2
+    encoder.num_encoder_attn_heads = 4
+    encoder.ffn_inner_dim = 64
+    encoder.layer_drop_p = 0.0
+
+    torch.manual_seed(0)
+    return create_wav2vec2_asr_model(config).eval()
+
+
+class TinyPipeline:
+    """CTC pipeline around a tiny model, taking already decoded waveforms."""
+
+    def __init__(self, model=None):
+        self.model = model or tiny_ctc_model()
+
+    def _build_audio_wavform_pipeline(self, inputs):
+        waveform = torch.as_tensor(inputs[0]["waveform"], dtype=torch.float)
+        return SimpleNamespace(and_return=lambda: iter([waveform]))
+
+    def _create_batch_simple(self, wavs_langs):
+        seq_lens = [wav.size(0) for wav, _ in wavs_langs]
+        seqs = torch.zeros(len(seq_lens), max(seq_lens))
+        for i, (wav, _) in enumerate(wavs_langs):
+            seqs[i, : wav.size(0)] = wav
+        return SimpleNamespace(source_seqs=seqs, source_seq_lens=seq_lens)
+
+    def token_decoder(self, ids):
+        return " ".join(str(i) for i in ids.tolist() if i != 0)
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return TinyPipeline()
+
+
+@pytest.fixture(scope="module")
+def exported(pipeline):
+    return ExportedCTCBackend(pipeline, batch_sizes=(1, 4), bucket_seconds=(0.5, 1))
+
+
+def transcribe(backend, clips):
+    waveforms = [backend.prepare({"waveform": clip}) for clip in clips]
+    with torch.inference_mode():
+        frames = backend.encode(backend.collate(waveforms))
+    return backend.decode_batch(frames)
+
+
+class TestExportedCTCBackend:
+    """Tests for running the CTC model as exported graphs."""
+
+    def test_transcripts_match_fairseq2(self, pipeline, exported):
+        """Clips filling their bucket should be transcribed exactly as by fairseq2."""
+        torch.manual_seed(1)
+        clips = [torch.randn(16000) for _ in range(3)]
+
+        eager = transcribe(Fairseq2Backend(pipeline), clips)
+        results = transcribe(exported, clips)
+
+        assert [text for text, _ in results] == [text for text, _ in eager]
+        assert all(text for text, _ in results)
+        for (_, confidence), (_, expected) in zip(results, eager):
+            assert confidence == pytest.approx(expected, abs=1e-4)
+
+    def test_padded_clips_match_fairseq2(self, pipeline, exported):
+        """Clips shorter than their bucket should be transcribed exactly as by fairseq2."""
+        torch.manual_seed(2)
+        for _ in range(10):
+            lengths = torch.randint(8800, 15200, (3,)).tolist()
+            clips = [torch.randn(n) for n in lengths]
+
+            eager = transcribe(Fairseq2Backend(pipeline), clips)
+            results = transcribe(exported, clips)
+
+            assert [text for text, _ in results] == [text for text, _ in eager]
+            for (_, confidence), (_, expected) in zip(results, eager):
+                assert confidence == pytest.approx(expected, abs=1e-4)
+
+    def test_batch_padded_to_bucket(self, exported):
+        """A batch should be padded to the smallest exported shape that fits it."""
+        clips = [torch.randn(16000), torch.randn(6000), torch.randn(2000)]
+
+        batch = exported.collate([exported.prepare({"waveform": c}) for c in clips])
+
+        assert tuple(batch.seqs.shape) == (4, 16000)
+        assert batch.seq_lens == [16000, 6000, 2000]
+        assert len(transcribe(exported, clips)) == 3
+
+    def test_frames_trimmed_to_clip_length(self, exported):
+        """Frames over a clip's padding should not be decoded."""
+        with torch.inference_mode():
+            frames = exported.encode(exported.collate([torch.randn(4000)]))
+
+        assert frames.pred_ids.shape == (1, 24)
+        assert frames.seq_lens == [12]
+
+    def test_audio_longer_than_buckets(self, exported):
+        """Audio longer than the largest bucket should be rejected."""
+        with pytest.raises(ValueError, match="No exported CTC graph"):
+            exported.collate([torch.randn(20000)])
+
+    def test_limits_batch_size(self, exported):
+        """The engine should never batch more clips than the largest graph."""
+        assert exported.max_batch_size == 4
+
+
+class TestCreateBackend:
+    """Tests for selecting a backend."""
+
+    def test_exported_falls_back_off_cpu(self, pipeline):
+        """The exported backend should only be used on the CPU."""
+        backend = create_backend("exported", pipeline, "cuda", (1,), (1,))
+
+        assert isinstance(backend, Fairseq2Backend)
+
+    def test_exported_falls_back_with_group_norm(self):
+        """Models whose features depend on padding should not be exported."""
+        pipeline = TinyPipeline(tiny_ctc_model(layer_norm_convs=False))
+
+        backend = create_backend("exported", pipeline, "cpu", (1,), (1,))
+
+        assert isinstance(backend, Fairseq2Backend)
+
+    def test_unknown_backend(self, pipeline):
+        """An unknown backend name should be a configuration error."""
+        with pytest.raises(ValueError, match="Unknown CTC backend"):
+            create_backend("onnx", pipeline, "cpu", (1,), (1,))
@@ -0,0 +1,184 @@
+"""Tests for offline bulk transcription."""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.bulk import (
+    BulkItem,
+    Checkpoint,
+    ResultWriter,
+    collect_inputs,
+    plan_batches,
+    transcribe_items,
+)
+
+
+def write_wav(path, seconds: float, channels: int = 1):
+    sf.write(path, np.zeros((int(seconds * 16000), channels), np.float32), 16000)
+
+
+@pytest.fixture
+def audio_dir(tmp_path):
+    audio = tmp_path / "audio"
+    (audio / "nested").mkdir(parents=True)
+    write_wav(audio / "short.wav", 1.0)
+    write_wav(audio / "long.wav", 3.0, channels=2)
+    write_wav(audio / "nested" / "medium.wav", 2.0)
+    (audio / "notes.txt").write_text("not audio")
+    return audio
+
+
+def run(items, tmp_path, transcribe, max_audio_seconds=None):
+    output = tmp_path / "results.jsonl"
+    checkpoint = Checkpoint(tmp_path / "results.jsonl.checkpoint", output)
+    with ResultWriter(output, checkpoint) as writer, ThreadPoolExecutor(2) as pool:
+        transcribe_items(
+            items, transcribe, writer, pool, lambda duration: 2, max_audio_seconds
+        )
+    return [json.loads(line) for line in output.read_text().splitlines()]
+
+
+class TestCollectInputs:
+    """Tests for finding the files to transcribe."""
+
+    def test_directory_is_searched_recursively(self, audio_dir):
+        """Audio files in subdirectories should be found, other files skipped."""
+        items = collect_inputs(audio_dir, language="en")
+
+        assert [item.path for item in items] == [
+            str(audio_dir / "long.wav"),
+            str(audio_dir / "nested" / "medium.wav"),
+            str(audio_dir / "short.wav"),
+        ]
+        assert all(item.language == "en" for item in items)
+
+    def test_jsonl_manifest(self, tmp_path):
+        """Manifest paths should be relative to the manifest and keep their language."""
+        manifest = tmp_path / "manifest.jsonl"
+        manifest.write_text(
+            '{"path": "a.wav", "language": "fr"}\n\n{"path": "/data/b.wav"}\n'
+        )
+
+        items = collect_inputs(manifest, language="en")
+
+        assert items == [
+            BulkItem(str(tmp_path / "a.wav"), "fr"),
+            BulkItem("/data/b.wav", "en"),
+        ]
+
+
+class TestPlanBatches:
+    """Tests for grouping audio into batches."""
+
+    def test_longest_first_and_sized_by_longest(self):
+        """Batches should hold similar durations, sized for their longest audio."""
+        items = [BulkItem(str(i), duration=d) for i, d in enumerate([1, 30, 2, 35, 3])]
+
+        batches = plan_batches(items, lambda duration: 2 if duration > 10 else 3)
+
+        assert [[item.duration for item in batch] for batch in batches] == [
+            [35, 30],
+            [3, 2, 1],
+        ]
+
+    def test_languages_not_mixed_in_a_batch(self):
+        """Items with and without a language should be batched separately."""
+        items = [
+            BulkItem("a", "en", duration=5),
+            BulkItem("b", None, duration=4),
+            BulkItem("c", "fr", duration=3),
+            BulkItem("d", None, duration=2),
+        ]
+
+        batches = plan_batches(items, lambda duration: 4)
+
+        assert [[item.path for item in batch] for batch in batches] == [
+            ["a", "c"],
+            ["b", "d"],
+        ]
+
+
+class TestTranscribeItems:
+    """Tests for transcribing, writing and resuming."""
+
+    def test_results_for_every_file(self, audio_dir, tmp_path):
+        """Every file should get a transcript or an error in the output."""
+        write_wav(audio_dir / "too_long.wav", 5.0)
+        (audio_dir / "broken.wav").write_bytes(b"not audio")
+        batches = []
+
+        def transcribe(audio, languages):
+            batches.append([a["waveform"].shape for a in audio])
+            return [f"{a['waveform'].shape[0]} samples" for a in audio]
+
+        results = run(
+            collect_inputs(audio_dir), tmp_path, transcribe, max_audio_seconds=4
+        )
+
+        by_path = {result["path"].rsplit("/", 1)[-1]: result for result in results}
+        assert by_path["long.wav"]["text"] == "48000 samples"
+        assert by_path["long.wav"]["duration"] == 3.0
+        assert by_path["short.wav"]["text"] == "16000 samples"
+        assert "error" in by_path["too_long.wav"]
+        assert "error" in by_path["broken.wav"]
+        # Longest first, stereo downmixed in the decoding worker
+        assert batches == [[(48000, 1), (32000, 1)], [(16000, 1)]]
+
+    def test_failed_batch_retried_one_file_at_a_time(self, audio_dir, tmp_path):
+        """A file failing inference should only fail itself, and be checkpointed."""
+
+        def fail_on_long(audio, languages):
+            if any(a["waveform"].shape[0] == 48000 for a in audio):
+                raise RuntimeError("out of memory")
+            return ["text"] * len(audio)
+
+        results = run(collect_inputs(audio_dir), tmp_path, fail_on_long)
+
+        by_path = {result["path"].rsplit("/", 1)[-1]: result for result in results}
+        assert by_path["long.wav"] == {
+            "path": str(audio_dir / "long.wav"),
+            "error": "Could not transcribe audio",
+        }
+        assert by_path["medium.wav"]["text"] == "text"
+        assert by_path["short.wav"]["text"] == "text"
+
+        done = Checkpoint(
+            tmp_path / "results.jsonl.checkpoint", tmp_path / "results.jsonl"
+        ).resume()
+        assert done == {item.path for item in collect_inputs(audio_dir)}
+
+    def test_resume_skips_done_files_and_drops_partial_output(
+        self, audio_dir, tmp_path
+    ):
+        """A resumed run should continue after the last checkpointed batch."""
+
+        def interrupt_second_batch(audio, languages):
+            if len(calls) == 1:
+                raise KeyboardInterrupt
+            calls.append(audio)
+            return ["text"] * len(audio)
+
+        calls = []
+        with pytest.raises(KeyboardInterrupt):
+            run(collect_inputs(audio_dir), tmp_path, interrupt_second_batch)
+
+        output = tmp_path / "results.jsonl"
+        with open(output, "a") as f:
+            f.write('{"path": "partial"')
+
+        done = Checkpoint(tmp_path / "results.jsonl.checkpoint", output).resume()
+        remaining = [
+            item for item in collect_inputs(audio_dir) if item.path not in done
+        ]
+        results = run(
+            remaining, tmp_path, lambda audio, languages: ["text"] * len(audio)
+        )
+
+        assert [item.path for item in remaining] == [str(audio_dir / "short.wav")]
+        assert sorted(result["path"] for result in results) == sorted(
+            item.path for item in collect_inputs(audio_dir)
+        )
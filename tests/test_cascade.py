@@ -0,0 +1,99 @@
+"""Tests for CTC-first cascade decoding."""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+import torch
+
+from app.cascade import CTC_BLANK_IDX, ctc_confidence
+from app.metrics import metrics
+from app.service import LoadedModel, OmnilingualASRService, uses_cascade
+
+
+def make_logits(rows: list[tuple[int, float]], vocab_size: int = 4) -> torch.Tensor:
+    """Logits whose softmax puts probability `p` on token `t` for each (t, p) frame."""
+    probs = torch.zeros(len(rows), vocab_size)
+    for i, (token, p) in enumerate(rows):
+        probs[i] = (1 - p) / (vocab_size - 1)
+        probs[i, token] = p
+    return probs.log()
+
+
+class TestCTCConfidence:
+    """Tests for scoring CTC transcripts."""
+
+    def test_ignores_blank_frames(self):
+        """Confident blank frames should not raise the score."""
+        logits = make_logits(
+            [(CTC_BLANK_IDX, 0.99), (1, 0.6), (CTC_BLANK_IDX, 0.99), (2, 0.8)]
+        )
+
+        assert ctc_confidence(logits) == pytest.approx(0.7)
+
+    def test_all_blank_frames(self):
+        """Silence decodes to blanks only and is scored over all frames."""
+        logits = make_logits([(CTC_BLANK_IDX, 0.9), (CTC_BLANK_IDX, 0.7)])
+
+        assert ctc_confidence(logits) == pytest.approx(0.8)
+
+
+@pytest.fixture
+def cascade_service():
+    """Service in cascade mode with mocked CTC and LLM pipelines."""
+    with (
+        patch("app.service.CASCADE_LLM_MODEL_NAME", "omniASR_LLM_300M_v2"),
+        patch("app.service.CASCADE_CONFIDENCE_THRESHOLD", 0.8),
+        patch("app.service.metrics", metrics),
+    ):
+        service = OmnilingualASRService()
+        service.model = LoadedModel(
+            model_name="omniASR_CTC_300M_v2",
+            pipeline=MagicMock(),
+            cascade_pipeline=MagicMock(),
+        )
+        service.model.cascade_pipeline.transcribe.return_value = ["llm text"]
+        yield service
+
+
+class TestCascade:
+    """Tests for escalating low-confidence requests to the LLM model."""
+
+    @pytest.mark.parametrize(
+        "confidence,expected,escalated",
+        [(0.95, "ctc text", 0), (0.5, "llm text", 1)],
+    )
+    def test_escalates_below_threshold(
+        self, cascade_service, confidence, expected, escalated
+    ):
+        """Only transcripts below the confidence threshold should be re-decoded."""
+        requests = metrics.get("cascade_requests_total")
+        escalations = metrics.get("cascade_escalations_total")
+
+        with patch(
+            "app.service.transcribe_with_confidence",
+            return_value=("ctc text", confidence),
+        ):
+            text = asyncio.run(cascade_service.transcribe(b"audio"))
+
+        assert text == expected
+        assert cascade_service.model.cascade_pipeline.transcribe.call_count == escalated
+        assert metrics.get("cascade_requests_total") == requests + 1
+        assert metrics.get("cascade_escalations_total") == escalations + escalated
+
+    def test_escalation_passes_mapped_language(self, cascade_service):
+        """The LLM model should receive the language mapped to its format."""
+        with patch(
+            "app.service.transcribe_with_confidence", return_value=("ctc text", 0.1)
+        ):
+            asyncio.run(cascade_service.transcribe(b"audio", language="en"))
+
+        cascade_service.model.cascade_pipeline.transcribe.assert_called_once_with(
+            [b"audio"], lang=["eng_Latn"], batch_size=1
+        )
+
+    def test_disabled_for_llm_model(self):
+        """An LLM model in MODEL_NAME should never be cascaded."""
+        with patch("app.service.CASCADE_LLM_MODEL_NAME", "omniASR_LLM_1B_v2"):
+            assert uses_cascade("omniASR_CTC_300M_v2")
+            assert not uses_cascade("omniASR_LLM_300M_v2")
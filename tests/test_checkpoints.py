@@ -0,0 +1,64 @@
+"""Tests for pre-cast checkpoint handling."""
+
+from unittest.mock import patch
+
+import torch
+from torch import nn
+
+from app.checkpoints import (
+    assign_precast_checkpoint,
+    precast_checkpoint_path,
+    save_precast_checkpoint,
+)
+
+
+class TinyModel(nn.Module):
+    """Small module with a parameter, a persistent and a non-persistent buffer."""
+
+    def __init__(self):
+        super().__init__()
+        self.proj = nn.Linear(4, 2)
+        self.register_buffer("steps", torch.arange(3))
+        self.register_buffer("freqs", torch.empty(3), persistent=False)
+        self.reset_non_persistent_buffers()
+
+    def reset_non_persistent_buffers(self) -> None:
+        self.freqs.copy_(torch.ones(3))
+
+
+class TestPrecastCheckpoint:
+    """Tests for saving and assigning pre-cast checkpoints."""
+
+    def test_path_includes_model_and_dtype(self, tmp_path):
+        """Checkpoint path should be keyed by model name and dtype."""
+        with patch("app.checkpoints.CHECKPOINT_DIR", str(tmp_path)):
+            path = precast_checkpoint_path("omniASR_CTC_300M_v2", torch.float16)
+
+        assert path == tmp_path / "omniASR_CTC_300M_v2.float16.pt"
+
+    def test_save_casts_floating_point_tensors(self, tmp_path):
+        """Floating point tensors should be cast, integer buffers left alone."""
+        path = tmp_path / "model.pt"
+        save_precast_checkpoint(TinyModel(), path, torch.bfloat16)
+
+        state_dict = torch.load(path, weights_only=True)
+        assert state_dict["proj.weight"].dtype == torch.bfloat16
+        assert state_dict["steps"].dtype == torch.int64
+        assert "freqs" not in state_dict
+        assert not path.with_suffix(".tmp").exists()
+
+    def test_assign_into_meta_model(self, tmp_path):
+        """Weights should be assigned to a meta model and buffers materialized."""
+        source = TinyModel().to(torch.bfloat16)
+        path = tmp_path / "model.pt"
+        save_precast_checkpoint(source, path, torch.bfloat16)
+
+        with torch.device("meta"):
+            model = TinyModel().to(torch.bfloat16)
+
+        assign_precast_checkpoint(model, path)
+
+        assert torch.equal(model.proj.weight, source.proj.weight)
+        assert torch.equal(model.steps, source.steps)
+        assert not model.freqs.is_meta
+        assert torch.equal(model.freqs, torch.ones(3, dtype=torch.bfloat16))
@@ -0,0 +1,93 @@
+"""Tests for the encoder output cache."""
+
+import numpy as np
+import torch
+
+from app.backends import CTCFrames
+from app.encoder_cache import EncoderCache, audio_digest, nbytes
+
+MODEL = "omniASR_CTC_300M_v2"
+
+
+def tensor_of(n_bytes: int) -> torch.Tensor:
+    return torch.zeros(n_bytes, dtype=torch.uint8)
+
+
+class TestEncoderCache:
+    """Tests for the LRU cache with a memory budget."""
+
+    def test_evicts_least_recently_used(self):
+        """Entries should be evicted oldest first to stay within the budget."""
+        cache = EncoderCache(max_bytes=300)
+        cache.put(MODEL, "a", tensor_of(100))
+        cache.put(MODEL, "b", tensor_of(100))
+        cache.put(MODEL, "c", tensor_of(100))
+
+        assert cache.get(MODEL, "a") is not None
+        cache.put(MODEL, "d", tensor_of(100))
+
+        assert cache.get(MODEL, "b") is None
+        assert cache.get(MODEL, "a") is not None
+        assert cache.bytes == 300
+
+    def test_keyed_by_model(self):
+        """Outputs of one model should never be served for another."""
+        cache = EncoderCache(max_bytes=1000)
+        cache.put(MODEL, "a", tensor_of(10))
+
+        assert cache.get("omniASR_LLM_300M_v2", "a") is None
+
+    def test_skips_values_over_budget(self):
+        """A value larger than the whole budget should not flush the cache."""
+        cache = EncoderCache(max_bytes=100)
+        cache.put(MODEL, "a", tensor_of(50))
+        cache.put(MODEL, "b", tensor_of(500))
+
+        assert cache.get(MODEL, "a") is not None
+        assert cache.get(MODEL, "b") is None
+
+    def test_drop_model(self):
+        """Unloading a model should free its entries."""
+        cache = EncoderCache(max_bytes=1000)
+        cache.put(MODEL, "a", tensor_of(10))
+        cache.put("omniASR_LLM_300M_v2", "a", tensor_of(20))
+
+        cache.drop(MODEL)
+
+        assert len(cache) == 1
+        assert cache.bytes == 20
+
+    def test_stats(self):
+        """Stats should report the bytes held and the hit rate."""
+        cache = EncoderCache(max_bytes=1000)
+        cache.put(MODEL, "a", tensor_of(10))
+
+        stats = cache.stats()
+
+        assert stats["encoder_cache_bytes"] == 10
+        assert stats["encoder_cache_entries"] == 1
+        assert 0.0 <= stats["encoder_cache_hit_rate"] <= 1.0
+
+
+class TestHelpers:
+    """Tests for hashing audio and sizing cached values."""
+
+    def test_audio_digest(self):
+        """Equal audio should hash equally, raw or decoded."""
+        waveform = np.arange(100, dtype=np.float32)
+
+        assert audio_digest(b"abc") == audio_digest(b"abc")
+        assert audio_digest(b"abc") != audio_digest(b"abd")
+        assert audio_digest(
+            {"waveform": waveform, "sample_rate": 16000}
+        ) == audio_digest({"waveform": waveform.copy(), "sample_rate": 16000})
+        assert audio_digest(
+            {"waveform": waveform, "sample_rate": 16000}
+        ) != audio_digest({"waveform": waveform, "sample_rate": 8000})
+
+    def test_nbytes_of_frames(self):
+        frames = CTCFrames(
+            torch.zeros(1, 10, dtype=torch.int64), torch.zeros(1, 10), [10]
+        )
+
+        assert nbytes(frames) == 80 + 40
@@ -2,7 +2,12 @@
 
 import pytest
 
-from app.languages import map_whisper_to_omnilingual
+from app.languages import (
+    LANGUAGE_INDEX,
+    WHISPER_TO_OMNILINGUAL,
+    _warn_unknown_language,
+    map_whisper_to_omnilingual,
+)
 
 
 class TestMapWhisperToOmnilingual:
@@ -79,10 +84,23 @@ class TestMapWhisperToOmnilingual:
         assert map_whisper_to_omnilingual(omnilingual_code) == omnilingual_code
 
     def test_unknown_language_defaults_to_english(self, caplog):
-        """Unknown languages should default to 'eng_Latn' and log a warning."""
-        result = map_whisper_to_omnilingual("unknown_language")
-        assert result == "eng_Latn"
-        assert "Unknown language: unknown_language" in caplog.text
+        """Unknown languages should default to 'eng_Latn' and warn only once."""
+        _warn_unknown_language.cache_clear()
+
+        for _ in range(3):
+            assert map_whisper_to_omnilingual("unknown_language") == "eng_Latn"
+
+        assert caplog.text.count("Unknown language: unknown_language") == 1
+
+    def test_lowercased_omnilingual_codes(self):
+        """Omnilingual-ASR codes in any case should be normalized."""
+        assert map_whisper_to_omnilingual("ENG_LATN") == "eng_Latn"
+        assert map_whisper_to_omnilingual("cmn_hans") == "cmn_Hans"
+
+    def test_index_covers_every_alias(self):
+        """The precomputed index should agree with the Whisper mapping."""
+        for alias, code in WHISPER_TO_OMNILINGUAL.items():
+            assert LANGUAGE_INDEX[alias] == code
 
     def test_empty_string_defaults_to_english(self, caplog):
         """Empty string should default to 'eng_Latn' and log a warning."""
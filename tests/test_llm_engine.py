@@ -0,0 +1,231 @@
+"""Tests for the continuous batching LLM decode engine."""
+
+from types import SimpleNamespace
+
+import torch
+import torch.nn.functional as F
+
+from app.encoder_cache import EncoderCache, audio_digest
+from app.llm_engine import LLMDecodeEngine
+
+VOCAB_SIZE = 16
+EOS_IDX = 2
+BOS_IDX = 5
+LID_MARKER = 4
+
+
+class IdentityDecoder(torch.nn.Module):
+    """Decoder stand-in that returns its inputs and keeps no KV state."""
+
+    def forward(self, seqs, seqs_layout, state_bag):
+        return seqs
+
+
+class CountingModel:
+    """
+    Fake decoder-only model. Embeddings are one-hot token vectors, the decoder
+    is the identity and the output projection predicts `token + 1`, or EOS
+    after the last token of the vocabulary. A context ending in token `s`
+    therefore decodes to `s + 1, ..., VOCAB_SIZE - 1`.
+    """
+
+    max_generation_length = 64
+    target_vocab_info = SimpleNamespace(eos_idx=EOS_IDX, bos_idx=BOS_IDX)
+    special_tokens = SimpleNamespace(lid_marker=LID_MARKER)
+    lang_embeddings_p = 0.0
+
+    def __init__(self):
+        self.lang_mapping = {"eng_latn": 3}
+        self.next_token = torch.zeros(VOCAB_SIZE, VOCAB_SIZE)
+        for i in range(VOCAB_SIZE - 1):
+            self.next_token[i, i + 1] = 1.0
+        self.next_token[VOCAB_SIZE - 1, EOS_IDX] = 1.0
+        self.llama_decoder = IdentityDecoder()
+
+    def final_proj(self, seqs):
+        return seqs @ self.next_token
+
+    def embed_text(self, seqs, dtype):
+        return F.one_hot(seqs, VOCAB_SIZE).to(dtype)
+
+    def lang_embeddings(self, seqs):
+        return F.one_hot(seqs, VOCAB_SIZE).float()
+
+    def embed_audio(self, seqs, seq_lens):
+        """Audio samples are token ids, embedded one-hot."""
+        return F.one_hot(seqs, VOCAB_SIZE).float(), seq_lens
+
+
+def make_engine(**kwargs) -> LLMDecodeEngine:
+    pipeline = SimpleNamespace(
+        model=CountingModel(),
+        device="cpu",
+        dtype=torch.float32,
+        _build_audio_wavform_pipeline=lambda inputs: SimpleNamespace(
+            and_return=lambda: iter([torch.tensor(inputs[0]["waveform"])])
+        ),
+        _create_batch_simple=lambda wavs_langs: SimpleNamespace(
+            source_seqs=torch.stack([wav for wav, _ in wavs_langs]),
+            source_seq_lens=[wav.size(0) for wav, _ in wavs_langs],
+        ),
+        token_decoder=lambda tokens: " ".join(str(t) for t in tokens.tolist()),
+        beam_search_generator=SimpleNamespace(
+            config=SimpleNamespace(compression_window=100, compression_threshold=4.0)
+        ),
+    )
+    return LLMDecodeEngine(pipeline, **kwargs)
+
+
+def make_context(length: int, last_token: int) -> torch.Tensor:
+    """Decoder context of `length` positions ending in `last_token`."""
+    context = torch.zeros(length, VOCAB_SIZE)
+    context[-1, last_token] = 1.0
+    return context
+
+
+def expected_text(last_token: int) -> str:
+    return " ".join(str(t) for t in range(last_token + 1, VOCAB_SIZE))
+
+
+def admit(engine: LLMDecodeEngine) -> None:
+    engine._admit(engine._take_pending())
+
+
+def step_all(engine: LLMDecodeEngine) -> None:
+    for cohort in list(engine._cohorts):
+        engine._step(cohort)
+
+
+class TestLLMDecodeEngine:
+    """Tests for iteration-level scheduling in LLMDecodeEngine."""
+
+    def test_transcribes_concurrent_requests(self):
+        """Requests decoded together should each get their own transcript."""
+        engine = make_engine()
+        engine.start()
+        try:
+            futures = [
+                engine.submit_context(make_context(length, last_token))
+                for length, last_token in [(5, 3), (9, 12), (3, 8)]
+            ]
+            results = [future.result(timeout=10) for future in futures]
+        finally:
+            engine.stop()
+
+        assert results == [expected_text(3), expected_text(12), expected_text(8)]
+
+    def test_finished_sequences_leave_the_batch(self):
+        """A short sequence should finish and free its slot before a long one."""
+        engine = make_engine()
+        short = engine.submit_context(make_context(4, 13))
+        long = engine.submit_context(make_context(4, 3))
+        admit(engine)
+
+        for _ in range(3):
+            step_all(engine)
+
+        assert short.done()
+        assert short.result() == expected_text(13)
+        assert not long.done()
+        assert len(engine._cohorts[0].sequences) == 1
+        assert engine.active_sequences == 1
+
+    def test_new_request_joins_running_cohort(self):
+        """A request with a longer context should join between steps."""
+        engine = make_engine()
+        first = engine.submit_context(make_context(4, 3))
+        admit(engine)
+        step_all(engine)
+        step_all(engine)
+
+        second = engine.submit_context(make_context(8, 10))
+        admit(engine)
+
+        assert len(engine._cohorts) == 1
+        assert len(engine._cohorts[0].sequences) == 2
+
+        while engine._cohorts:
+            step_all(engine)
+
+        assert first.result() == expected_text(3)
+        assert second.result() == expected_text(10)
+        assert engine.active_sequences == 0
+
+    def test_short_request_starts_new_cohort(self):
+        """A request whose context is shorter than the cohort's step gets its own cohort."""
+        engine = make_engine()
+        engine.submit_context(make_context(6, 3))
+        admit(engine)
+        for _ in range(4):
+            step_all(engine)
+
+        engine.submit_context(make_context(3, 5))
+        admit(engine)
+
+        assert len(engine._cohorts) == 2
+
+    def test_admission_limited_by_kv_cache_slots(self):
+        """No more sequences than KV cache slots should be active at once."""
+        engine = make_engine(max_active_sequences=2)
+        for _ in range(3):
+            engine.submit_context(make_context(4, 3))
+        admit(engine)
+
+        assert engine.active_sequences == 2
+        assert engine.pending_sequences == 1
+
+
+class TestEncoderCache:
+    """Tests for decoding cached audio embeddings."""
+
+    def test_cached_audio_skips_encoder(self):
+        """A cached clip should be decoded from its embeddings and the BOS token."""
+        cache = EncoderCache(max_bytes=1 << 20)
+        engine = make_engine(cache=cache, model_name="omniASR_LLM_300M_v2")
+        audio = b"audio"
+        cache.put("omniASR_LLM_300M_v2", audio_digest(audio), make_context(3, 1))
+
+        future = engine.submit(audio)
+        admit(engine)
+        while engine._cohorts:
+            step_all(engine)
+
+        assert future.result() == expected_text(BOS_IDX)
+
+    def test_encoded_audio_is_cached(self):
+        """Audio embeddings of a new clip should be cached for the next request."""
+        cache = EncoderCache(max_bytes=1 << 20)
+        engine = make_engine(cache=cache, model_name="omniASR_LLM_300M_v2")
+        audio = {"waveform": [3, 7], "sample_rate": 16000}
+
+        future = engine.submit(audio, lang="eng_Latn")
+        admit(engine)
+        while engine._cohorts:
+            step_all(engine)
+
+        assert future.result() == expected_text(BOS_IDX)
+        cached = cache.get("omniASR_LLM_300M_v2", audio_digest(audio))
+        assert cached.argmax(dim=-1).tolist() == [3, 7]
+
+
+class TestLanguageContext:
+    """Tests for the language-conditioning tokens of the decoder context."""
+
+    def test_language_tokens_before_bos(self):
+        """Language models should append the LID marker and language before BOS."""
+        engine = make_engine()
+        engine.model.lang_embeddings_p = 0.5
+
+        context = engine.language_context("eng_Latn")
+
+        assert context.argmax(dim=-1).tolist() == [LID_MARKER, 3, BOS_IDX]
+
+    def test_embedded_once_per_language(self):
+        """Preloaded languages should be reused rather than embedded again."""
+        engine = make_engine()
+        engine.preload_languages([None, "eng_Latn"])
+
+        assert engine.language_context("eng_Latn") is engine.language_context(
+            "eng_Latn"
+        )
+        assert set(engine._language_contexts) == {None, "eng_Latn"}
@@ -0,0 +1,143 @@
+"""Tests for hot swapping the served model."""
+
+import asyncio
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.service import LoadedModel, OmnilingualASRService
+
+
+def make_model(model_name: str) -> LoadedModel:
+    pipeline = MagicMock()
+    pipeline.transcribe.return_value = [f"{model_name} text"]
+    return LoadedModel(model_name=model_name, pipeline=pipeline)
+
+
+@pytest.fixture
+def service():
+    """Service serving a mocked CTC model, loading mocked models on swap."""
+    service = OmnilingualASRService()
+    service.model = make_model("omniASR_CTC_300M_v2")
+    with (
+        patch.object(service, "_load", side_effect=lambda name, _: make_model(name)),
+        patch.object(service, "_warmup"),
+        patch("app.service.load_profile", return_value=None),
+    ):
+        yield service
+
+
+class TestModelSwap:
+    """Tests for loading, swapping in and releasing models."""
+
+    def test_swap_serves_new_requests_with_new_model(self, service):
+        """After a swap, new requests should go to the new model."""
+        old = service.model
+        asyncio.run(service.swap_model("omniASR_CTC_1B_v2"))
+
+        assert service.model_name == "omniASR_CTC_1B_v2"
+        assert asyncio.run(service.transcribe(b"audio")) == "omniASR_CTC_1B_v2 text"
+        assert old.retired
+        assert old.pipeline is None
+
+    def test_running_request_finishes_on_old_model(self, service):
+        """A request started before the swap should complete on the old model."""
+        old = service.model
+
+        async def run():
+            started = asyncio.Event()
+            finish = asyncio.Event()
+
+            async def slow_transcribe(model, pipeline, audio_bytes, lang_param):
+                started.set()
+                await finish.wait()
+                return pipeline.transcribe([audio_bytes])[0]
+
+            with patch.object(service, "_transcribe_pipeline", slow_transcribe):
+                request = asyncio.create_task(service.transcribe(b"audio"))
+                await started.wait()
+                await service.swap_model("omniASR_CTC_1B_v2")
+
+                assert old.retired
+                assert old.pipeline is not None
+
+                finish.set()
+                result = await request
+                await asyncio.gather(*service._releases)
+                return result
+
+        assert asyncio.run(run()) == "omniASR_CTC_300M_v2 text"
+        assert old.pipeline is None
+
+    def test_release_runs_off_event_loop(self, service):
+        """Releasing the old model should not block the event loop thread."""
+        old = service.model
+        release_threads = []
+
+        async def run():
+            with patch.object(
+                old, "release", lambda: release_threads.append(threading.get_ident())
+            ):
+                await service.swap_model("omniASR_CTC_1B_v2")
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(run())
+
+        assert len(release_threads) == 1
+        assert release_threads[0] != loop_thread
+
+    def test_last_request_does_not_wait_for_release(self, service):
+        """The last request on a retired model should return before it is released."""
+        old = service.model
+        unblock_release = threading.Event()
+
+        async def run():
+            started = asyncio.Event()
+            finish = asyncio.Event()
+
+            async def slow_transcribe(model, pipeline, audio_bytes, lang_param):
+                started.set()
+                await finish.wait()
+                return "text"
+
+            with (
+                patch.object(service, "_transcribe_pipeline", slow_transcribe),
+                patch.object(old, "release", lambda: unblock_release.wait(5)),
+            ):
+                request = asyncio.create_task(service.transcribe(b"audio"))
+                await started.wait()
+                await service.swap_model("omniASR_CTC_1B_v2")
+
+                finish.set()
+                await request
+                # The release is still blocked, yet the request has returned
+                assert len(service._releases) == 1
+                unblock_release.set()
+                await asyncio.gather(*service._releases)
+
+        asyncio.run(run())
+
+    def test_failed_warmup_releases_new_model(self, service):
+        """A model that loads but fails warmup should be released, not leaked."""
+        loaded = make_model("omniASR_CTC_1B_v2")
+        service._load.side_effect = None
+        service._load.return_value = loaded
+        service._warmup.side_effect = RuntimeError("out of memory")
+
+        with patch.object(loaded, "release") as release:
+            asyncio.run(service.swap_model("omniASR_CTC_1B_v2"))
+
+        release.assert_called_once()
+        assert service.model_name == "omniASR_CTC_300M_v2"
+        assert "out of memory" in service.swap_error
+
+    def test_failed_load_keeps_current_model(self, service):
+        """A model that fails to load should not replace the current one."""
+        service._load.side_effect = RuntimeError("unknown model card")
+
+        asyncio.run(service.swap_model("omniASR_CTC_missing"))
+
+        assert service.model_name == "omniASR_CTC_300M_v2"
+        assert service.loading_model_name is None
+        assert "unknown model card" in service.swap_error
@@ -0,0 +1,114 @@
+"""Tests for on-demand profiling."""
+
+import contextlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+import torch
+
+from app.profiling import Profiler
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    with patch("app.profiling.PROFILE_DIR", str(tmp_path)):
+        profiler = Profiler()
+        yield profiler
+        profiler.finish()
+
+
+def run_batch(profiler: Profiler) -> None:
+    with profiler.batch("test_batch"):
+        torch.mm(torch.randn(32, 32), torch.randn(32, 32))
+
+
+class TestProfiler:
+    """Tests for profiling sessions."""
+
+    def test_no_overhead_when_inactive(self, profiler):
+        """Batches outside a session should run under a no-op context manager."""
+        assert isinstance(profiler.batch("test_batch"), contextlib.nullcontext)
+
+    def test_session_ends_after_batches(self, profiler):
+        """A session should write a trace and summary after its last batch."""
+        session = profiler.start(batches=2)
+
+        run_batch(profiler)
+        # Inference runs on worker threads too
+        thread = threading.Thread(target=run_batch, args=(profiler,))
+        thread.start()
+        thread.join()
+        run_batch(profiler)
+
+        status = session.status()
+        assert status.state == "done"
+        assert status.batches == 2
+        assert not profiler.active
+
+        trace = json.loads(session.trace_path.read_text())
+        names = {event.get("name") for event in trace["traceEvents"]}
+        assert {"test_batch", "aten::mm"} <= names
+        assert session.stacks_path.exists()
+
+        operators = {op.name: op for op in status.top_operators}
+        assert operators["aten::mm"].calls == 2
+
+    def test_concurrent_batches(self, profiler):
+        """Batches running at once should all succeed, with one of them recorded."""
+        session = profiler.start(batches=10)
+        both_running = threading.Barrier(2)
+
+        def concurrent_batch():
+            with profiler.batch("test_batch"):
+                both_running.wait(timeout=5)
+                return torch.mm(torch.randn(32, 32), torch.randn(32, 32))
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(concurrent_batch) for _ in range(2)]
+            # Raises if either batch failed
+            results = [future.result() for future in futures]
+
+        assert [result.shape for result in results] == [(32, 32)] * 2
+        assert session.batches == 1
+
+        # The next batch is recorded again
+        run_batch(profiler)
+        assert session.batches == 2
+
+    @pytest.mark.parametrize(
+        "target", ["app.profiling.profile.start", "app.profiling.Profiler._record"]
+    )
+    def test_profiler_failure_does_not_fail_batch(self, profiler, target):
+        """A profiler failing to start or record should not fail the batch."""
+        session = profiler.start(batches=1)
+
+        with patch(target, side_effect=RuntimeError("Kineto")):
+            run_batch(profiler)
+
+        assert session.batches == 0
+        assert not profiler._recording.locked()
+
+    def test_session_ends_after_seconds(self, profiler):
+        """A session without traffic should still end at its deadline."""
+        session = profiler.start(seconds=0.05)
+
+        for _ in range(100):
+            if not session.running:
+                break
+            time.sleep(0.01)
+
+        assert session.state == "done"
+        assert session.batches == 0
+        # The test thread is the "event loop" whose stacks are sampled
+        assert "test_session_ends_after_seconds" in session.stacks_path.read_text()
+
+    def test_one_session_at_a_time(self, profiler):
+        """Starting a second session while one runs should fail."""
+        profiler.start(batches=1)
+
+        with pytest.raises(RuntimeError):
+            profiler.start(batches=1)
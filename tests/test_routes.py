@@ -1,8 +1,11 @@
 """Integration tests for API routes."""
 
-from unittest.mock import MagicMock, patch
+import io
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import numpy as np
 import pytest
+import soundfile as sf
 from fastapi.testclient import TestClient
 
 from app.server import app
@@ -13,6 +16,7 @@ def client():
     """Create a test client with mocked ASR service."""
     with patch("app.service.asr_service") as mock_service:
         mock_service.load_model = MagicMock()
+        mock_service.max_concurrency = 1
         with TestClient(app) as test_client:
             yield test_client
 
@@ -56,3 +60,61 @@ def test_get_models_uses_configured_model_name(client: TestClient):
     model = response.json()["data"][0]
 
     assert model["id"] == "custom_model_name"
+
+
+def test_get_metrics(client: TestClient):
+    """Metrics endpoint should return a JSON object of numbers."""
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+
+    data = response.json()
+
+    assert "cascade_escalation_rate" in data
+    assert all(isinstance(value, (int, float)) for value in data.values())
+
+
+def test_transcription_rejects_long_audio_before_decoding(client: TestClient):
+    """Audio longer than the model's limit should be rejected from its header."""
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(16000 * 41, dtype=np.float32), 16000, format="WAV")
+
+    with patch("app.routes.asr_service") as mock_service:
+        mock_service.max_audio_seconds = 40
+        mock_service.transcribe = AsyncMock()
+        response = client.post(
+            "/v1/audio/transcriptions",
+            files={"file": ("long.wav", buffer.getvalue(), "audio/wav")},
+        )
+
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == "invalid_audio_length"
+    mock_service.transcribe.assert_not_called()
+
+
+def test_get_load(client: TestClient):
+    """Load endpoint should report queue, batch and memory state."""
+    response = client.get("/load")
+
+    assert response.status_code == 200
+
+    data = response.json()
+
+    assert isinstance(data["ready"], bool)
+    assert data["queued_requests"] == 0
+    assert data["queued_audio_seconds"] == 0.0
+    assert data["in_flight_requests"] == 0
+    assert data["estimated_wait_seconds"] >= 0.0
+
+
+def test_load_report_header(client: TestClient):
+    """Every response should carry a compact load report header."""
+    response = client.get("/health-check")
+
+    report = dict(
+        item.split("=") for item in response.headers["X-Load-Report"].split(", ")
+    )
+
+    assert report["ready"] in ("0", "1")
+    assert float(report["queued_audio_seconds"]) == 0.0
+    assert int(report["in_flight_requests"]) == 0
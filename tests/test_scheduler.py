@@ -0,0 +1,176 @@
+"""Tests for the weighted fair admission scheduler."""
+
+import asyncio
+
+import pytest
+
+from app.scheduler import FairScheduler, Priority, parse_weights, resolve_tenant
+
+
+async def admission_order(
+    scheduler: FairScheduler, requests: list[tuple[str, Priority, float]]
+) -> list[int]:
+    """
+    Queue `requests` behind a request holding the only slot, then release
+    slots one by one and return the indices in the order they were admitted.
+    """
+    order = []
+
+    async def run(i: int, tenant: str, priority: Priority, duration: float):
+        await scheduler.acquire(tenant, priority, duration)
+        order.append(i)
+
+    await scheduler.acquire("blocker", Priority.INTERACTIVE, 1.0)
+    tasks = [
+        asyncio.create_task(run(i, *request)) for i, request in enumerate(requests)
+    ]
+    await asyncio.sleep(0)
+
+    scheduler.release("blocker")
+    while len(order) < len(requests):
+        await asyncio.sleep(0)
+        tenant = requests[order[-1]][0]
+        scheduler.release(tenant)
+
+    await asyncio.gather(*tasks)
+    return order
+
+
+class TestFairScheduler:
+    """Tests for admission order, caps and stats."""
+
+    def test_interactive_before_batch(self):
+        """Interactive requests should be admitted before earlier batch requests."""
+        requests = [
+            ("a", Priority.BATCH, 1.0),
+            ("a", Priority.BATCH, 1.0),
+            ("b", Priority.INTERACTIVE, 1.0),
+        ]
+        order = asyncio.run(admission_order(FairScheduler(), requests))
+
+        assert order == [2, 0, 1]
+
+    def test_shares_by_audio_seconds(self):
+        """A tenant's long backfill should not delay another tenant's short clips."""
+        requests = [
+            ("bulk", Priority.BATCH, 30.0),
+            ("bulk", Priority.BATCH, 30.0),
+            ("bulk", Priority.BATCH, 30.0),
+            ("small", Priority.BATCH, 5.0),
+            ("small", Priority.BATCH, 5.0),
+        ]
+        order = asyncio.run(admission_order(FairScheduler(), requests))
+
+        assert order == [3, 4, 0, 1, 2]
+
+    def test_weights_scale_share(self):
+        """A tenant with twice the weight should get twice the audio-seconds."""
+        scheduler = FairScheduler(weights={"heavy": 2.0})
+        requests = [("light", Priority.BATCH, 10.0)] * 2 + [
+            ("heavy", Priority.BATCH, 10.0)
+        ] * 4
+        order = asyncio.run(admission_order(scheduler, requests))
+
+        assert [requests[i][0] for i in order] == [
+            "heavy",
+            "light",
+            "heavy",
+            "heavy",
+            "light",
+            "heavy",
+        ]
+
+    def test_tenant_concurrency_cap(self):
+        """A tenant at its cap should not be admitted even with free slots."""
+
+        async def run():
+            scheduler = FairScheduler(max_concurrency=4, tenant_max_concurrency=1)
+            await scheduler.acquire("a", Priority.INTERACTIVE, 1.0)
+            waiting = asyncio.create_task(
+                scheduler.acquire("a", Priority.INTERACTIVE, 1.0)
+            )
+            await scheduler.acquire("b", Priority.INTERACTIVE, 1.0)
+            await asyncio.sleep(0)
+
+            stats = scheduler.stats()
+            assert not waiting.done()
+            assert stats['tenant_queue_depth{tenant="a"}'] == 1
+            assert stats["scheduler_in_flight"] == 2
+
+            scheduler.release("a")
+            await waiting
+            assert scheduler.stats()['tenant_admitted_total{tenant="a"}'] == 2
+
+        asyncio.run(run())
+
+    def test_cancelled_request_leaves_queue(self):
+        """A client that disconnects while queued should not hold a slot."""
+
+        async def run():
+            scheduler = FairScheduler()
+            await scheduler.acquire("a", Priority.INTERACTIVE, 1.0)
+            waiting = asyncio.create_task(
+                scheduler.acquire("b", Priority.INTERACTIVE, 1.0)
+            )
+            await asyncio.sleep(0)
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+
+            scheduler.release("a")
+            assert scheduler.queued == 0
+            assert scheduler.in_flight == 0
+
+        asyncio.run(run())
+
+    def test_idle_tenants_forgotten(self):
+        """Tenants with nothing queued or in flight should not be kept forever."""
+
+        async def run():
+            scheduler = FairScheduler(max_concurrency=2)
+            for i in range(100):
+                async with scheduler.slot(f"tenant-{i}", Priority.BATCH, 1.0):
+                    pass
+            assert scheduler.stats()["scheduler_tenants"] == 0
+
+            # An idle tenant ahead of virtual time is kept, so its next request
+            # still starts after its last one
+            await scheduler.acquire("heavy", Priority.INTERACTIVE, 30.0)
+            async with scheduler.slot("light", Priority.INTERACTIVE, 1.0):
+                pass
+            assert scheduler.stats()["scheduler_tenants"] == 2
+            scheduler.release("heavy")
+            assert scheduler.stats()["scheduler_tenants"] == 0
+
+        asyncio.run(run())
+
+    def test_tenant_labels_capped(self):
+        """Tenants beyond the label limit should be summed under one label."""
+
+        async def run():
+            scheduler = FairScheduler(max_concurrency=10, max_tenant_labels=2)
+            for tenant in ["a", "a", "a", "b", "b", "c", "d"]:
+                await scheduler.acquire(tenant, Priority.INTERACTIVE, 1.0)
+
+            stats = scheduler.stats()
+            labels = {key.split("{")[1] for key in stats if "{" in key}
+            assert labels == {'tenant="a"}', 'tenant="b"}', 'tenant="other"}'}
+            assert stats['tenant_in_flight{tenant="a"}'] == 3
+            assert stats['tenant_in_flight{tenant="other"}'] == 2
+            assert stats["scheduler_tenants"] == 4
+
+        asyncio.run(run())
+
+
+def test_resolve_tenant():
+    """Tenant header wins, API keys are hashed and anonymous requests share a tenant."""
+    assert resolve_tenant("acme", "Bearer sk-123") == "acme"
+    assert resolve_tenant(None, "Bearer sk-123").startswith("key-")
+    assert "sk-123" not in resolve_tenant(None, "Bearer sk-123")
+    assert resolve_tenant(None, None) == "default"
+
+
+def test_parse_weights():
+    """Weights should be parsed from a comma-separated list."""
+    assert parse_weights("acme=3, beta=0.5") == {"acme": 3.0, "beta": 0.5}
+    assert parse_weights("") == {}
@@ -0,0 +1,325 @@
+"""Tests for the shared-memory handoff between front-end workers and the engine."""
+
+import asyncio
+import functools
+import io
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi import FastAPI, Header, Response
+from fastapi.testclient import TestClient
+
+from app import frontend
+from app.engine_listener import serve_frontend
+from app.exceptions import APIError
+from app.frontend import EngineClient
+from app.scheduler import Priority
+from app.shm import SharedAudioBuffer, read_message, read_samples, send_message
+
+
+def wav_bytes(samples: np.ndarray, sample_rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sample_rate, format="WAV", subtype="FLOAT")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def ring():
+    buffer = SharedAudioBuffer(1024)
+    yield buffer
+    buffer.close()
+
+
+class TestSharedAudioBuffer:
+    """Tests for ring buffer allocation."""
+
+    def test_write_is_readable_from_segment(self, ring):
+        """Samples written to the ring should be readable through the segment."""
+        samples = np.arange(12, dtype=np.float32).reshape(6, 2)
+
+        offset = asyncio.run(ring.write(samples))
+
+        np.testing.assert_array_equal(read_samples(ring.shm, offset, [6, 2]), samples)
+
+    def test_wraps_after_tail_is_freed(self, ring):
+        """Space freed at the tail should be reused once the head reaches the end."""
+        chunk = np.zeros(64, dtype=np.float32)  # 256 bytes
+
+        async def run():
+            offsets = [await ring.write(chunk) for _ in range(4)]
+            await ring.free(offsets[0])
+            return offsets, await ring.write(chunk)
+
+        offsets, wrapped = asyncio.run(run())
+
+        assert offsets == [0, 256, 512, 768]
+        assert wrapped == 0
+
+    def test_out_of_order_free_waits_for_tail(self, ring):
+        """Space freed behind an allocation in use should not be reclaimed yet."""
+        chunk = np.zeros(64, dtype=np.float32)
+
+        async def run():
+            offsets = [await ring.write(chunk) for _ in range(4)]
+            await ring.free(offsets[1])
+            assert ring.used_bytes == 1024
+
+            pending = asyncio.create_task(ring.write(chunk))
+            await asyncio.sleep(0)
+            assert not pending.done()
+
+            await ring.free(offsets[0])
+            return await pending
+
+        assert asyncio.run(run()) == 0
+        assert ring.used_bytes == 768
+
+    def test_rejects_audio_larger_than_buffer(self, ring):
+        """Audio larger than the whole ring should be rejected."""
+        with pytest.raises(ValueError):
+            asyncio.run(ring.write(np.zeros(512, dtype=np.float32)))
+
+
+class TestMessages:
+    """Tests for socket message framing."""
+
+    def test_round_trip(self):
+        """A header and payload should be read back as sent."""
+
+        async def run():
+            reader = asyncio.StreamReader()
+
+            class Writer:
+                def write(self, data):
+                    reader.feed_data(data)
+
+                async def drain(self):
+                    pass
+
+            await send_message(Writer(), {"id": 1}, b"audio")
+            await send_message(Writer(), {"id": 2})
+            return await read_message(reader), await read_message(reader)
+
+        assert asyncio.run(run()) == (({"id": 1}, b"audio"), ({"id": 2}, b""))
+
+
+@asynccontextmanager
+async def connected_client(socket_path, engine_app=None):
+    """Front-end worker client connected to an engine listener serving `engine_app`."""
+    server = await asyncio.start_unix_server(
+        functools.partial(serve_frontend, app=engine_app or FastAPI()),
+        path=socket_path,
+    )
+    client = EngineClient(socket_path, 1024 * 1024)
+    client.start()
+    try:
+        while not client.connected:
+            await asyncio.sleep(0.01)
+        yield client
+    finally:
+        await client.close()
+        server.close()
+        await server.wait_closed()
+
+
+def client_transcribe(client, audio_bytes):
+    return client.transcribe(
+        audio_bytes,
+        filename="audio.wav",
+        language="en",
+        tenant="a",
+        priority=Priority.BATCH,
+        duration=1.0,
+    )
+
+
+class TestEngineHandoff:
+    """Tests for transcription requests from a front-end worker to the engine."""
+
+    async def transcribe(self, socket_path, audio_bytes, transcribe_audio):
+        async with connected_client(socket_path) as client:
+            with patch("app.engine_listener.transcribe_audio", transcribe_audio):
+                return await client_transcribe(client, audio_bytes)
+
+    def test_decoded_audio_is_passed_through_shared_memory(self, tmp_path):
+        """The engine should receive the decoded samples and request details."""
+        samples = np.linspace(-1, 1, 1600, dtype=np.float32)
+        received = {}
+
+        async def transcribe_audio(audio, **kwargs):
+            received["waveform"] = np.array(audio["waveform"])
+            received["sample_rate"] = audio["sample_rate"]
+            received.update(kwargs)
+            return "hello"
+
+        text = asyncio.run(
+            self.transcribe(
+                str(tmp_path / "engine.sock"), wav_bytes(samples), transcribe_audio
+            )
+        )
+
+        assert text == "hello"
+        np.testing.assert_array_equal(received["waveform"][:, 0], samples)
+        assert received["sample_rate"] == 16000
+        assert received["tenant"] == "a"
+        assert received["priority"] == Priority.BATCH
+        assert received["language"] == "en"
+
+    def test_undecodable_audio_is_sent_as_bytes(self, tmp_path):
+        """Audio the worker cannot decode should reach the engine unchanged."""
+        received = []
+
+        async def transcribe_audio(audio, **kwargs):
+            received.append(audio)
+            return "hello"
+
+        asyncio.run(
+            self.transcribe(
+                str(tmp_path / "engine.sock"), b"not audio", transcribe_audio
+            )
+        )
+
+        assert received == [b"not audio"]
+
+    def test_api_errors_are_raised_in_worker(self, tmp_path):
+        """API errors raised in the engine should be raised again in the worker."""
+
+        async def transcribe_audio(audio, **kwargs):
+            raise APIError(
+                status_code=400, message="too long", code="invalid_audio_length"
+            )
+
+        with pytest.raises(APIError) as exc_info:
+            asyncio.run(
+                self.transcribe(
+                    str(tmp_path / "engine.sock"), b"not audio", transcribe_audio
+                )
+            )
+
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.code == "invalid_audio_length"
+
+    def test_unavailable_without_engine(self, tmp_path):
+        """Requests should fail with 503 while the engine is not connected."""
+
+        async def run():
+            client = EngineClient(str(tmp_path / "missing.sock"), 1024)
+            client.start()
+            try:
+                await client.transcribe(
+                    b"audio",
+                    filename="audio.wav",
+                    language=None,
+                    tenant="a",
+                    priority=Priority.INTERACTIVE,
+                    duration=None,
+                )
+            finally:
+                await client.close()
+
+        with pytest.raises(APIError) as exc_info:
+            asyncio.run(run())
+
+        assert exc_info.value.status_code == 503
+
+    def test_ring_space_kept_until_engine_replies(self, tmp_path):
+        """A cancelled request should keep its audio until the engine is done with it."""
+        samples = np.zeros(1600, dtype=np.float32)
+        engine_reading = asyncio.Event()
+        engine_done = asyncio.Event()
+
+        async def transcribe_audio(audio, **kwargs):
+            engine_reading.set()
+            await engine_done.wait()
+            return "hello"
+
+        async def run():
+            async with connected_client(str(tmp_path / "engine.sock")) as client:
+                with patch("app.engine_listener.transcribe_audio", transcribe_audio):
+                    request = asyncio.create_task(
+                        client_transcribe(client, wav_bytes(samples))
+                    )
+                    await engine_reading.wait()
+                    request.cancel()
+                    await asyncio.gather(request, return_exceptions=True)
+                    used_while_reading = client.buffer.used_bytes
+
+                    engine_done.set()
+                    while client.buffer.used_bytes:
+                        await asyncio.sleep(0.01)
+                    return used_while_reading
+
+        assert asyncio.run(run()) == samples.nbytes
+
+    def test_engine_state_sent_to_worker(self, tmp_path):
+        """The worker should learn the engine's length limit and load on connecting."""
+
+        async def run():
+            async with connected_client(str(tmp_path / "engine.sock")) as client:
+                while client.load_report is None:
+                    await asyncio.sleep(0.01)
+                return client.max_audio_seconds, client.load_report
+
+        max_audio_seconds, load = asyncio.run(run())
+
+        assert max_audio_seconds is not None
+        assert "in_flight_requests=" in load
+
+
+class TestForwardedRoutes:
+    """Tests for routes the front-end worker forwards to the engine."""
+
+    def test_request_runs_in_engine_app(self, tmp_path):
+        """Forwarded requests should be answered by the engine's app."""
+        engine_app = FastAPI()
+
+        @engine_app.post("/admin/model")
+        async def swap_model(body: dict, authorization: str = Header()):
+            return Response(
+                f"{authorization} {body['model']}",
+                status_code=202,
+                media_type="text/plain",
+            )
+
+        async def run():
+            async with connected_client(
+                str(tmp_path / "engine.sock"), engine_app
+            ) as client:
+                return await client.request(
+                    "POST",
+                    "/admin/model",
+                    "",
+                    [
+                        ("authorization", "Bearer key"),
+                        ("content-type", "application/json"),
+                    ],
+                    b'{"model": "omniASR_CTC_300M"}',
+                )
+
+        status, headers, body = asyncio.run(run())
+
+        assert status == 202
+        assert ("content-type", "text/plain; charset=utf-8") in headers
+        assert body == b"Bearer key omniASR_CTC_300M"
+
+    def test_over_length_audio_rejected_before_decoding(self):
+        """The worker should reject audio longer than the engine accepts without decoding it."""
+        client = AsyncMock(max_audio_seconds=1.0, load_report="ready=1")
+
+        with (
+            patch("app.frontend.engine_client", client),
+            patch("app.frontend.decode_audio") as decode,
+        ):
+            response = TestClient(frontend.app).post(
+                "/v1/audio/transcriptions",
+                files={"file": ("audio.wav", wav_bytes(np.zeros(32000, np.float32)))},
+            )
+
+        assert response.status_code == 400
+        assert response.json()["error"]["code"] == "invalid_audio_length"
+        assert response.headers["X-Load-Report"] == "ready=1"
+        client.transcribe.assert_not_called()
+        decode.assert_not_called()
@@ -0,0 +1,203 @@
+"""Tests for pipelined CTC inference stages."""
+
+import asyncio
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+import torch
+
+from app.backends import Fairseq2Backend
+from app.encoder_cache import EncoderCache
+from app.service import LoadedModel, OmnilingualASRService
+from app.stages import StagedCTCEngine, StageTimer
+
+VOCAB_SIZE = 8
+
+
+class FakePipeline:
+    """
+    CTC pipeline whose audio samples are token ids, so the transcript of
+    `[1, 1, 0, 2]` is `"1 2"`.
+    """
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.model = self.forward
+
+    def _build_audio_wavform_pipeline(self, inputs):
+        audio = inputs[0]
+        if audio == b"broken":
+            raise RuntimeError("decode failed")
+        return SimpleNamespace(
+            and_return=lambda: iter(
+                [torch.tensor(audio["waveform"], dtype=torch.float)]
+            )
+        )
+
+    def _create_batch_simple(self, wavs_langs):
+        seq_lens = [wav.size(0) for wav, _ in wavs_langs]
+        seqs = torch.zeros(len(seq_lens), max(seq_lens))
+        for i, (wav, _) in enumerate(wavs_langs):
+            seqs[i, : wav.size(0)] = wav
+        return SimpleNamespace(source_seqs=seqs, source_seq_lens=seq_lens)
+
+    def forward(self, seqs, layout):
+        self.batch_sizes.append(seqs.size(0))
+        logits = torch.nn.functional.one_hot(seqs.long(), VOCAB_SIZE).float() * 10
+        return logits, SimpleNamespace(seq_lens=layout.seq_lens)
+
+    def token_decoder(self, ids):
+        return " ".join(str(i) for i in ids.tolist() if i != 0)
+
+
+@pytest.fixture
+def engine():
+    engine = StagedCTCEngine(
+        Fairseq2Backend(FakePipeline()), lambda duration: 2, decode_threads=2
+    )
+    engine.start()
+    yield engine
+    engine.stop()
+
+
+class TestStagedCTCEngine:
+    """Tests for transcribing through the stages."""
+
+    def test_results_returned_to_each_caller(self, engine):
+        """Every request should get its own transcript, in batches of at most 2."""
+        audio = [[1, 1, 0, 2], [3, 0, 3], [4], [5, 5, 6], [7, 0]]
+
+        futures = [engine.submit({"waveform": a, "sample_rate": 16000}) for a in audio]
+        results = [future.result(timeout=5) for future in futures]
+
+        assert [text for text, _ in results] == ["1 2", "3 3", "4", "5 6", "7"]
+        assert all(
+            confidence == pytest.approx(1.0, abs=0.01) for _, confidence in results
+        )
+        assert sum(engine.pipeline.batch_sizes) == 5
+        assert max(engine.pipeline.batch_sizes) <= 2
+        assert engine.batches_in_flight == 0
+
+    def test_decode_error_fails_only_its_request(self, engine):
+        """A file that cannot be decoded should not affect other requests."""
+        broken = engine.submit(b"broken")
+        ok = engine.submit({"waveform": [1], "sample_rate": 16000})
+
+        with pytest.raises(RuntimeError, match="decode failed"):
+            broken.result(timeout=5)
+        assert ok.result(timeout=5) == ("1", pytest.approx(1.0, abs=0.01))
+
+    def test_rejects_requests_after_stop(self):
+        """Requests submitted after stopping should fail immediately."""
+        engine = StagedCTCEngine(Fairseq2Backend(FakePipeline()), lambda duration: 2)
+        engine.start()
+        engine.stop()
+
+        with pytest.raises(RuntimeError):
+            engine.submit({"waveform": [1], "sample_rate": 16000})
+
+    def test_repeated_audio_served_from_cache(self):
+        """A clip sent again should be answered without running the model."""
+        cache = EncoderCache(max_bytes=1 << 20)
+        engine = StagedCTCEngine(
+            Fairseq2Backend(FakePipeline()),
+            lambda duration: 2,
+            cache=cache,
+            model_name="omniASR_CTC_300M_v2",
+        )
+        engine.start()
+        audio = {"waveform": np.array([1, 1, 0, 2]), "sample_rate": 16000}
+        try:
+            first = engine.submit(audio).result(timeout=5)
+            # Frames are cached just after the result is returned
+            deadline = time.monotonic() + 5
+            while not len(cache) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            second = engine.submit(dict(audio)).result(timeout=5)
+        finally:
+            engine.stop()
+
+        assert second == first
+        assert engine.pipeline.batch_sizes == [1]
+
+    def test_cache_failure_does_not_stop_postprocessing(self):
+        """A failing cache should neither lose results nor stall later batches."""
+        cache = EncoderCache(max_bytes=1 << 20)
+        engine = StagedCTCEngine(
+            Fairseq2Backend(FakePipeline()),
+            lambda duration: 2,
+            cache=cache,
+            model_name="omniASR_CTC_300M_v2",
+        )
+        engine.start()
+        try:
+            with patch.object(cache, "put", side_effect=RuntimeError("cache full")):
+                first = engine.submit({"waveform": [1, 2], "sample_rate": 16000})
+                assert first.result(timeout=5)[0] == "1 2"
+                second = engine.submit({"waveform": [3], "sample_rate": 16000})
+                assert second.result(timeout=5)[0] == "3"
+        finally:
+            engine.stop()
+
+    def test_batch_size_limited_by_backend(self):
+        """Batches should not exceed the largest batch the backend accepts."""
+        backend = Fairseq2Backend(FakePipeline())
+        backend.max_batch_size = 4
+
+        engine = StagedCTCEngine(backend, lambda duration: 16)
+
+        assert engine.batch_size_for(10.0) == 4
+        assert engine.max_in_flight == 16
+
+    def test_stats_for_every_stage(self, engine):
+        """Utilization and queue depth should be reported for all four stages."""
+        stats = engine.stats()
+
+        for stage in ("decode", "collate", "infer", "postprocess"):
+            assert f'stage_utilization{{stage="{stage}"}}' in stats
+            assert f'stage_queue_depth{{stage="{stage}"}}' in stats
+
+
+class TestStageTimer:
+    """Tests for stage utilization."""
+
+    def test_utilization_of_last_full_window(self):
+        """Utilization should be the busy fraction of the last complete window."""
+        clock = [100.0]
+        with patch("app.stages.time.monotonic", lambda: clock[0]):
+            timer = StageTimer(workers=2, window=10.0)
+            timer.record(101.0, 106.0)
+            timer.record(102.0, 107.0)
+            assert timer.utilization == 0.0
+
+            clock[0] = 112.0
+            assert timer.utilization == pytest.approx(0.5)
+            assert timer.busy_seconds_total == pytest.approx(10.0)
+
+            clock[0] = 135.0
+            assert timer.utilization == 0.0
+
+
+class TestServiceStages:
+    """Tests for serving CTC models through the stages."""
+
+    def test_transcribe_uses_staged_engine(self):
+        """Requests to a CTC model with stages should be batched by the engine."""
+        service = OmnilingualASRService()
+        pipeline = MagicMock()
+        future = Future()
+        future.set_result(("staged text", 0.9))
+        ctc_engine = MagicMock(pipeline=pipeline, max_in_flight=32)
+        ctc_engine.submit.return_value = future
+        service.model = LoadedModel(
+            model_name="omniASR_CTC_300M_v2", pipeline=pipeline, ctc_engine=ctc_engine
+        )
+
+        assert asyncio.run(service.transcribe(b"audio")) == "staged text"
+        ctc_engine.submit.assert_called_once_with(b"audio")
+        pipeline.transcribe.assert_not_called()
+        assert service.max_concurrency == 32
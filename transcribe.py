@@ -0,0 +1,122 @@
+"""
+Offline bulk transcription without the HTTP server.
+
+    python transcribe.py audio/ -o results.jsonl
+    python transcribe.py manifest.jsonl -o results.jsonl --language en
+
+Run the same command again to resume an interrupted run.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+# Batch size for audio up to 40 seconds without a tuning profile
+DEFAULT_BATCH_SIZE = 16
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Transcribe audio files offline.")
+    parser.add_argument(
+        "source",
+        type=Path,
+        help="Directory of audio files, or a manifest (.jsonl with path and "
+        "language, or one path per line)",
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, required=True, help="JSONL file for results"
+    )
+    parser.add_argument(
+        "--language", help="Language of files without one in the manifest"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Fixed batch size. Defaults to the tuning profile's batch size for "
+        f"each duration, or {DEFAULT_BATCH_SIZE} without a profile",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        help="Decoding worker processes",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    checkpoint_path = args.output.with_name(args.output.name + ".checkpoint")
+    if args.output.exists() and not checkpoint_path.exists():
+        sys.exit(f"{args.output} exists and has no checkpoint to resume from")
+
+    # Imported after argument parsing, torch takes a while to load
+    from omnilingual_asr.models.inference.pipeline import MAX_ALLOWED_AUDIO_SEC
+
+    from app.autotune import default_dtype, load_profile, select_device
+    from app.bulk import Checkpoint, ResultWriter, collect_inputs, transcribe_items
+    from app.checkpoints import load_pipeline
+    from app.config import MODEL_NAME
+    from app.languages import map_whisper_to_omnilingual
+
+    checkpoint = Checkpoint(checkpoint_path, args.output)
+    done = checkpoint.resume()
+    items = [
+        item
+        for item in collect_inputs(args.source, args.language)
+        if item.path not in done
+    ]
+    logger.info(f"{len(items)} files to transcribe, {len(done)} already done")
+    if not items:
+        return
+
+    device = select_device()
+    profile = load_profile(MODEL_NAME, device)
+    if profile is not None:
+        profile.apply_threads()
+    dtype = profile.torch_dtype if profile else default_dtype(device)
+    pipeline = load_pipeline(MODEL_NAME, device, dtype)
+
+    def batch_size_for(duration: float) -> int:
+        if args.batch_size or profile is None:
+            return args.batch_size or DEFAULT_BATCH_SIZE
+        return profile.batch_size_for(duration)
+
+    is_llm_model = "LLM" in MODEL_NAME
+
+    def transcribe(audio: list[dict], languages: list[str | None]) -> list[str]:
+        # Batches hold items that all have a language or none do
+        if is_llm_model and all(languages):
+            lang = [map_whisper_to_omnilingual(language) for language in languages]
+            return pipeline.transcribe(audio, lang=lang, batch_size=len(audio))
+        return pipeline.transcribe(audio, batch_size=len(audio))
+
+    max_audio_seconds = (
+        None if pipeline.streaming_config.is_streaming else MAX_ALLOWED_AUDIO_SEC
+    )
+
+    with (
+        ResultWriter(args.output, checkpoint) as writer,
+        ProcessPoolExecutor(args.workers, mp_context=get_context("spawn")) as pool,
+    ):
+        transcribe_items(
+            items, transcribe, writer, pool, batch_size_for, max_audio_seconds
+        )
+
+    logger.info(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()